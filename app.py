@@ -1,24 +1,26 @@
 import streamlit as st
 import os
-import json
-import tempfile
-import shutil
 import time
 import uuid
-from pathlib import Path
-import requests  # 添加用于 GitHub API 请求
-import base64    # 添加用于 GitHub API 认证
 
 # 导入配置
 import config
 
 # 导入自定义模块
-from llm_handler import LLMHandler
-from packager import AppPackager
+from llm_handler import normalize_endpoint
+from download_cache import get_archive_cache
+from artifact_store import get_artifact_store
+from resource_store import ResourceQuotaExceeded, get_resource_store
+from model_catalog import get_model_catalog
+from data_profiler import format_schema, get_data_profiler
+from job_queue import JobManager, get_job_manager
+from pipeline import run_deploy_job, run_generation_job
+from telemetry import start_metrics_server
 
 # 初始化会话状态
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    # 历史记录从产物存储加载，重启后仍可下载之前生成的应用
+    st.session_state.history = get_artifact_store().list_history()
 if 'current_app' not in st.session_state:
     st.session_state.current_app = None
 if 'available_models' not in st.session_state:
@@ -29,14 +31,25 @@ if 'progress' not in st.session_state:
     st.session_state.progress = {"stage": "", "details": "", "percent": 0}
 if 'uploaded_resources' not in st.session_state:
     st.session_state.uploaded_resources = []
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
 if 'github_token' not in st.session_state:
     st.session_state.github_token = ""
 if 'github_deployment' not in st.session_state:
     st.session_state.github_deployment = {"status": "", "url": "", "repo_name": ""}
+if 'deploy_job' not in st.session_state:
+    st.session_state.deploy_job = None
+if 'prepared_downloads' not in st.session_state:
+    st.session_state.prepared_downloads = []
+if 'active_job' not in st.session_state:
+    # 浏览器刷新后从URL参数恢复进行中的生成任务
+    st.session_state.active_job = st.query_params.get("job")
 
-# 创建资源目录
-resource_dir = Path("resources")
-resource_dir.mkdir(exist_ok=True)
+# 资源存储（创建资源目录）
+resource_store = get_resource_store()
+
+# 指标端点（每个进程只启动一次，供运维抓取各阶段耗时）
+start_metrics_server()
 
 # 创建获取模型列表的回调函数
 def update_available_models():
@@ -51,33 +64,60 @@ def update_progress(stage, details, percent):
         "percent": percent
     }
 
-# 处理上传的资源
+# 处理上传的资源：分块写入资源存储，相同内容只保存一份
 def handle_uploaded_resource(uploaded_file, resource_type):
     if uploaded_file is not None:
-        # 生成唯一ID
-        file_id = str(uuid.uuid4())[:8]
         # 确保文件名是安全的
         safe_filename = ''.join(c for c in uploaded_file.name if c.isalnum() or c in '._-')
-        # 构建资源路径
-        resource_path = resource_dir / f"{file_id}_{safe_filename}"
         
-        # 保存文件
-        with open(resource_path, "wb") as f:
-            f.write(uploaded_file.getbuffer())
+        # 预览可能已经读取过文件，从头开始写入
+        uploaded_file.seek(0)
+        resource_info = resource_store.add(
+            uploaded_file,
+            safe_filename,
+            resource_type,
+            session_id=st.session_state.session_id,
+            size_hint=uploaded_file.size
+        )
             
         # 添加到上传的资源列表
-        resource_info = {
-            "id": file_id,
-            "name": safe_filename,
-            "path": str(resource_path),
-            "type": resource_type,
-            "size": uploaded_file.size,
-            "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
-        }
         st.session_state.uploaded_resources.append(resource_info)
         return resource_info
     return None
 
+# 标记某个下载已被请求（只保留最近几个，限制每次重新运行需要发送的数据量）
+def prepare_download(key, path=None):
+    prepared = st.session_state.prepared_downloads
+    if key in prepared:
+        prepared.remove(key)
+    prepared.append(key)
+    del prepared[:-config.DOWNLOAD_PREPARED_MAX]
+    # 更新应用的最近使用时间，存储清理时优先保留
+    if path:
+        get_artifact_store().touch(path)
+
+# 渲染按需读取的下载按钮：只有用户请求下载后才读取归档内容
+def render_download_button(label, path, file_name, mime, key, help=None):
+    if key in st.session_state.prepared_downloads:
+        st.download_button(
+            label,
+            data=get_archive_cache().get(path),
+            file_name=file_name,
+            mime=mime,
+            help=help,
+            key=key,
+            use_container_width=True
+        )
+    else:
+        st.button(
+            f"准备{label}",
+            help=help,
+            key=f"prepare_{key}",
+            on_click=prepare_download,
+            args=(key, path),
+            use_container_width=True
+        )
+
 # 设置页面配置
 st.set_page_config(page_title=config.APP_TITLE, page_icon=config.APP_ICON, layout="wide")
 st.title(f"{config.APP_ICON} {config.APP_TITLE}")
@@ -101,22 +141,54 @@ with st.sidebar:
                           on_change=update_available_models,
                           key="api_key")
     
-    # 如果API端点或密钥已更改，尝试获取模型列表
-    if st.session_state.endpoint_changed and api_key and api_endpoint:
-        with st.spinner("正在获取可用模型..."):
-            try:
-                llm_handler = LLMHandler(api_key, api_endpoint)
-                models = llm_handler.get_available_models()
-                st.session_state.available_models = models
-                st.success(f"成功获取到 {len(models)} 个可用模型")
-            except Exception as e:
-                st.error(f"获取模型列表失败: {str(e)}")
-        st.session_state.endpoint_changed = False
+    # 模型目录在进程内缓存，所有会话共用：只有首次使用某个端点时等待请求，
+    # 之后直接读取缓存，过期的目录在后台刷新
+    model_catalog = get_model_catalog()
+    catalog_endpoint = normalize_endpoint(api_endpoint)
+    if api_key and api_endpoint:
+        if model_catalog.has_entry(catalog_endpoint, api_key):
+            catalog_entry = model_catalog.get(catalog_endpoint, api_key)
+        else:
+            with st.spinner("正在获取可用模型..."):
+                catalog_entry = model_catalog.get(catalog_endpoint, api_key)
+        st.session_state.available_models = catalog_entry["models"]
+        if st.session_state.endpoint_changed:
+            if catalog_entry["error"]:
+                st.error(f"获取模型列表失败: {catalog_entry['error']}")
+            else:
+                st.success(f"成功获取到 {len(catalog_entry['models'])} 个可用模型")
+    st.session_state.endpoint_changed = False
     
     # 模型选择
     model = st.selectbox("选择模型", 
                         options=st.session_state.available_models, 
                         index=min(1, len(st.session_state.available_models)-1) if len(st.session_state.available_models) > 1 else 0)
+    model_info = model_catalog.model_info(catalog_endpoint, api_key, model)
+    price = model_info["price"]
+    st.caption(f"上下文窗口 {model_info['context_window']} tokens"
+               + (f" · 每千tokens 输入 ${price['prompt']:g} / 输出 ${price['completion']:g}" if price else ""))
+    
+    # 生成缓存开关
+    use_cache = st.checkbox("使用生成缓存",
+                           value=config.GENERATION_CACHE_ENABLED,
+                           help="相同的需求、模型和参数直接复用之前的生成结果，不再调用API")
+    
+    # 并行候选数量
+    candidates = st.number_input("并行候选数",
+                                min_value=1,
+                                max_value=config.MAX_GENERATION_CANDIDATES,
+                                value=config.GENERATION_CANDIDATES,
+                                help="同时发起多个生成请求，采用最先通过代码质量检查的结果（会消耗更多tokens）")
+    
+    # 离线依赖包
+    include_wheelhouse = st.checkbox("启动包附带离线依赖",
+                                     value=config.WHEELHOUSE_ENABLED,
+                                     help="在启动包中附带目标平台的依赖wheel，首次启动无需联网安装（启动包会明显变大）")
+    wheelhouse_platforms = list(config.WHEELHOUSE_PLATFORMS)
+    if include_wheelhouse:
+        wheelhouse_platforms = st.multiselect("目标平台",
+                                              options=list(config.WHEELHOUSE_PLATFORMS),
+                                              default=list(config.WHEELHOUSE_PLATFORMS))
     
     st.divider()
     
@@ -207,6 +279,24 @@ with tab1:
         
     generate_button = st.button("生成应用", type="primary", use_container_width=True)
     
+    # 同步后台生成任务和部署任务的进度
+    active_job = None
+    deploy_job = None
+    running = False
+    if st.session_state.active_job:
+        active_job = get_job_manager().get(st.session_state.active_job)
+        if active_job is None:
+            st.session_state.active_job = None
+            st.query_params.pop("job", None)
+        else:
+            update_progress(**active_job["progress"])
+    if st.session_state.deploy_job:
+        deploy_job = get_job_manager().get(st.session_state.deploy_job)
+        if deploy_job is None:
+            st.session_state.deploy_job = None
+        else:
+            update_progress(**deploy_job["progress"])
+    
     # 显示详细进度
     if st.session_state.progress["stage"]:
         progress_bar = st.progress(st.session_state.progress["percent"])
@@ -235,201 +325,190 @@ with tab1:
             # 重置进度
             update_progress("准备", "正在初始化生成过程...", 0)
             
-            # 创建处理进度显示
-            with st.status("正在生成应用...", expanded=True) as status:
-                # 初始化LLM处理程序
-                llm_handler = LLMHandler(api_key, api_endpoint, model)
-                
-                # 阶段1：分析需求
-                update_progress("分析需求", "AI正在分析您的应用需求...", 10)
-                st.write("1. 正在分析您的需求...")
-                time.sleep(1)  # 模拟过程
-                
-                # 阶段2：生成代码
-                update_progress("生成代码", "AI正在为您的Streamlit应用生成代码...", 30)
-                st.write("2. 正在生成Streamlit应用代码...")
-                code_result = llm_handler.generate_code(
-                    app_name=app_name,
-                    app_description=app_description,
-                    app_type=app_type,
-                    language=language,
-                    complexity=complexity,
-                    ui_theme=ui_theme,
-                    resources=selected_resources
+            # 提交后台生成任务，脚本线程不再等待LLM
+            job_id = get_job_manager().submit(
+                "generate",
+                run_generation_job,
+                {
+                    "api_key": api_key,
+                    "api_endpoint": api_endpoint,
+                    "model": model,
+                    "use_cache": use_cache,
+                    "candidates": candidates,
+                    "include_wheelhouse": include_wheelhouse and bool(wheelhouse_platforms),
+                    "wheelhouse_platforms": wheelhouse_platforms,
+                    "app_name": app_name,
+                    "app_description": app_description,
+                    "app_type": app_type,
+                    "language": language,
+                    "complexity": complexity,
+                    "ui_theme": ui_theme,
+                    "resources": selected_resources
+                },
+                secret_keys=("api_key",)
+            )
+            st.session_state.active_job = job_id
+            st.query_params["job"] = job_id
+            st.rerun()
+    
+    # 显示后台生成任务的状态
+    if active_job:
+        running = active_job["status"] not in JobManager.FINISHED_STATUSES
+        
+        state = "running" if running else ("complete" if active_job["status"] == "succeeded" else "error")
+        label = {
+            "succeeded": "Streamlit应用生成完成！",
+            "cancelled": "应用生成已取消",
+            "interrupted": "应用生成已中断"
+        }.get(active_job["status"], "正在生成应用..." if running else "应用生成失败")
+        with st.status(label, expanded=running, state=state):
+            for event in active_job["events"]:
+                st.write(event)
+            st.caption(active_job["progress"]["details"])
+            if active_job["error"]:
+                st.error(active_job["error"])
+        
+        if running:
+            if st.button("取消生成", key="cancel_job"):
+                get_job_manager().cancel(active_job["id"])
+        else:
+            # 任务结束：先清除任务记录，再把结果写入会话状态。刷新页面后历史记录已从产物存储
+            # 加载了这个应用，按应用ID去重
+            st.session_state.active_job = None
+            st.query_params.pop("job", None)
+            if active_job["status"] == "succeeded":
+                result = active_job["result"]
+                st.session_state.current_app = result
+                if all(app.get("id") != result["id"] for app in st.session_state.history):
+                    st.session_state.history.append(result)
+        
+    # 显示结果和下载选项（放在生成逻辑之外，重新运行后仍然可见）
+    if st.session_state.current_app:
+        current_app_name = st.session_state.current_app["name"]
+        st.success(f"应用「{current_app_name}」已成功生成！")
+        
+        source_zip = st.session_state.current_app["source_zip"]
+        exe_path = st.session_state.current_app["exe_path"]
+        
+        st.subheader("下载选项")
+        col1, col2 = st.columns(2)
+        
+        # 源代码下载
+        with col1:
+            if os.path.exists(source_zip):
+                render_download_button(
+                    "下载源代码",
+                    source_zip,
+                    file_name=f"{current_app_name}_source.zip",
+                    mime="application/zip",
+                    key=f"current_src_{source_zip}",
+                    help="下载包含所有源代码的ZIP压缩包，您可以自行修改和运行"
                 )
-                
-                if not code_result["success"]:
-                    st.error(f"生成代码失败: {code_result.get('error', '未知错误')}")
-                    status.update(label="应用生成失败", state="error")
-                    update_progress("失败", f"生成失败: {code_result.get('error', '未知错误')}", 100)
-                else:
-                    app_dir = code_result["app_dir"]
-                    source_zip = code_result["source_zip"]
-                    
-                    # 阶段3：检查代码质量
-                    update_progress("代码检查", "正在检查生成的代码质量和潜在错误...", 60)
-                    st.write("3. 正在检查代码质量...")
-                    
-                    # 阶段4：创建启动器
-                    update_progress("创建启动器", "正在创建跨平台启动器...", 80)
-                    st.write("4. 正在打包应用...")
-                    packager = AppPackager()
-                    package_result = packager.package_app(
-                        app_dir=app_dir,
-                        app_name=app_name,
-                        app_type=app_type,
-                        language=language
-                    )
-                    
-                    if not package_result["success"]:
-                        st.warning(f"打包应用失败: {package_result.get('error', '未知错误')}")
-                        st.write("将只提供源代码下载。")
-                        exe_path = None
-                        update_progress("部分完成", "应用源代码已生成，但打包失败", 90)
-                    else:
-                        exe_path = package_result["exe_path"]
-                        st.write("5. 打包完成！")
-                        update_progress("完成", "您的Streamlit应用已成功生成并打包！", 100)
-                    
-                    # 更新会话状态
-                    app_info = {
-                        "name": app_name,
-                        "description": app_description[:100] + "..." if len(app_description) > 100 else app_description,
-                        "type": app_type,
-                        "language": language,
-                        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
-                        "source_zip": source_zip,
-                        "exe_path": exe_path,
-                        "resources": selected_resources
-                    }
-                    st.session_state.current_app = app_info
-                    st.session_state.history.append(app_info)
-                    
-                    status.update(label="Streamlit应用生成完成！", state="complete")
-            
-            # 显示结果和下载选项
-            if st.session_state.current_app:
-                st.success(f"应用「{app_name}」已成功生成！")
-                
-                source_zip = st.session_state.current_app["source_zip"]
-                exe_path = st.session_state.current_app["exe_path"]
-                
-                st.subheader("下载选项")
-                col1, col2 = st.columns(2)
-                
-                # 源代码下载
-                with col1:
-                    if os.path.exists(source_zip):
-                        with open(source_zip, "rb") as f:
-                            st.download_button(
-                                "下载源代码",
-                                data=f.read(),
-                                file_name=f"{app_name}_source.zip",
-                                mime="application/zip",
-                                help="下载包含所有源代码的ZIP压缩包，您可以自行修改和运行",
-                                use_container_width=True
-                            )
-                    else:
-                        st.error("源代码包丢失")
-                
-                # 启动包下载
-                with col2:
-                    if exe_path and os.path.exists(exe_path):
-                        with open(exe_path, "rb") as f:
-                            st.download_button(
-                                "下载智能启动包",
-                                data=f.read(),
-                                file_name=os.path.basename(exe_path),
-                                mime="application/octet-stream",
-                                help="下载智能启动包，自动配置环境并运行应用（支持自动安装Python及创建虚拟环境）",
-                                use_container_width=True
-                            )
-                    else:
-                        st.warning("启动包不可用")
+            else:
+                st.error("源代码包丢失")
+        
+        # 启动包下载
+        with col2:
+            if exe_path and os.path.exists(exe_path):
+                render_download_button(
+                    "下载智能启动包",
+                    exe_path,
+                    file_name=os.path.basename(exe_path),
+                    mime="application/octet-stream",
+                    key=f"current_exe_{exe_path}",
+                    help="下载智能启动包，自动配置环境并运行应用（支持自动安装Python及创建虚拟环境）"
+                )
+            else:
+                st.warning("启动包不可用")
 
-                # 添加 GitHub 部署选项
-                st.subheader("GitHub 部署")
-                
-                if st.session_state.github_token:
-                    if st.session_state.github_deployment.get("status") == "success":
-                        # 已经成功部署
-                        st.success(f"应用已成功部署到 GitHub: {st.session_state.github_deployment.get('url', '')}")
-                        st.markdown(f"[查看仓库]({st.session_state.github_deployment.get('url', '')})")
-                    else:
-                        # 显示部署按钮
-                        if st.button("部署到 StreamlitForge 组织", type="primary", use_container_width=True):
-                            with st.status("正在部署到 GitHub...", expanded=True) as status:
-                                # 从源代码部署到 GitHub
-                                app_dir = os.path.join(os.path.dirname(source_zip), "app")
-                                if not os.path.exists(app_dir):
-                                    # 如果app目录不存在，尝试解压源代码包
-                                    temp_dir = tempfile.mkdtemp()
-                                    shutil.unpack_archive(source_zip, temp_dir, 'zip')
-                                    app_dir = temp_dir
-                                
-                                # 调用 GitHub 部署函数
-                                deploy_result = deploy_to_github(
-                                    app_dir=app_dir,
-                                    app_name=app_name,
-                                    github_token=st.session_state.github_token
-                                )
-                                
-                                if deploy_result["success"]:
-                                    st.session_state.github_deployment = {
-                                        "status": "success",
-                                        "url": deploy_result["repo_url"],
-                                        "repo_name": deploy_result["repo_name"]
-                                    }
-                                    status.update(label=f"成功部署到 GitHub！", state="complete")
-                                    st.success(f"应用已成功部署到 GitHub 组织 StreamlitForge")
-                                    st.markdown(f"[查看仓库]({deploy_result['repo_url']})")
-                                else:
-                                    st.session_state.github_deployment = {
-                                        "status": "failed",
-                                        "error": deploy_result.get("error", "未知错误")
-                                    }
-                                    status.update(label="GitHub 部署失败", state="error")
-                                    st.error(f"部署失败: {deploy_result.get('error', '未知错误')}")
-                else:
-                    st.warning("请在侧边栏中配置 GitHub 访问令牌以启用部署功能")
-                    st.info("如何获取 GitHub 访问令牌: \n1. 登录 GitHub \n2. 进入 Settings > Developer Settings > Personal access tokens \n3. 创建一个带有 `repo` 和 `workflow` 权限的令牌")
+        # 添加 GitHub 部署选项
+        st.subheader("GitHub 部署")
+        
+        # 部署任务结束：把结果写入会话状态
+        deploying = deploy_job is not None and deploy_job["status"] not in JobManager.FINISHED_STATUSES
+        if deploy_job is not None and not deploying:
+            if deploy_job["status"] == "succeeded":
+                st.session_state.github_deployment = {
+                    "status": "success",
+                    "url": deploy_job["result"]["repo_url"],
+                    "repo_name": deploy_job["result"]["repo_name"]
+                }
+            else:
+                st.session_state.github_deployment = {
+                    "status": "failed",
+                    "error": deploy_job["error"] or "部署已中断"
+                }
+            st.session_state.deploy_job = None
+        
+        if st.session_state.github_token:
+            if st.session_state.github_deployment.get("status") == "success":
+                # 已经成功部署
+                st.success(f"应用已成功部署到 GitHub: {st.session_state.github_deployment.get('url', '')}")
+                st.markdown(f"[查看仓库]({st.session_state.github_deployment.get('url', '')})")
+            elif deploying:
+                # 部署在后台任务中进行，脚本定期重新运行以刷新进度
+                running = True
+                with st.status("正在部署到 GitHub...", expanded=True):
+                    for event in deploy_job["events"]:
+                        st.write(event)
+                    st.caption(deploy_job["progress"]["details"])
+            else:
+                if st.session_state.github_deployment.get("status") == "failed":
+                    st.error(st.session_state.github_deployment.get("error", "未知错误"))
+                # 显示部署按钮
+                if st.button("部署到 StreamlitForge 组织", type="primary", use_container_width=True):
+                    update_progress("GitHub 部署", f"正在部署到 {config.GITHUB_ORG} 组织...", 85)
+                    st.session_state.deploy_job = get_job_manager().submit(
+                        "deploy",
+                        run_deploy_job,
+                        {
+                            "github_token": st.session_state.github_token,
+                            "app_name": current_app_name,
+                            "source_zip": source_zip
+                        },
+                        secret_keys=("github_token",)
+                    )
+                    st.rerun()
+        else:
+            st.warning("请在侧边栏中配置 GitHub 访问令牌以启用部署功能")
+            st.info("如何获取 GitHub 访问令牌: \n1. 登录 GitHub \n2. 进入 Settings > Developer Settings > Personal access tokens \n3. 创建一个带有 `repo` 和 `workflow` 权限的令牌")
 
-                # 使用说明
-                with st.expander("使用说明", expanded=True):
-                    st.markdown("""
-                    ### 如何运行您的Streamlit应用
-                    
-                    #### 方法1：使用智能启动包（推荐）
-                    1. 下载"智能启动包"并解压到任意位置
-                    2. 打开解压后的文件夹，查看"启动说明.html"获取详细帮助
-                    3. Windows用户：双击运行"启动应用.bat"
-                    4. Mac/Linux用户：打开终端，给"启动应用.sh"添加执行权限，然后运行
-                       ```
-                       chmod +x 启动应用.sh
-                       ./启动应用.sh
-                       ```
-                    5. 启动器会自动检查您的系统环境：
-                       - 如果没有安装Python，会尝试自动下载并安装
-                       - 自动创建虚拟环境并安装所需依赖
-                       - 启动应用并在浏览器中打开
-                    
-                    #### 方法2：从源代码手动运行
-                    1. 下载"源代码"并解压
-                    2. 确保您已安装Python 3.7+
-                    3. 打开命令行，进入解压后的目录
-                    4. 创建并激活虚拟环境（推荐）：
-                       ```
-                       # Windows
-                       python -m venv venv
-                       venv\\Scripts\\activate
-                       
-                       # Mac/Linux
-                       python3 -m venv venv
-                       source venv/bin/activate
-                       ```
-                    5. 安装依赖：`pip install -r requirements.txt`
-                    6. 运行应用：`streamlit run app.py`
-                    """)
+        # 使用说明
+        with st.expander("使用说明", expanded=True):
+            st.markdown("""
+            ### 如何运行您的Streamlit应用
+            
+            #### 方法1：使用智能启动包（推荐）
+            1. 下载"智能启动包"并解压到任意位置
+            2. 打开解压后的文件夹，查看"启动说明.html"获取详细帮助
+            3. Windows用户：双击运行"启动应用.bat"
+            4. Mac/Linux用户：打开终端，给"启动应用.sh"添加执行权限，然后运行
+               ```
+               chmod +x 启动应用.sh
+               ./启动应用.sh
+               ```
+            5. 启动器会自动检查您的系统环境：
+               - 如果没有安装Python，会尝试自动下载并安装
+               - 自动创建虚拟环境并安装所需依赖
+               - 启动应用并在浏览器中打开
+            
+            #### 方法2：从源代码手动运行
+            1. 下载"源代码"并解压
+            2. 确保您已安装Python 3.7+
+            3. 打开命令行，进入解压后的目录
+            4. 创建并激活虚拟环境（推荐）：
+               ```
+               # Windows
+               python -m venv venv
+               venv\\Scripts\\activate
+               
+               # Mac/Linux
+               python3 -m venv venv
+               source venv/bin/activate
+               ```
+            5. 安装依赖：`pip install -r requirements.txt`
+            6. 运行应用：`streamlit run app.py`
+            """)
 
 # 资源管理选项卡
 with tab2:
@@ -446,9 +525,14 @@ with tab2:
                                             help="支持PNG、JPG、GIF和SVG格式", key="image_uploader")
             if st.button("添加图片", key="add_image"):
                 if uploaded_file:
-                    resource = handle_uploaded_resource(uploaded_file, "图片")
+                    try:
+                        resource = handle_uploaded_resource(uploaded_file, "图片")
+                    except ResourceQuotaExceeded as e:
+                        resource = None
+                        st.error(str(e))
                     if resource:
-                        st.success(f"图片 {resource['name']} 上传成功！")
+                        st.success(f"图片 {resource['name']} 上传成功！"
+                                   + ("（与已上传的内容相同，未占用额外空间）" if resource["deduplicated"] else ""))
                 else:
                     st.error("请先选择要上传的图片")
                     
@@ -457,9 +541,14 @@ with tab2:
                                            help="支持CSV、Excel、JSON和文本文件", key="data_uploader")
             if st.button("添加数据", key="add_data"):
                 if uploaded_file:
-                    resource = handle_uploaded_resource(uploaded_file, "数据")
+                    try:
+                        resource = handle_uploaded_resource(uploaded_file, "数据")
+                    except ResourceQuotaExceeded as e:
+                        resource = None
+                        st.error(str(e))
                     if resource:
-                        st.success(f"数据文件 {resource['name']} 上传成功！")
+                        st.success(f"数据文件 {resource['name']} 上传成功！"
+                                   + ("（与已上传的内容相同，未占用额外空间）" if resource["deduplicated"] else ""))
                 else:
                     st.error("请先选择要上传的数据文件")
                     
@@ -467,9 +556,14 @@ with tab2:
             uploaded_file = st.file_uploader("上传其他文件", type=None, key="other_uploader")
             if st.button("添加文件", key="add_other"):
                 if uploaded_file:
-                    resource = handle_uploaded_resource(uploaded_file, "其他")
+                    try:
+                        resource = handle_uploaded_resource(uploaded_file, "其他")
+                    except ResourceQuotaExceeded as e:
+                        resource = None
+                        st.error(str(e))
                     if resource:
-                        st.success(f"文件 {resource['name']} 上传成功！")
+                        st.success(f"文件 {resource['name']} 上传成功！"
+                                   + ("（与已上传的内容相同，未占用额外空间）" if resource["deduplicated"] else ""))
                 else:
                     st.error("请先选择要上传的文件")
     
@@ -477,33 +571,19 @@ with tab2:
         if upload_type == "图片" and uploaded_file:
             st.image(uploaded_file, caption="预览图片", use_column_width=True)
         elif upload_type == "数据" and uploaded_file:
-            if uploaded_file.name.endswith('.csv'):
-                try:
-                    import pandas as pd
-                    df = pd.read_csv(uploaded_file)
-                    st.dataframe(df.head(5))
-                except Exception as e:
-                    st.warning(f"无法预览CSV: {str(e)}")
-            elif uploaded_file.name.endswith('.xlsx'):
-                try:
-                    import pandas as pd
-                    df = pd.read_excel(uploaded_file)
-                    st.dataframe(df.head(5))
-                except Exception as e:
-                    st.warning(f"无法预览Excel: {str(e)}")
-            elif uploaded_file.name.endswith('.json'):
-                try:
-                    data = json.loads(uploaded_file.getvalue())
-                    st.json(data)
-                except Exception as e:
-                    st.warning(f"无法预览JSON: {str(e)}")
+            # 只读取文件开头的样本，大文件的预览耗时也是固定的
+            profile = get_data_profiler().profile(uploaded_file, uploaded_file.name)
+            if profile["error"]:
+                st.warning(f"无法预览文件内容: {profile['error']}")
+            elif profile["preview"] is not None:
+                st.dataframe(profile["preview"])
+                st.caption(format_schema(profile)
+                           + ("（根据文件开头的样本推断）" if profile["truncated"] else ""))
             else:
-                try:
-                    content = uploaded_file.getvalue().decode('utf-8')
-                    st.text_area("文件内容预览", value=content[:500] + ("..." if len(content) > 500 else ""), 
-                               height=200, disabled=True)
-                except:
-                    st.warning("无法预览文件内容")
+                st.text_area("文件内容预览",
+                             value=profile["text"] + ("..." if profile["truncated"]
+                                                     or len(profile["text"]) >= config.PREVIEW_TEXT_CHARS else ""),
+                             height=200, disabled=True)
     
     # 已上传资源列表
     st.subheader("已上传的资源")
@@ -527,14 +607,11 @@ with tab2:
                 st.write(resource['type'])
             with col3:
                 if st.button("删除", key=f"del_{resource['id']}"):
-                    # 删除文件
-                    try:
-                        os.remove(resource['path'])
-                    except:
-                        pass
+                    # 删除引用，内容相同的其他资源和已生成的应用不受影响
+                    resource_store.release(resource, st.session_state.session_id)
                     # 从列表中移除
                     st.session_state.uploaded_resources.pop(i)
-                    st.experimental_rerun()
+                    st.rerun()
 
 # 历史记录页面
 with tab3:
@@ -561,129 +638,29 @@ with tab3:
                 col1, col2 = st.columns(2)
                 with col1:
                     if app["source_zip"] and os.path.exists(app["source_zip"]):
-                        with open(app["source_zip"], "rb") as f:
-                            st.download_button(
-                                f"下载源代码",
-                                data=f.read(),
-                                file_name=f"{app['name']}_source.zip",
-                                mime="application/zip",
-                                key=f"src_{i}",
-                                use_container_width=True
-                            )
+                        render_download_button(
+                            "下载源代码",
+                            app["source_zip"],
+                            file_name=f"{app['name']}_source.zip",
+                            mime="application/zip",
+                            key=f"src_{app['source_zip']}"
+                        )
                     else:
                         st.error("源代码不可用")
                         
                 with col2:
                     if app["exe_path"] and os.path.exists(app["exe_path"]):
-                        with open(app["exe_path"], "rb") as f:
-                            st.download_button(
-                                f"下载智能启动包",
-                                data=f.read(),
-                                file_name=os.path.basename(app["exe_path"]),
-                                mime="application/octet-stream",
-                                key=f"exe_{i}",
-                                use_container_width=True
-                            )
+                        render_download_button(
+                            "下载智能启动包",
+                            app["exe_path"],
+                            file_name=os.path.basename(app["exe_path"]),
+                            mime="application/octet-stream",
+                            key=f"exe_{app['exe_path']}"
+                        )
                     else:
                         st.warning("启动包不可用")
 
-# 部署到 GitHub 的函数
-def deploy_to_github(app_dir, app_name, github_token):
-    # 更新进度
-    update_progress("GitHub 部署", "正在部署到 StreamlitForge 组织...", 85)
-    
-    try:
-        # 规范化仓库名（移除空格，使用短横线分隔）
-        repo_name = app_name.lower().replace(" ", "-")
-        # 移除其他非法字符
-        repo_name = ''.join(c for c in repo_name if c.isalnum() or c == '-')
-        
-        # GitHub API 端点
-        api_url = "https://api.github.com"
-        headers = {
-            "Authorization": f"token {github_token}",
-            "Accept": "application/vnd.github.v3+json"
-        }
-        
-        # 1. 创建仓库
-        create_repo_url = f"{api_url}/orgs/StreamlitForge/repos"
-        repo_data = {
-            "name": repo_name,
-            "description": f"Streamlit 应用: {app_name}",
-            "private": False,
-            "auto_init": True
-        }
-        
-        response = requests.post(create_repo_url, headers=headers, json=repo_data)
-        
-        if response.status_code != 201:
-            return {"success": False, "error": f"创建仓库失败: {response.json().get('message', '未知错误')}"}
-        
-        # 仓库创建成功，获取仓库信息
-        repo_info = response.json()
-        repo_url = repo_info["html_url"]
-        
-        # 等待几秒钟，确保仓库初始化完成
-        time.sleep(2)
-        
-        # 2. 上传应用文件
-        files_to_upload = []
-        for root, dirs, files in os.walk(app_dir):
-            for file in files:
-                file_path = os.path.join(root, file)
-                rel_path = os.path.relpath(file_path, app_dir)
-                
-                # 读取文件内容
-                with open(file_path, 'rb') as f:
-                    content = f.read()
-                
-                files_to_upload.append({
-                    "path": rel_path,
-                    "content": content
-                })
-        
-        # 3. 逐个上传文件
-        for file_item in files_to_upload:
-            # 更新进度详情
-            update_progress("GitHub 部署", f"正在上传文件: {file_item['path']}", 90)
-            
-            upload_url = f"{api_url}/repos/StreamlitForge/{repo_name}/contents/{file_item['path']}"
-            
-            # 编码文件内容
-            content_b64 = base64.b64encode(file_item['content']).decode('utf-8')
-            
-            upload_data = {
-                "message": f"上传 {file_item['path']}",
-                "content": content_b64
-            }
-            
-            response = requests.put(upload_url, headers=headers, json=upload_data)
-            
-            if response.status_code not in [200, 201]:
-                return {"success": False, "error": f"上传文件 {file_item['path']} 失败: {response.json().get('message', '未知错误')}"}
-        
-        # 4. 创建 requirements.txt（如果不存在）
-        if not any(f['path'] == 'requirements.txt' for f in files_to_upload):
-            req_content = "streamlit>=1.22.0\npandas\nmatplotlib\n"
-            req_content_b64 = base64.b64encode(req_content.encode('utf-8')).decode('utf-8')
-            
-            req_upload_data = {
-                "message": "添加 requirements.txt",
-                "content": req_content_b64
-            }
-            
-            req_upload_url = f"{api_url}/repos/StreamlitForge/{repo_name}/contents/requirements.txt"
-            response = requests.put(req_upload_url, headers=headers, json=req_upload_data)
-        
-        # 部署完成
-        update_progress("完成", "应用已成功部署到 GitHub！", 100)
-        
-        return {
-            "success": True, 
-            "repo_url": repo_url,
-            "repo_name": repo_name,
-            "org": "StreamlitForge"
-        }
-        
-    except Exception as e:
-        return {"success": False, "error": str(e)}
+# 后台任务运行中时定期重新运行脚本以刷新进度（放在最后，保证所有选项卡都已渲染）
+if running:
+    time.sleep(config.JOB_POLL_INTERVAL)
+    st.rerun()
@@ -0,0 +1,259 @@
+"""
+ZIP归档写入器 - 从源目录和内存内容流式写入ZIP，并支持从已有归档原样复制压缩成员
+"""
+
+import os
+import struct
+import time
+import zipfile
+import zlib
+from pathlib import Path
+
+import config
+
+# ZIP格式常量
+LOCAL_HEADER = struct.Struct("<4s2B4HL2L2H")
+CENTRAL_HEADER = struct.Struct("<4s4B4HL2L5H2L")
+END_RECORD = struct.Struct("<4s4H2LH")
+LOCAL_SIGNATURE = b"PK\003\004"
+CENTRAL_SIGNATURE = b"PK\001\002"
+END_SIGNATURE = b"PK\005\006"
+FLAG_UTF8 = 0x800
+FLAG_DATA_DESCRIPTOR = 0x08
+ZIP32_LIMIT = 0xFFFFFFFF
+CHUNK_SIZE = 1024 * 1024
+
+
+class ZipMember:
+    """已写入归档的成员记录"""
+
+    __slots__ = ("name", "compress_type", "crc", "compress_size", "file_size",
+                 "header_offset", "date_time", "external_attr", "flags")
+
+    def __init__(self, name, compress_type, date_time, external_attr):
+        self.name = name
+        self.compress_type = compress_type
+        self.date_time = date_time
+        self.external_attr = external_attr
+        self.flags = FLAG_UTF8
+        self.crc = 0
+        self.compress_size = 0
+        self.file_size = 0
+        self.header_offset = 0
+
+
+class ZipArchiveWriter:
+    """
+    流式ZIP写入器
+
+    成员数据边读边压缩直接写入目标文件，不生成中间副本；已压缩格式的文件
+    （图片、xlsx等）使用ZIP_STORED；copy_archive 可把另一个归档的压缩数据
+    原样复制过来，避免重复压缩。
+    """
+
+    def __init__(self, zip_path):
+        """
+        参数:
+            zip_path (str/Path): 输出ZIP文件路径
+        """
+        self.zip_path = Path(zip_path)
+        self.members = []
+        self._names = set()
+        self._fp = open(self.zip_path, "wb")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self._fp.close()
+
+    def add_tree(self, source_dir, exclude=(), executables=()):
+        """
+        递归写入目录下的所有文件和子目录
+
+        参数:
+            source_dir (str/Path): 源目录
+            exclude (iterable): 需要跳过的相对路径
+            executables (iterable): 需要确保具有可执行权限的相对路径
+        """
+        source_dir = Path(source_dir)
+        exclude = set(exclude)
+        executables = set(executables)
+        for root, dirs, files in os.walk(source_dir):
+            dirs.sort()
+            root_path = Path(root)
+            for name in dirs:
+                rel_path = (root_path / name).relative_to(source_dir).as_posix()
+                if rel_path not in exclude:
+                    self.add_directory(rel_path, root_path / name)
+            for name in sorted(files):
+                rel_path = (root_path / name).relative_to(source_dir).as_posix()
+                if rel_path not in exclude:
+                    self.add_file(rel_path, root_path / name, executable=rel_path in executables)
+
+    def add_directory(self, arcname, source_path=None):
+        """写入目录条目"""
+        arcname = arcname.rstrip("/") + "/"
+        mtime = os.stat(source_path).st_mtime if source_path else time.time()
+        member = ZipMember(arcname, zipfile.ZIP_STORED, self._date_time(mtime), (0o40755 << 16) | 0x10)
+        self._write_member(member, iter(()))
+
+    def add_file(self, arcname, source_path, executable=False):
+        """从磁盘流式写入文件，保留原有权限"""
+        st = os.stat(source_path)
+        mode = (st.st_mode & 0o7777) | (0o755 if executable else 0)
+        member = ZipMember(arcname, self._compress_type_for(arcname), self._date_time(st.st_mtime),
+                           (mode | 0o100000) << 16)
+        with open(source_path, "rb") as f:
+            self._write_member(member, iter(lambda: f.read(CHUNK_SIZE), b""))
+
+    def add_bytes(self, arcname, data, executable=False):
+        """写入内存中生成的内容"""
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        mode = 0o100755 if executable else 0o100644
+        member = ZipMember(arcname, self._compress_type_for(arcname), self._date_time(time.time()), mode << 16)
+        self._write_member(member, iter((data,)))
+
+    def copy_archive(self, source_zip, exclude=(), executables=()):
+        """
+        把另一个ZIP归档中的成员原样复制过来（不解压、不重新压缩）
+
+        参数:
+            source_zip (str/Path): 源ZIP文件
+            exclude (iterable): 需要跳过的成员名
+            executables (iterable): 需要确保具有可执行权限的成员名
+
+        返回:
+            list: 复制的成员名列表
+        """
+        exclude = set(exclude)
+        executables = set(executables)
+        copied = []
+        with zipfile.ZipFile(source_zip) as zf, open(source_zip, "rb") as src:
+            for info in zf.infolist():
+                if info.filename in exclude or info.flag_bits & 0x1:
+                    continue
+                external_attr = info.external_attr
+                if info.filename in executables:
+                    external_attr |= (0o100755 << 16)
+                member = ZipMember(info.filename, info.compress_type, info.date_time, external_attr)
+                member.crc = info.CRC
+                member.compress_size = info.compress_size
+                member.file_size = info.file_size
+
+                # 跳过源归档中的本地文件头，定位到压缩数据
+                src.seek(info.header_offset)
+                header = LOCAL_HEADER.unpack(src.read(LOCAL_HEADER.size))
+                src.seek(header[-2] + header[-1], os.SEEK_CUR)
+
+                self._write_raw_member(member, src, info.compress_size)
+                copied.append(info.filename)
+        return copied
+
+    def close(self):
+        """写入中央目录并关闭文件"""
+        if self._fp.closed:
+            return
+        central_offset = self._fp.tell()
+        for member in self.members:
+            name = member.name.encode("utf-8")
+            dos_date, dos_time = self._dos_date_time(member.date_time)
+            self._fp.write(CENTRAL_HEADER.pack(
+                CENTRAL_SIGNATURE, 20, 3, 20, 0, member.flags, member.compress_type,
+                dos_time, dos_date, member.crc, member.compress_size, member.file_size,
+                len(name), 0, 0, 0, 0, member.external_attr, member.header_offset
+            ))
+            self._fp.write(name)
+        central_size = self._fp.tell() - central_offset
+        self._check_limit(central_offset + central_size)
+        count = len(self.members)
+        self._fp.write(END_RECORD.pack(END_SIGNATURE, 0, 0, count, count, central_size, central_offset, 0))
+        self._fp.close()
+
+    def _write_member(self, member, chunks):
+        """写入本地文件头和（压缩后的）数据，然后回填CRC和大小"""
+        self._register(member)
+        header_offset = self._fp.tell()
+        self._write_local_header(member)
+        data_offset = self._fp.tell()
+
+        compressor = None
+        if member.compress_type == zipfile.ZIP_DEFLATED:
+            compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+
+        crc = 0
+        file_size = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            self._fp.write(compressor.compress(chunk) if compressor else chunk)
+        if compressor:
+            self._fp.write(compressor.flush())
+
+        member.crc = crc
+        member.file_size = file_size
+        member.compress_size = self._fp.tell() - data_offset
+        self._check_limit(member.file_size, member.compress_size, self._fp.tell())
+
+        # 回填本地文件头
+        end_offset = self._fp.tell()
+        self._fp.seek(header_offset)
+        self._write_local_header(member)
+        self._fp.seek(end_offset)
+
+    def _write_raw_member(self, member, src, length):
+        """写入已压缩的原始数据"""
+        self._register(member)
+        self._write_local_header(member)
+        remaining = length
+        while remaining > 0:
+            chunk = src.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                raise ValueError(f"源归档中的成员数据不完整: {member.name}")
+            self._fp.write(chunk)
+            remaining -= len(chunk)
+        self._check_limit(self._fp.tell())
+
+    def _register(self, member):
+        if member.name in self._names:
+            raise ValueError(f"归档中已存在同名成员: {member.name}")
+        self._names.add(member.name)
+        member.header_offset = self._fp.tell()
+        member.flags &= ~FLAG_DATA_DESCRIPTOR
+        self.members.append(member)
+
+    def _write_local_header(self, member):
+        name = member.name.encode("utf-8")
+        dos_date, dos_time = self._dos_date_time(member.date_time)
+        self._fp.write(LOCAL_HEADER.pack(
+            LOCAL_SIGNATURE, 20, 0, member.flags, member.compress_type, dos_time, dos_date,
+            member.crc, member.compress_size, member.file_size, len(name), 0
+        ))
+        self._fp.write(name)
+
+    @staticmethod
+    def _compress_type_for(arcname):
+        """已压缩格式使用ZIP_STORED，其余使用ZIP_DEFLATED"""
+        suffix = Path(arcname).suffix.lower().lstrip(".")
+        if suffix in config.ZIP_STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED
+        return zipfile.ZIP_DEFLATED
+
+    @staticmethod
+    def _date_time(timestamp):
+        date_time = time.localtime(timestamp)[:6]
+        return max(date_time, (1980, 1, 1, 0, 0, 0))
+
+    @staticmethod
+    def _dos_date_time(date_time):
+        year, month, day, hour, minute, second = date_time
+        return (year - 1980) << 9 | month << 5 | day, hour << 11 | minute << 5 | second // 2
+
+    @staticmethod
+    def _check_limit(*values):
+        if any(value > ZIP32_LIMIT for value in values):
+            raise ValueError("归档大小超过ZIP格式4GB的限制")
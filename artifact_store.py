@@ -0,0 +1,331 @@
+"""
+产物存储 - 持久保存生成的应用，文件内容按哈希去重并在超出配额时按最近使用时间清理
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import config
+
+CHUNK_SIZE = 1024 * 1024
+# Linux上的 FICLONE ioctl，用于在支持的文件系统（btrfs、xfs等）上创建reflink
+FICLONE = 0x40049409
+
+
+def link_file(source_path, target_path):
+    """
+    以不复制数据的方式把文件放到目标位置：优先硬链接，其次reflink，最后才复制
+
+    参数:
+        source_path (str/Path): 源文件
+        target_path (str/Path): 目标路径（不能已存在）
+
+    返回:
+        str: 使用的方式，'hardlink'、'reflink' 或 'copy'
+    """
+    try:
+        os.link(source_path, target_path)
+        return "hardlink"
+    except OSError:
+        pass
+
+    try:
+        import fcntl
+        with open(source_path, "rb") as src, open(target_path, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+        shutil.copystat(source_path, target_path)
+        return "reflink"
+    except (ImportError, OSError):
+        Path(target_path).unlink(missing_ok=True)
+
+    shutil.copy2(source_path, target_path)
+    return "copy"
+
+
+def replace_file(path, content):
+    """
+    写入文本文件：先写临时文件再替换目标
+
+    应用目录中的文件可能是共享blob的硬链接，直接以写模式打开会截断blob，改动所有引用它的应用
+
+    参数:
+        path (str/Path): 目标路径
+        content (str): 文件内容（UTF-8）
+    """
+    path = Path(path)
+    tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+class ArtifactStore:
+    """
+    持久化的应用产物存储
+
+    目录结构:
+        <root>/blobs/<哈希前两位>/<哈希>    按内容寻址的文件，所有应用共享
+        <root>/apps/<应用ID>/               应用工作区，提交后其中的文件都是blob的硬链接
+        <root>/apps/<应用ID>/manifest.json  应用清单（文件哈希、产物路径、应用信息）
+
+    因为工作区文件和blob是同一个inode，磁盘占用只随不同内容的数量增长；
+    blob的链接数降为1时说明已没有应用引用它，可以删除。资源存储的上传内容也放在同一个
+    blob目录中，但不计入本存储的配额，两者通过 lock 互斥地创建和删除链接。
+    """
+
+    MANIFEST_NAME = "manifest.json"
+
+    def __init__(self, root=config.ARTIFACT_ROOT, max_bytes=config.ARTIFACT_MAX_BYTES,
+                 workspace_ttl=config.ARTIFACT_WORKSPACE_TTL):
+        """
+        参数:
+            root (str/Path): 存储根目录
+            max_bytes (int): 存储占用的配额，超出后按最近使用时间清理应用
+            workspace_ttl (int): 未提交工作区（生成失败或进程中断）的保留时间（秒）
+        """
+        self.root = Path(root)
+        self.blobs_dir = self.root / "blobs"
+        self.apps_dir = self.root / "apps"
+        # 写入中的文件放在与blob同一文件系统的目录中，完成后可以直接 os.replace 为blob
+        self.tmp_dir = self.root / "tmp"
+        self.blobs_dir.mkdir(parents=True, exist_ok=True)
+        self.apps_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.workspace_ttl = workspace_ttl
+        self._lock = threading.RLock()
+
+    @property
+    def lock(self):
+        """保护blob目录的锁，在同一目录中创建或删除blob链接的其他存储（如资源存储）也要持有它"""
+        return self._lock
+
+    def create_workspace(self, app_name):
+        """
+        为一次生成创建工作区
+
+        参数:
+            app_name (str): 应用名称
+
+        返回:
+            tuple: (应用ID, 应用目录)；应用目录的上级目录用于存放ZIP包
+        """
+        app_id = f"{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:6]}"
+        app_dir = self.apps_dir / app_id / app_name
+        app_dir.mkdir(parents=True)
+        return app_id, app_dir
+
+    def discard(self, app_id):
+        """删除未提交或不再需要的工作区"""
+        with self._lock:
+            shutil.rmtree(self.apps_dir / app_id, ignore_errors=True)
+
+    def commit(self, app_id, metadata):
+        """
+        把工作区中的文件存入blob存储并写入清单，然后按配额清理旧应用
+
+        参数:
+            app_id (str): 应用ID
+            metadata (dict): 应用信息（与会话历史记录的格式一致）
+
+        返回:
+            dict: 应用清单
+        """
+        workspace = self.apps_dir / app_id
+        files = {}
+        with self._lock:
+            for path in sorted(workspace.rglob("*")):
+                if path.is_file() and path.name != self.MANIFEST_NAME:
+                    files[path.relative_to(workspace).as_posix()] = self._ingest(path)
+
+            now = time.time()
+            manifest = {
+                "id": app_id,
+                "created": now,
+                "last_access": now,
+                "files": files,
+                "metadata": dict(metadata, id=app_id)
+            }
+            self._write_manifest(app_id, manifest)
+            self.collect_garbage(keep=app_id)
+        return manifest
+
+    def touch(self, path):
+        """标记某个应用刚被使用（如下载），path 为应用中的任意文件路径"""
+        try:
+            app_id = Path(path).resolve().relative_to(self.apps_dir.resolve()).parts[0]
+        except (ValueError, IndexError):
+            return
+        with self._lock:
+            manifest = self._read_manifest(app_id)
+            if manifest is not None:
+                manifest["last_access"] = time.time()
+                self._write_manifest(app_id, manifest)
+
+    def list_history(self):
+        """
+        返回所有已提交应用的信息，按创建时间从旧到新排列
+
+        返回:
+            list: 应用信息列表，只包含产物文件仍然存在的应用
+        """
+        history = []
+        with self._lock:
+            for manifest in self._manifests():
+                metadata = manifest["metadata"]
+                if metadata.get("source_zip") and os.path.exists(metadata["source_zip"]):
+                    history.append((manifest["created"], metadata))
+        return [metadata for _, metadata in sorted(history, key=lambda item: item[0])]
+
+    def usage(self):
+        """已提交应用占用的字节数（每个不同的内容只计算一次，不含资源存储的上传内容）"""
+        with self._lock:
+            manifests = self._manifests()
+            return self._usage(manifests, self._blob_refs(manifests))
+
+    @staticmethod
+    def _blob_refs(manifests):
+        """统计各blob被多少个应用引用：{blob名: [引用数, 字节数]}"""
+        refs = {}
+        for manifest in manifests:
+            for entry in manifest["files"].values():
+                if entry["blob"]:
+                    refs.setdefault(entry["blob"], [0, entry["size"]])[0] += 1
+        return refs
+
+    @staticmethod
+    def _usage(manifests, refs):
+        usage = sum(size for _, size in refs.values())
+        # 不支持硬链接的文件系统上，文件留在工作区中单独计算
+        usage += sum(entry["size"] for m in manifests for entry in m["files"].values() if not entry["blob"])
+        return usage
+
+    def collect_garbage(self, keep=None):
+        """
+        清理过期的未提交工作区和无人引用的blob，占用超出配额时按最近使用时间删除应用
+
+        参数:
+            keep (str): 不会被删除的应用ID（通常是刚提交的应用）
+
+        返回:
+            int: 释放的字节数
+        """
+        freed = 0
+        with self._lock:
+            now = time.time()
+            for workspace in self.apps_dir.iterdir():
+                if not (workspace / self.MANIFEST_NAME).exists() \
+                        and now - workspace.stat().st_mtime > self.workspace_ttl:
+                    shutil.rmtree(workspace, ignore_errors=True)
+
+            # 只按应用引用的内容计算占用：被上传资源同时引用的blob删除应用后虽然仍留在磁盘上，
+            # 但已不再属于任何应用，不能让它们使清理一直进行下去
+            manifests = self._manifests()
+            refs = self._blob_refs(manifests)
+            usage = self._usage(manifests, refs)
+            for manifest in sorted(manifests, key=lambda m: m["last_access"]):
+                if usage <= self.max_bytes:
+                    break
+                if manifest["id"] == keep:
+                    continue
+                shutil.rmtree(self.apps_dir / manifest["id"], ignore_errors=True)
+                for entry in manifest["files"].values():
+                    if not entry["blob"]:
+                        usage -= entry["size"]
+                        continue
+                    ref = refs[entry["blob"]]
+                    ref[0] -= 1
+                    if ref[0] == 0:
+                        usage -= ref[1]
+                freed += self._release_blobs(manifest["files"].values())
+                freed += sum(entry["size"] for entry in manifest["files"].values() if not entry["blob"])
+
+            freed += self._release_blobs()
+        return freed
+
+    def _ingest(self, path):
+        """把文件换成对应blob的硬链接，内容已存在时复用已有的blob"""
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        st = path.stat()
+        executable = bool(st.st_mode & 0o111)
+        # 硬链接共享权限位，可执行与不可执行的相同内容分开存储
+        blob_name = digest.hexdigest() + (".x" if executable else "")
+        blob_path = self.blobs_dir / blob_name[:2] / blob_name
+        blob_path.parent.mkdir(exist_ok=True)
+
+        try:
+            if not blob_path.exists():
+                os.link(path, blob_path)
+            elif not os.path.samefile(path, blob_path):
+                tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:6]}.tmp")
+                os.link(blob_path, tmp_path)
+                os.replace(tmp_path, path)
+        except OSError:
+            # 文件系统不支持硬链接时文件留在工作区中，不参与去重
+            return {"sha256": digest.hexdigest(), "blob": None, "size": st.st_size}
+        return {"sha256": digest.hexdigest(), "blob": blob_name, "size": st.st_size}
+
+    def _release_blobs(self, entries=None):
+        """删除没有应用再引用的blob（链接数为1），entries 为空时检查全部blob"""
+        if entries is None:
+            paths = self.blobs_dir.glob("*/*")
+        else:
+            paths = (self.blobs_dir / entry["blob"][:2] / entry["blob"] for entry in entries if entry["blob"])
+
+        released = 0
+        for path in paths:
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if st.st_nlink == 1:
+                path.unlink()
+                released += st.st_size
+        return released
+
+    def _manifests(self):
+        manifests = []
+        for workspace in self.apps_dir.iterdir():
+            manifest = self._read_manifest(workspace.name)
+            if manifest is not None:
+                manifests.append(manifest)
+        return manifests
+
+    def _read_manifest(self, app_id):
+        try:
+            with open(self.apps_dir / app_id / self.MANIFEST_NAME, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_manifest(self, app_id, manifest):
+        path = self.apps_dir / app_id / self.MANIFEST_NAME
+        tmp_path = path.with_name(f"{self.MANIFEST_NAME}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_artifact_store():
+    """获取进程内共享的产物存储"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArtifactStore()
+        return _default_store
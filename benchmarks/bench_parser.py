@@ -0,0 +1,202 @@
+"""
+响应解析器的模糊测试和吞吐量基准
+
+生成大型的合成模型输出（多种文件头写法、CRLF、字符串中嵌入的围栏、未闭合的代码块），
+检查把输入随机切分后流式解析的结果与一次解析完整文本（正则快速路径）的结果相同，
+并比较快速路径、状态机和旧的正则解析方式的吞吐量。
+
+用法:
+    python benchmarks/bench_parser.py
+    python benchmarks/bench_parser.py --iterations 500 --size-mb 8 --seed 1
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from response_parser import FileBlockParser, files_with_fallback, parse_files  # noqa: E402
+
+HEADER_STYLES = [
+    "文件: {name}",
+    "文件：{name}",
+    "File: {name}",
+    "### {name}",
+    "**{name}**",
+    "## 文件: `{name}`",
+]
+
+
+def random_code(rng, lines):
+    """生成一段Python代码，偶尔在字符串中嵌入markdown代码块"""
+    body = ["import streamlit as st", ""]
+    for i in range(lines):
+        roll = rng.random()
+        if roll < 0.02:
+            body += ['st.markdown("""', "示例:", "```python", f"print({i})", "```", '""")']
+        elif roll < 0.05:
+            body.append("")
+        elif roll < 0.07:
+            body.append("x = '" + "a" * rng.randint(200, 2000) + "'")
+        else:
+            body.append(f"{'    ' * rng.randint(0, 3)}value_{i} = compute({i}, 'text {i}')")
+    return "\n".join(body)
+
+
+def synthetic_response(rng, files, lines_per_file, crlf=False, truncate=False):
+    """
+    生成一段合成的模型输出
+
+    返回:
+        tuple: (输出文本, 期望的 [(文件名, 内容)])
+    """
+    parts = ["好的，下面是完整的应用代码。", ""]
+    expected = []
+    for index in range(files):
+        name = "app.py" if index == 0 else f"modules/module_{index}.py"
+        content = random_code(rng, lines_per_file)
+        parts += [rng.choice(HEADER_STYLES).format(name=name), "", "```python", content, "```", ""]
+        parts.append(rng.choice(["", "这个模块负责数据处理。", "说明: 使用 `st.cache_data` 缓存结果。"]))
+        expected.append((name, content))
+    text = "\n".join(parts)
+    if truncate:
+        # 在最后一个文件中间截断
+        text = text[:len(text) - len(expected[-1][1]) // 2]
+        expected.pop()
+    if crlf:
+        text = text.replace("\n", "\r\n")
+    return text, expected
+
+
+def parse_streaming(text, rng):
+    """把输入随机切分成片段流式解析"""
+    parser = FileBlockParser()
+    position = 0
+    while position < len(text):
+        size = rng.choice([1, 2, 7, 64, 512, 4096])
+        parser.feed(text[position:position + size])
+        position += size
+    parser.close()
+    return files_with_fallback(parser, text)
+
+
+def parse_state_machine(content):
+    """一次输入完整文本的状态机解析（流式解析使用的方式）"""
+    parser = FileBlockParser()
+    parser.feed(content)
+    parser.close()
+    return files_with_fallback(parser, content)
+
+
+def legacy_parse(content):
+    """旧的多次正则扫描解析方式，用于比较吞吐量"""
+    files_data = [{"name": n.strip(), "content": c.strip()}
+                  for n, c in re.findall(r'文件: (.+?)\n```(?:.*?)\n(.*?)```', content, re.DOTALL)]
+    if not files_data:
+        files_data = [{"name": n.strip(), "content": c.strip()}
+                      for n, c in re.findall(r'File: (.+?)\n```(?:.*?)\n(.*?)```', content, re.DOTALL)]
+    if not files_data:
+        code_blocks = re.findall(r'```(?:.*?)\n(.*?)```', content, re.DOTALL)
+        if code_blocks:
+            files_data = [{"name": "app.py", "content": code_blocks[0].strip()}]
+    if not files_data and "import streamlit" in content:
+        files_data = [{"name": "app.py", "content": content}]
+    return files_data
+
+
+def mutate(text, rng):
+    """随机插入围栏、文件头、CRLF和删除片段，生成不规则的输入"""
+    fragments = ["```", "```python", "\n```\n", "文件: x.py\n", "### y.py\n", "\r\n", "~~~", "`", "\n"]
+    chars = list(text)
+    for _ in range(rng.randint(1, 20)):
+        position = rng.randint(0, len(chars))
+        if rng.random() < 0.8:
+            chars[position:position] = rng.choice(fragments)
+        else:
+            del chars[position:position + rng.randint(1, 50)]
+    return "".join(chars)
+
+
+def run_fuzz(iterations, rng):
+    """检查流式解析与完整解析一致，以及规则输入的解析结果正确"""
+    mismatches = 0
+    wrong = 0
+    for i in range(iterations):
+        text, expected = synthetic_response(
+            rng, rng.randint(1, 6), rng.randint(5, 80), crlf=rng.random() < 0.3, truncate=rng.random() < 0.2)
+        if [(f["name"], f["content"]) for f in parse_files(text)] != \
+                [(name, content.strip()) for name, content in expected] and expected:
+            # CRLF输入的内容中不应残留 \r
+            wrong += 1
+
+        for candidate in (text, mutate(text, rng)):
+            if parse_streaming(candidate, rng) != parse_files(candidate):
+                mismatches += 1
+    return {"iterations": iterations, "stream_mismatches": mismatches, "wrong_results": wrong}
+
+
+def measure(function, text, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(text)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run_throughput(size_mb, rng, repeat):
+    """大型输出上各解析方式的吞吐量（MB/s）"""
+    lines = 200
+    text, _ = synthetic_response(rng, 1, lines)
+    per_file = len(text.encode("utf-8"))
+    files = max(1, int(size_mb * 1024 * 1024 / per_file))
+    cases = {
+        "well_formed": synthetic_response(rng, files, lines)[0],
+        "crlf": synthetic_response(rng, files, lines, crlf=True)[0],
+        # 没有文件头且最后一个代码块未闭合，旧方式的每个回退都要重新扫描全文
+        "unterminated": "说明\n" + "\n".join(["```python", random_code(rng, lines * files)]),
+    }
+
+    results = {}
+    for name, case in cases.items():
+        megabytes = len(case.encode("utf-8")) / (1024 * 1024)
+        parser_time = measure(parse_files, case, repeat)
+        state_machine_time = measure(parse_state_machine, case, repeat)
+        legacy_time = measure(legacy_parse, case, repeat)
+        results[name] = {
+            "size_mb": round(megabytes, 2),
+            "parser_mb_s": round(megabytes / parser_time, 1),
+            "state_machine_mb_s": round(megabytes / state_machine_time, 1),
+            "legacy_mb_s": round(megabytes / legacy_time, 1),
+        }
+    return results
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="响应解析器的模糊测试和吞吐量基准")
+    arg_parser.add_argument("--iterations", type=int, default=200, help="模糊测试的输入数量")
+    arg_parser.add_argument("--size-mb", type=float, default=4, help="吞吐量测试的输入大小（MB）")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="吞吐量测试的重复次数（取最快一次）")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    rng = random.Random(args.seed)
+    fuzz = run_fuzz(args.iterations, rng)
+    print(f"模糊测试: {fuzz['iterations']} 个输入，流式与完整解析不一致 {fuzz['stream_mismatches']} 次，"
+          f"规则输入解析错误 {fuzz['wrong_results']} 次")
+
+    print(f"{'输入':<14}{'大小(MB)':>10}{'快速路径(MB/s)':>16}{'状态机(MB/s)':>16}{'旧正则(MB/s)':>14}")
+    for name, result in run_throughput(args.size_mb, rng, args.repeat).items():
+        print(f"{name:<14}{result['size_mb']:>10}{result['parser_mb_s']:>16}"
+              f"{result['state_machine_mb_s']:>16}{result['legacy_mb_s']:>14}")
+
+    if fuzz["stream_mismatches"] or fuzz["wrong_results"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,590 @@
+"""
+生成 → 检查 → 打包 流水线的端到端基准
+
+用本地模拟的OpenAI服务器回放合成的模型输出（默认不限速，只测量流水线自身的开销），
+对不同规模的应用和不同大小的上传资源（1KB到500MB）重复执行
+上传资源 → LLMHandler.generate_code → AppPackager.package_app → 提交到产物存储，
+报告每个阶段的耗时分位数、写入的字节数、峰值内存（RSS）和临时磁盘占用，
+并把结果保存为JSON，可与之前提交的结果比较。
+
+阶段耗时通过在运行期间包装 LLMHandler、AppPackager 等的方法得到；写入字节数来自
+/proc/self/io 的 wchar（进程级计数，并发大于1时各阶段的字节数会互相混入，
+每个用例的总量仍然准确）。所有数据写入独立的工作目录，结束后删除。
+
+用法:
+    python benchmarks/bench_pipeline.py
+    python benchmarks/bench_pipeline.py --apps small,large --sizes 1KB,50MB --runs 10 --concurrency 4
+    python benchmarks/bench_pipeline.py --sizes 500MB --payload binary --compare .cache/benchmarks/old.json
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import logging
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# 合成应用的规模：(模块数, 每个模块的函数数, 复杂度)
+APP_SIZES = {
+    "small": (0, 0, "简单"),
+    "medium": (8, 6, "中等"),
+    "large": (30, 8, "复杂"),
+}
+SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+# 被包装计时的方法：(阶段名, 模块, 类, 方法)
+STAGES = [
+    ("upload", "resource_store", "ResourceStore", "add"),
+    ("generate_code", "llm_handler", "LLMHandler", "generate_code"),
+    ("profile_resources", "llm_handler", "LLMHandler", "_describe_schema"),
+    ("plan_prompt", "llm_handler", "LLMHandler", "_plan_prompt"),
+    ("llm_stream", "llm_handler", "LLMHandler", "_generate_streaming"),
+    ("llm_complete", "llm_handler", "LLMHandler", "_complete"),
+    ("parse", "llm_handler", "LLMHandler", "_parse_code_from_response"),
+    ("check", "llm_handler", "LLMHandler", "_check_code_quality"),
+    ("save_files", "llm_handler", "LLMHandler", "_save_generated_files"),
+    ("requirements", "llm_handler", "LLMHandler", "_create_requirements_file"),
+    ("readme", "llm_handler", "LLMHandler", "_create_readme"),
+    ("launcher", "llm_handler", "LLMHandler", "_create_launcher"),
+    ("source_zip", "llm_handler", "LLMHandler", "_create_zip_archive"),
+    ("package_app", "packager", "AppPackager", "package_app"),
+    ("launcher_package", "packager", "AppPackager", "_create_launcher_package"),
+    ("commit", "artifact_store", "ArtifactStore", "commit"),
+]
+
+
+def parse_size(text):
+    """解析 1KB、50MB 这样的大小"""
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size):
+    for unit in ("GB", "MB", "KB"):
+        if size >= SIZE_UNITS[unit]:
+            return f"{size / SIZE_UNITS[unit]:g}{unit}"
+    return f"{size}B"
+
+
+def percentile(values, q):
+    """最近秩法的分位数"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def read_io_counters():
+    """进程的读写字节数（rchar/wchar），不支持时返回0"""
+    try:
+        with open("/proc/self/io", "r") as f:
+            counters = dict(line.split(":") for line in f.read().splitlines())
+        return {"rchar": int(counters["rchar"]), "wchar": int(counters["wchar"])}
+    except (OSError, KeyError, ValueError):
+        return {"rchar": 0, "wchar": 0}
+
+
+def read_rss():
+    """(当前RSS, 峰值RSS)，单位字节；不支持 /proc 时返回 (0, ru_maxrss)"""
+    values = {}
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    name, value = line.split(":")
+                    values[name] = int(value.split()[0]) * 1024
+    except OSError:
+        pass
+    if "VmHWM" not in values:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS上单位是字节，Linux上是KB
+        values["VmHWM"] = peak if sys.platform == "darwin" else peak * 1024
+    return values.get("VmRSS", 0), values["VmHWM"]
+
+
+def reset_peak_rss():
+    """重置峰值RSS（Linux 4.0+），成功时返回 True"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def disk_usage(paths):
+    """目录占用的磁盘空间（按块计算，硬链接只计算一次）"""
+    seen = set()
+    total = 0
+    for path in paths:
+        for directory, _, files in os.walk(path):
+            for name in files:
+                try:
+                    st = os.lstat(os.path.join(directory, name))
+                except FileNotFoundError:
+                    continue
+                if (st.st_dev, st.st_ino) in seen:
+                    continue
+                seen.add((st.st_dev, st.st_ino))
+                total += st.st_blocks * 512
+    return total
+
+
+class ResourceMonitor:
+    """后台线程定期采样RSS和工作目录的磁盘占用，记录峰值"""
+
+    def __init__(self, paths, interval=0.05):
+        self.paths = paths
+        self.interval = interval
+        self.peak_rss = 0
+        self.peak_disk = 0
+        self.baseline_disk = 0
+        self._stop = threading.Event()
+        self._thread = None
+        self._rss_reset = False
+
+    def __enter__(self):
+        self._rss_reset = reset_peak_rss()
+        self.baseline_disk = disk_usage(self.paths)
+        self.peak_disk = self.baseline_disk
+        self.peak_rss = read_rss()[0]
+        self._thread = threading.Thread(target=self._run, name="bench-monitor", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+        peak = read_rss()[1]
+        # 无法重置峰值时 VmHWM 是整个进程的峰值，只使用采样值
+        if self._rss_reset:
+            self.peak_rss = max(self.peak_rss, peak)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        self.peak_rss = max(self.peak_rss, read_rss()[0])
+        self.peak_disk = max(self.peak_disk, disk_usage(self.paths))
+
+
+class StageRecorder:
+    """把各阶段的耗时和写入字节数记到当前线程正在执行的那一次运行上"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def begin(self):
+        self._local.stages = {}
+
+    def end(self):
+        stages = self._local.stages
+        self._local.stages = None
+        return stages
+
+    def wrap(self, name, function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            stages = getattr(self._local, "stages", None)
+            if stages is None:
+                return function(*args, **kwargs)
+            written = read_io_counters()["wchar"]
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stage = stages.setdefault(name, {"seconds": 0.0, "bytes_written": 0})
+                stage["seconds"] += time.perf_counter() - started
+                stage["bytes_written"] += read_io_counters()["wchar"] - written
+        return wrapper
+
+    @contextlib.contextmanager
+    def instrument(self, stages=STAGES):
+        """运行期间用计时包装替换各阶段的方法，结束后恢复"""
+        originals = []
+        for name, module_name, class_name, method_name in stages:
+            cls = getattr(sys.modules[module_name], class_name)
+            original = cls.__dict__[method_name]
+            originals.append((cls, method_name, original))
+            if isinstance(original, staticmethod):
+                setattr(cls, method_name, staticmethod(self.wrap(name, original.__func__)))
+            else:
+                setattr(cls, method_name, self.wrap(name, original))
+        try:
+            yield
+        finally:
+            for cls, method_name, original in originals:
+                setattr(cls, method_name, original)
+
+
+def synthetic_app(modules, functions):
+    """
+    生成能通过质量检查的合成应用
+
+    返回:
+        str: 与模型输出格式相同的文本
+    """
+    parts = ["好的，下面是应用的完整代码。", ""]
+    imports = []
+    calls = []
+    for index in range(modules):
+        lines = ["import pandas as pd", "import streamlit as st", ""]
+        for number in range(functions):
+            lines += [
+                "",
+                f"def render_{index}_{number}(df):",
+                f'    """第 {index} 个模块的第 {number} 个视图"""',
+                f"    subset = df.head({number + 10})",
+                f"    total = subset.select_dtypes('number').sum().sum() + {number}",
+                "    for column in subset.columns:",
+                f"        st.caption(f'{{column}}: {{subset[column].nunique()}} 个不同的值')",
+                f"    st.metric('模块 {index} 指标 {number}', round(float(total), 2))",
+                "    return pd.DataFrame({'total': [total]})",
+            ]
+        parts += [f"文件: views/view_{index}.py", "```python", "\n".join(lines), "```", ""]
+        imports.append(f"from views.view_{index} import render_{index}_0")
+        calls.append(f"    render_{index}_0(df)")
+
+    app = ["import pandas as pd", "import streamlit as st", ""] + imports + [
+        "",
+        "st.set_page_config(page_title='基准应用', layout='wide')",
+        "st.title('基准应用')",
+        "",
+        "uploaded = st.file_uploader('上传CSV文件', type=['csv'])",
+        "if uploaded is not None:",
+        "    df = pd.read_csv(uploaded)",
+        "    st.dataframe(df.head(100))",
+    ] + (calls or ["    st.write(df.describe())"])
+    parts = parts[:2] + ["文件: app.py", "```python", "\n".join(app), "```", ""] + parts[2:]
+    if modules:
+        parts += ["文件: views/__init__.py", "```python", "", "```", ""]
+    return "\n".join(parts)
+
+
+def write_fixtures(fixture_dir, apps):
+    """为每种规模的应用写一个fixture，按描述中的关键词选择"""
+    os.makedirs(fixture_dir, exist_ok=True)
+    for name in apps:
+        modules, functions, _ = APP_SIZES[name]
+        with open(os.path.join(fixture_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump({"name": name, "match": [f"bench-app-{name}"], "content": synthetic_app(modules, functions)},
+                      f, ensure_ascii=False)
+
+
+def write_payload(directory, size, kind, rng):
+    """
+    生成上传资源
+
+    参数:
+        kind (str): csv（可压缩的数据文件）或 binary（不可压缩，按图片存储）
+
+    返回:
+        tuple: (文件路径, 资源类型)
+    """
+    os.makedirs(directory, exist_ok=True)
+    if kind == "csv":
+        path = os.path.join(directory, f"data_{size}.csv")
+        header = b"id,category,value,timestamp,note\n"
+        rows = "".join(f"{i},{rng.choice('ABCDE')},{rng.random() * 1000:.3f},2024-01-{i % 28 + 1:02d},"
+                       f"note {rng.randint(0, 99999)}\n" for i in range(20000)).encode("utf-8")
+        resource_type = "数据"
+    else:
+        path = os.path.join(directory, f"image_{size}.png")
+        header = b"\x89PNG\r\n\x1a\n"
+        rows = rng.randbytes(1024 * 1024)
+        resource_type = "图片"
+
+    with open(path, "wb") as f:
+        f.write(header[:size])
+        remaining = size - min(size, len(header))
+        while remaining > 0:
+            block = rows[:remaining]
+            f.write(block)
+            remaining -= len(block)
+    return path, resource_type
+
+
+def summarize(values):
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p99": percentile(values, 99),
+        "max": max(values),
+    }
+
+
+def run_case(context, app, size, args, rng):
+    """执行一个用例（一种应用规模和资源大小）的全部运行"""
+    from artifact_store import get_artifact_store
+    from llm_handler import LLMHandler
+    from packager import AppPackager
+
+    store = get_artifact_store()
+    payload_path, resource_type = write_payload(context["payload_dir"], size, args.payload, rng)
+    payload_name = os.path.basename(payload_path)
+    complexity = APP_SIZES[app][2]
+    recorder = context["recorder"]
+
+    def run_once(index):
+        recorder.begin()
+        started = time.perf_counter()
+        session_id = f"bench-{index}"
+        resource = None
+        app_id = None
+        error = None
+        try:
+            with open(payload_path, "rb") as f:
+                resource = context["resources"].add(f, payload_name, resource_type, session_id, size)
+            handler = LLMHandler("bench", context["server"].url, args.model, use_cache=False, repair_attempts=0)
+            code = handler.generate_code(
+                app_name=f"bench_{app}",
+                app_description=f"bench-app-{app}：读取上传的数据并展示统计结果",
+                app_type="Streamlit Web应用",
+                language="Python",
+                complexity=complexity,
+                resources=[resource],
+                stream=not args.no_stream
+            )
+            if not code["success"]:
+                raise Exception(code["error"])
+            app_id = code["app_id"]
+            package = AppPackager().package_app(
+                app_dir=code["app_dir"], app_name=f"bench_{app}", app_type="Streamlit Web应用",
+                language="Python", source_zip=code["source_zip"], include_wheelhouse=False)
+            if not package["success"]:
+                raise Exception(package["error"])
+            store.commit(app_id, {"name": f"bench_{app}"})
+        except Exception as e:
+            error = str(e)
+        total = time.perf_counter() - started
+        stages = recorder.end()
+
+        # 清理不计入耗时
+        if app_id:
+            store.discard(app_id)
+        if resource:
+            context["resources"].release(resource, session_id)
+        return total, stages, error
+
+    # 预热（首次导入、解析器和连接的建立）不计入结果
+    for index in range(args.warmup):
+        run_once(-1 - index)
+
+    io_before = read_io_counters()
+    with ResourceMonitor(context["measured_dirs"]) as monitor:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(run_once, range(args.runs)))
+        wall_time = time.perf_counter() - started
+    io_after = read_io_counters()
+    store.collect_garbage()
+    os.remove(payload_path)
+
+    errors = [error for _, _, error in outcomes if error]
+    succeeded = [(total, stages) for total, stages, error in outcomes if not error]
+    stages = {}
+    for name, *_ in STAGES:
+        samples = [run_stages[name] for _, run_stages in succeeded if name in run_stages]
+        if samples:
+            stages[name] = dict(summarize([s["seconds"] for s in samples]),
+                                bytes_written=sum(s["bytes_written"] for s in samples) // len(samples))
+    if succeeded:
+        stages["total"] = dict(summarize([total for total, _ in succeeded]), bytes_written=0)
+
+    return {
+        "app": app,
+        "resource_bytes": size,
+        "payload": args.payload,
+        "runs": args.runs,
+        "concurrency": args.concurrency,
+        "succeeded": len(succeeded),
+        "errors": errors[:5],
+        "wall_time": wall_time,
+        "throughput": len(succeeded) / wall_time if wall_time else 0,
+        "stages": stages,
+        "bytes_written": io_after["wchar"] - io_before["wchar"],
+        "bytes_read": io_after["rchar"] - io_before["rchar"],
+        "peak_rss": monitor.peak_rss,
+        "peak_temp_disk": monitor.peak_disk - monitor.baseline_disk,
+    }
+
+
+def case_key(case):
+    return case["app"], case["resource_bytes"], case["payload"], case["concurrency"]
+
+
+def print_case(case, baseline=None, threshold=0.5):
+    """
+    打印一个用例的结果；提供基线时同时显示各阶段p50的变化
+
+    返回:
+        list: 比基线慢超过 threshold 的阶段名
+    """
+    print(f"\n== {case['app']} / {format_size(case['resource_bytes'])} {case['payload']}，"
+          f"{case['runs']} 次，并发 {case['concurrency']}：成功 {case['succeeded']}，"
+          f"{case['throughput']:.2f} 次/秒")
+    for error in case["errors"]:
+        print(f"   失败: {error}")
+    print(f"   峰值RSS {case['peak_rss'] / SIZE_UNITS['MB']:.1f}MB，临时磁盘峰值 "
+          f"{case['peak_temp_disk'] / SIZE_UNITS['MB']:.1f}MB，写入 {case['bytes_written'] / SIZE_UNITS['MB']:.1f}MB，"
+          f"读取 {case['bytes_read'] / SIZE_UNITS['MB']:.1f}MB")
+
+    header = f"   {'阶段':<18}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'max(ms)':>10}{'写入(MB)':>11}"
+    print(header + ("   基线p50变化" if baseline else ""))
+    regressions = []
+    for name, stage in case["stages"].items():
+        line = (f"   {name:<18}{stage['p50'] * 1000:>10.1f}{stage['p90'] * 1000:>10.1f}"
+                f"{stage['p99'] * 1000:>10.1f}{stage['max'] * 1000:>10.1f}"
+                f"{stage['bytes_written'] / SIZE_UNITS['MB']:>11.2f}")
+        old = (baseline or {}).get("stages", {}).get(name)
+        if old:
+            change = (stage["p50"] - old["p50"]) / old["p50"] if old["p50"] else 0.0
+            # 忽略5毫秒以内的差异（短阶段的相对抖动很大）
+            slower = change > threshold and stage["p50"] - old["p50"] > 0.005
+            line += f"   {change:+.0%}" + ("  ⚠️ 变慢" if slower else "")
+            if slower:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                  text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return revision + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="生成 → 检查 → 打包 流水线的端到端基准")
+    arg_parser.add_argument("--apps", default="small,medium,large", help=f"应用规模（{', '.join(APP_SIZES)}）")
+    arg_parser.add_argument("--sizes", default="1KB,1MB,50MB,500MB", help="上传资源的大小")
+    arg_parser.add_argument("--payload", choices=["csv", "binary"], default="csv",
+                            help="资源类型：csv（可压缩的数据文件）或 binary（不可压缩的图片）")
+    arg_parser.add_argument("--runs", type=int, default=3, help="每个用例的运行次数")
+    arg_parser.add_argument("--concurrency", type=int, default=1, help="同时执行的运行数")
+    arg_parser.add_argument("--warmup", type=int, default=1, help="每个用例开始前不计入结果的运行次数")
+    arg_parser.add_argument("--model", default="gpt-4o-mini")
+    arg_parser.add_argument("--no-stream", action="store_true", help="使用非流式响应")
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="模拟服务器首个token前的延迟（秒）")
+    arg_parser.add_argument("--tokens-per-second", type=float, default=0.0, help="模拟服务器的输出速度，0表示不限速")
+    arg_parser.add_argument("--output", help="结果JSON的路径，默认 .cache/benchmarks/pipeline-<提交>-<时间>.json")
+    arg_parser.add_argument("--compare", help="与之前保存的结果JSON比较")
+    arg_parser.add_argument("--threshold", type=float, default=0.5, help="p50变慢超过该比例时视为退化")
+    arg_parser.add_argument("--work-dir", help="工作目录，默认在系统临时目录中创建，结束后删除")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    args = arg_parser.parse_args()
+
+    apps = [name.strip() for name in args.apps.split(",") if name.strip()]
+    unknown = [name for name in apps if name not in APP_SIZES]
+    if unknown:
+        arg_parser.error(f"未知的应用规模: {', '.join(unknown)}")
+    sizes = [parse_size(size) for size in args.sizes.split(",") if size.strip()]
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench-pipeline-")
+    artifact_root = os.path.join(work_dir, "artifacts")
+    resource_dir = os.path.join(work_dir, "resources")
+    tmp_dir = os.path.join(work_dir, "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    # 产物存储在导入时读取配置，必须在导入流水线模块之前设置
+    os.environ["ARTIFACT_ROOT"] = artifact_root
+    tempfile.tempdir = tmp_dir
+
+    # 导入后才能包装各阶段的方法
+    import artifact_store  # noqa: F401
+    import llm_handler  # noqa: F401
+    import packager  # noqa: F401
+    from mock_openai_server import MockOpenAIServer
+    from resource_store import ResourceStore
+
+    logging.getLogger("packager").disabled = True
+    rng = random.Random(args.seed)
+    write_fixtures(os.path.join(work_dir, "fixtures"), apps)
+
+    recorder = StageRecorder()
+    cases = []
+    try:
+        with MockOpenAIServer(fixture_dir=os.path.join(work_dir, "fixtures"), latency=args.latency,
+                              tokens_per_second=args.tokens_per_second, chunk_tokens=4,
+                              context_window=1000000) as server, recorder.instrument():
+            context = {
+                "server": server,
+                "recorder": recorder,
+                "resources": ResourceStore(resource_dir, session_quota=float("inf")),
+                "payload_dir": os.path.join(work_dir, "payloads"),
+                "measured_dirs": [artifact_root, resource_dir, tmp_dir],
+            }
+            for app in apps:
+                for size in sizes:
+                    cases.append(run_case(context, app, size, args, rng))
+                    print_case(cases[-1])
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": vars(args),
+        "cases": cases,
+    }
+    output = args.output or os.path.join(
+        ROOT, ".cache", "benchmarks",
+        f"pipeline-{results['revision'] or 'unknown'}-{time.strftime('%Y%m%d%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已保存到 {output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        baseline_cases = {case_key(case): case for case in baseline["cases"]}
+        print(f"\n与 {baseline.get('revision')}（{baseline.get('timestamp')}）比较:")
+        regressions = []
+        compared = 0
+        for case in cases:
+            old = baseline_cases.get(case_key(case))
+            if old is None:
+                continue
+            compared += 1
+            regressions += [f"{case['app']}/{format_size(case['resource_bytes'])}: {name}"
+                            for name in print_case(case, old, args.threshold)]
+        if not compared:
+            print("没有应用规模、资源大小、资源类型和并发数都相同的用例")
+        if regressions:
+            print(f"\n以下阶段的p50变慢超过 {args.threshold:.0%}: {'; '.join(regressions)}")
+            sys.exit(1)
+
+    if any(case["errors"] for case in cases):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
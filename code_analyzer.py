@@ -0,0 +1,520 @@
+"""
+代码静态分析 - 用一次AST遍历收集生成代码的导入、streamlit调用、未定义名称和跨模块引用
+"""
+
+import ast
+import builtins
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing
+import os
+import pkgutil
+import sysconfig
+
+import config
+
+# 模块级别隐式存在的名称
+MODULE_DUNDERS = {"__name__", "__file__", "__doc__", "__package__", "__spec__",
+                  "__loader__", "__builtins__", "__path__", "__annotations__"}
+BUILTIN_NAMES = set(dir(builtins)) | MODULE_DUNDERS
+
+
+def _stdlib_modules():
+    """标准库的顶级模块名；Python 3.10之前没有 sys.stdlib_module_names，改为列出标准库目录"""
+    names = getattr(sys, "stdlib_module_names", None)
+    if names is None:
+        stdlib = sysconfig.get_paths()["stdlib"]
+        names = {module.name for module in pkgutil.iter_modules([stdlib, os.path.join(stdlib, "lib-dynload")])}
+    return set(names) | set(sys.builtin_module_names)
+
+
+STDLIB_MODULES = _stdlib_modules()
+
+
+class _AnalysisVisitor(ast.NodeVisitor):
+    """单次遍历收集一个文件的全部分析信息"""
+
+    def __init__(self):
+        self.imports = []
+        self.import_froms = []
+        self.module_aliases = {}
+        self.streamlit_aliases = set()
+        self.streamlit_names = {}
+        self.streamlit_calls = set()
+        self.defined = set()
+        self.bound = set()
+        self.loaded = []
+        self.module_attributes = []
+        self.star_import = False
+        self._depth = 0
+        self._guarded = 0
+
+    # 名称绑定与使用
+    def visit_Name(self, node):
+        if isinstance(node.ctx, ast.Load):
+            self.loaded.append((node.id, node.lineno))
+        else:
+            self._bind(node.id)
+
+    def visit_arg(self, node):
+        self.bound.add(node.arg)
+        self.generic_visit(node)
+
+    def visit_ExceptHandler(self, node):
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_Global(self, node):
+        self.bound.update(node.names)
+
+    visit_Nonlocal = visit_Global
+
+    def visit_MatchAs(self, node):
+        if node.name:
+            self.bound.add(node.name)
+        self.generic_visit(node)
+
+    def visit_MatchStar(self, node):
+        if node.name:
+            self.bound.add(node.name)
+
+    def visit_MatchMapping(self, node):
+        if node.rest:
+            self.bound.add(node.rest)
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node):
+        self._bind(node.name)
+        self._visit_scope(node)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+    visit_ClassDef = visit_FunctionDef
+
+    def visit_Lambda(self, node):
+        self._visit_scope(node)
+
+    # try 中捕获了 ImportError 的导入是可选依赖
+    def visit_Try(self, node):
+        guarded = any(self._catches_import_error(handler.type) for handler in node.handlers)
+        self._guarded += guarded
+        for statement in node.body:
+            self.visit(statement)
+        self._guarded -= guarded
+        for child in node.handlers + node.orelse + node.finalbody:
+            self.visit(child)
+
+    visit_TryStar = visit_Try
+
+    @staticmethod
+    def _catches_import_error(node):
+        if node is None:
+            return True
+        if isinstance(node, ast.Tuple):
+            return any(_AnalysisVisitor._catches_import_error(element) for element in node.elts)
+        name = node.attr if isinstance(node, ast.Attribute) else getattr(node, "id", None)
+        return name in {"ImportError", "ModuleNotFoundError", "Exception", "BaseException"}
+
+    # 导入
+    def visit_Import(self, node):
+        for alias in node.names:
+            top_level = alias.name.split(".")[0]
+            local_name = alias.asname or top_level
+            self.imports.append({"module": alias.name, "line": node.lineno, "guarded": self._guarded > 0})
+            self.module_aliases[local_name] = alias.name if alias.asname else top_level
+            if alias.name == "streamlit":
+                self.streamlit_aliases.add(local_name)
+            self._bind(local_name)
+
+    def visit_ImportFrom(self, node):
+        names = [alias.name for alias in node.names]
+        self.import_froms.append({
+            "module": node.module or "",
+            "level": node.level,
+            "names": names,
+            "line": node.lineno,
+            "guarded": self._guarded > 0
+        })
+        for alias in node.names:
+            if alias.name == "*":
+                self.star_import = True
+                continue
+            local_name = alias.asname or alias.name
+            if node.module and node.module.split(".")[0] == "streamlit" and node.level == 0:
+                if node.module == "streamlit":
+                    self.streamlit_names[local_name] = alias.name
+                else:
+                    self.streamlit_aliases.add(local_name)
+            self._bind(local_name)
+
+    # 属性访问与调用
+    def visit_Attribute(self, node):
+        if isinstance(node.value, ast.Name) and isinstance(node.value.ctx, ast.Load) \
+                and node.value.id in self.module_aliases:
+            self.module_attributes.append({
+                "module": self.module_aliases[node.value.id],
+                "attr": node.attr,
+                "line": node.lineno
+            })
+        self.generic_visit(node)
+
+    def visit_Call(self, node):
+        path = self._dotted_path(node.func)
+        if path:
+            root, rest = path[0], path[1:]
+            if root in self.streamlit_aliases and rest:
+                self.streamlit_calls.add(".".join(rest))
+            elif root in self.streamlit_names:
+                self.streamlit_calls.add(".".join([self.streamlit_names[root]] + rest))
+        self.generic_visit(node)
+
+    def _bind(self, name):
+        self.bound.add(name)
+        if self._depth == 0:
+            self.defined.add(name)
+
+    def _visit_scope(self, node):
+        self._depth += 1
+        self.generic_visit(node)
+        self._depth -= 1
+
+    @staticmethod
+    def _dotted_path(node):
+        parts = []
+        while isinstance(node, ast.Attribute):
+            parts.append(node.attr)
+            node = node.value
+        if not isinstance(node, ast.Name):
+            return None
+        parts.append(node.id)
+        return parts[::-1]
+
+
+def analyze_source(content, file_name="<unknown>"):
+    """
+    解析并分析单个Python文件
+
+    参数:
+        content (str): 文件内容
+        file_name (str): 文件名，用于错误信息
+
+    返回:
+        dict: 单个文件的分析结果
+    """
+    result = {
+        "syntax_error": None,
+        "imports": [],
+        "import_froms": [],
+        "streamlit_imported": False,
+        "streamlit_calls": [],
+        "defined": [],
+        "undefined": [],
+        "module_attributes": [],
+        "star_import": False
+    }
+    try:
+        tree = ast.parse(content, file_name)
+    except SyntaxError as e:
+        result["syntax_error"] = {"message": e.msg, "line": e.lineno}
+        return result
+
+    visitor = _AnalysisVisitor()
+    visitor.visit(tree)
+
+    # 不区分作用域：任何位置绑定过的名称都视为已定义，避免误报
+    undefined = {}
+    if not visitor.star_import:
+        for name, line in visitor.loaded:
+            if name not in visitor.bound and name not in BUILTIN_NAMES and name not in undefined:
+                undefined[name] = line
+
+    result.update({
+        "imports": visitor.imports,
+        "import_froms": visitor.import_froms,
+        "streamlit_imported": bool(visitor.streamlit_aliases or visitor.streamlit_names),
+        "streamlit_calls": sorted(visitor.streamlit_calls),
+        "defined": sorted(visitor.defined),
+        "undefined": [{"name": name, "line": line} for name, line in undefined.items()],
+        "module_attributes": visitor.module_attributes,
+        "star_import": visitor.star_import
+    })
+    return result
+
+
+def module_distribution(module):
+    """
+    查找导入对应的发行包
+
+    参数:
+        module (str): 导入的模块名，按最长的点分前缀匹配依赖索引（如 google.generativeai）
+
+    返回:
+        str/None: config.MODULE_DISTRIBUTIONS 中的依赖，未收录时返回 None
+    """
+    parts = module.split(".")
+    for size in range(len(parts), 0, -1):
+        requirement = config.MODULE_DISTRIBUTIONS.get(".".join(parts[:size]))
+        if requirement:
+            return requirement
+    return None
+
+
+def _analyze_batch(sources):
+    """在工作进程中分析一批文件"""
+    return [analyze_source(content, name) for name, content in sources]
+
+
+class CodeAnalyzer:
+    """
+    多文件代码分析器
+
+    每个文件按内容哈希缓存分析结果，修复后重新检查时未修改的文件不会被再次解析；
+    待解析的代码量较大时在进程池中并行解析。
+    """
+
+    def __init__(self, max_entries=config.ANALYSIS_CACHE_MAX_ENTRIES,
+                 parallel_min_bytes=config.ANALYSIS_PARALLEL_MIN_BYTES,
+                 max_workers=config.ANALYSIS_MAX_WORKERS):
+        """
+        参数:
+            max_entries (int): 缓存的文件分析结果数量上限
+            parallel_min_bytes (int): 待解析代码超过该字节数时使用进程池并行解析
+            max_workers (int): 进程池的最大进程数
+        """
+        self.max_entries = max_entries
+        self.parallel_min_bytes = parallel_min_bytes
+        self.max_workers = max_workers
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def analyze(self, files_data):
+        """
+        分析生成的全部Python文件
+
+        参数:
+            files_data (list): 文件列表，每项包含 name 和 content
+
+        返回:
+            dict: {"files": {文件名: 分析结果}, "local_modules": {模块名: 文件名},
+                   "external_imports": [第三方顶级模块名], "distributions": [依赖索引中的发行包],
+                   "missing_references": [跨模块引用错误],
+                   "missing_modules": [看起来是本地模块但没有生成的导入],
+                   "unknown_imports": [不在 config.MODULE_DISTRIBUTIONS 中的第三方导入]}
+        """
+        python_files = [f for f in files_data if f["name"].endswith(".py")]
+        keys = [self._content_key(f["content"]) for f in python_files]
+
+        files = {}
+        pending = []
+        with self._lock:
+            for file_data, key in zip(python_files, keys):
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    files[file_data["name"]] = cached
+                else:
+                    pending.append((file_data, key))
+
+        if pending:
+            results = self._parse_pending([(f["name"], f["content"]) for f, _ in pending])
+            with self._lock:
+                for (file_data, key), result in zip(pending, results):
+                    files[file_data["name"]] = result
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+
+        local_modules = {self._module_name(name): name for name in files}
+        return {
+            "files": files,
+            "local_modules": local_modules,
+            "external_imports": self._external_imports(files, local_modules),
+            "distributions": self._distributions(files, local_modules),
+            "missing_references": self._missing_references(files, local_modules),
+            "missing_modules": self._missing_modules(files, local_modules),
+            "unknown_imports": self._unknown_imports(files, local_modules)
+        }
+
+    def _parse_pending(self, sources):
+        """解析未命中缓存的文件；代码量小时直接在当前线程解析，避免进程池的开销"""
+        total_bytes = sum(len(content) for _, content in sources)
+        if len(sources) > 1 and total_bytes >= self.parallel_min_bytes:
+            try:
+                executor = self._get_executor()
+                batches = [sources[i::self.max_workers] for i in range(min(self.max_workers, len(sources)))]
+                results = {}
+                for batch, batch_results in zip(batches, executor.map(_analyze_batch, batches)):
+                    for (name, _), result in zip(batch, batch_results):
+                        results[name] = result
+                return [results[name] for name, _ in sources]
+            except (BrokenProcessPool, OSError):
+                # 进程池不可用时退回到当前线程解析
+                self._executor = None
+        return _analyze_batch(sources)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                # spawn方式避免在多线程的Streamlit进程中fork
+                context = multiprocessing.get_context("spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+            return self._executor
+
+    @staticmethod
+    def _content_key(content):
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _module_name(file_name):
+        """把文件路径转换为模块名，如 pages/home.py -> pages.home"""
+        module = file_name[:-3].replace("\\", "/").strip("/").replace("/", ".")
+        if module.endswith(".__init__"):
+            module = module[:-len(".__init__")]
+        return module
+
+    @staticmethod
+    def _resolve_from(file_name, import_from):
+        """解析 from 导入（含相对导入）对应的模块名"""
+        if not import_from["level"]:
+            return import_from["module"]
+        package = CodeAnalyzer._module_name(file_name).split(".")[:-1]
+        if import_from["level"] > 1:
+            package = package[:len(package) - (import_from["level"] - 1)]
+        return ".".join(package + ([import_from["module"]] if import_from["module"] else []))
+
+    @staticmethod
+    def _local_packages(local_modules):
+        """生成的模块路径的所有上级包，包括没有 __init__.py 的命名空间包（如 pages/home.py 的 pages）"""
+        packages = set()
+        for module in local_modules:
+            parts = module.split(".")
+            for size in range(1, len(parts)):
+                packages.add(".".join(parts[:size]))
+        return packages
+
+    @staticmethod
+    def _is_local(module, local_modules):
+        """模块是生成的文件，或者是生成的模块路径的前缀（包）"""
+        return module in local_modules or module in CodeAnalyzer._local_packages(local_modules)
+
+    @staticmethod
+    def _absolute_imports(analysis):
+        imports = list(analysis["imports"])
+        return imports + [imp for imp in analysis["import_froms"] if not imp["level"] and imp["module"]]
+
+    @staticmethod
+    def _external_import_sites(files, local_modules):
+        """逐个产出非标准库、非本地模块的导入：(文件名, 模块名, 行号, 是否在捕获ImportError的try中)"""
+        for file_name, analysis in files.items():
+            for imp in CodeAnalyzer._absolute_imports(analysis):
+                module = imp["module"]
+                top_level = module.split(".")[0]
+                if CodeAnalyzer._is_local(top_level, local_modules) or top_level in STDLIB_MODULES:
+                    continue
+                yield file_name, module, imp["line"], imp.get("guarded", False)
+
+    @staticmethod
+    def _external_imports(files, local_modules):
+        """收集非标准库、非本地模块的顶级导入"""
+        return sorted({module.split(".")[0]
+                       for _, module, _, _ in CodeAnalyzer._external_import_sites(files, local_modules)})
+
+    @staticmethod
+    def _distributions(files, local_modules):
+        """第三方导入中依赖索引收录的发行包"""
+        requirements = (module_distribution(module)
+                        for _, module, _, _ in CodeAnalyzer._external_import_sites(files, local_modules))
+        return sorted({requirement for requirement in requirements if requirement})
+
+    @staticmethod
+    def _missing_modules(files, local_modules):
+        """
+        收集看起来是本地模块却没有生成的导入：目标不存在的相对导入、本地包中不存在的子模块，
+        以及 config.LOCAL_MODULE_NAMES 中常见的辅助模块名。捕获了ImportError的导入是可选的，不报告
+        """
+        missing = []
+        for file_name, analysis in files.items():
+            for imp in analysis["import_froms"]:
+                if imp["level"] and imp["module"] and not imp.get("guarded"):
+                    module = CodeAnalyzer._resolve_from(file_name, imp)
+                    if not CodeAnalyzer._is_local(module, local_modules):
+                        missing.append({"file": file_name, "module": module, "line": imp["line"]})
+            for imp in CodeAnalyzer._absolute_imports(analysis):
+                module = imp["module"]
+                if not imp.get("guarded") and CodeAnalyzer._is_local(module.split(".")[0], local_modules) \
+                        and not CodeAnalyzer._is_local(module, local_modules):
+                    missing.append({"file": file_name, "module": module, "line": imp["line"]})
+        for file_name, module, line, guarded in CodeAnalyzer._external_import_sites(files, local_modules):
+            if not guarded and module.split(".")[0] in config.LOCAL_MODULE_NAMES \
+                    and module_distribution(module) is None:
+                missing.append({"file": file_name, "module": module, "line": line})
+        return missing
+
+    @staticmethod
+    def _unknown_imports(files, local_modules):
+        """
+        收集依赖索引中没有的第三方导入
+
+        无法确定这类导入对应的发行包（如 google.generativeai 的顶级名 google），不写入requirements.txt，
+        只作为警告报告；可选导入和看起来是本地模块的导入不在其中
+        """
+        unknown = []
+        seen = set()
+        for file_name, module, line, guarded in CodeAnalyzer._external_import_sites(files, local_modules):
+            top_level = module.split(".")[0]
+            if guarded or top_level in config.LOCAL_MODULE_NAMES or module_distribution(module):
+                continue
+            if (file_name, top_level) not in seen:
+                seen.add((file_name, top_level))
+                unknown.append({"file": file_name, "module": module, "line": line})
+        return unknown
+
+    @staticmethod
+    def _missing_references(files, local_modules):
+        """检查对本地模块中不存在名称的引用"""
+        missing = []
+        packages = CodeAnalyzer._local_packages(local_modules)
+
+        def check(file_name, module, name, line):
+            submodule = f"{module}.{name}"
+            if submodule in local_modules or submodule in packages:
+                return
+            target = files.get(local_modules.get(module))
+            if target is None:
+                # 命名空间包（没有 __init__.py）中只能导入生成的子模块
+                if module in packages:
+                    missing.append({"file": file_name, "module": module, "name": name, "line": line})
+                return
+            if target["syntax_error"] or target["star_import"]:
+                return
+            if name not in target["defined"]:
+                missing.append({"file": file_name, "module": module, "name": name, "line": line})
+
+        for file_name, analysis in files.items():
+            for import_from in analysis["import_froms"]:
+                module = CodeAnalyzer._resolve_from(file_name, import_from)
+                for name in import_from["names"]:
+                    if name != "*":
+                        check(file_name, module, name, import_from["line"])
+            for attribute in analysis["module_attributes"]:
+                check(file_name, attribute["module"], attribute["attr"], attribute["line"])
+        return missing
+
+
+_default_analyzer = None
+_default_analyzer_lock = threading.Lock()
+
+
+def get_code_analyzer():
+    """获取进程内共享的代码分析器"""
+    global _default_analyzer
+    with _default_analyzer_lock:
+        if _default_analyzer is None:
+            _default_analyzer = CodeAnalyzer()
+        return _default_analyzer
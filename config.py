@@ -2,10 +2,73 @@
 应用配置文件 - 存储默认设置和常量
 """
 
+import os
+
 # API相关配置
 DEFAULT_API_ENDPOINT = "https://api.openai.com/v1"
 DEFAULT_MODELS = ["gpt-4", "gpt-3.5-turbo"]
 DEFAULT_MODEL = "gpt-3.5-turbo"
+DEFAULT_TEMPERATURE = 0.7
+DEFAULT_MAX_TOKENS = 4000
+GENERATION_CANDIDATES = 1  # 并行生成的候选数量（best-of-N）
+MAX_GENERATION_CANDIDATES = 5
+REPAIR_MAX_ATTEMPTS = 2  # 质量检查失败后自动修复的最大次数
+REPAIR_CONTEXT_LINES = 5  # 修复提示中出错行前后的上下文行数
+
+# token预算设置
+# 各模型的上下文窗口（按最长前缀匹配模型名）
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 16385,
+    "gpt-3.5-turbo-instruct": 4096,
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-turbo": 128000,
+    "gpt-4-1106": 128000,
+    "gpt-4-0125": 128000,
+    "gpt-4o": 128000,
+    "gpt-4.1": 1047576,
+    "o1": 200000,
+    "o3": 200000,
+    "o4-mini": 200000,
+}
+DEFAULT_CONTEXT_WINDOW = 8192  # 未知模型（如本地模型）的上下文窗口
+# 单次响应的输出上限与上下文窗口不同的模型
+MODEL_MAX_OUTPUT_TOKENS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 4096,
+    "gpt-4-1106": 4096,
+    "gpt-4-0125": 4096,
+    "gpt-4o": 16384,
+    "gpt-4.1": 32768,
+    "o1": 100000,
+    "o3": 100000,
+    "o4-mini": 100000,
+}
+DEFAULT_MAX_OUTPUT_TOKENS = 4096
+# 不同复杂度的应用完整输出大约需要的token数，每个资源文件额外增加 RESOURCE_OUTPUT_TOKENS
+COMPLEXITY_OUTPUT_TOKENS = {
+    "简单": 3000,
+    "中等": 6000,
+    "复杂": 12000
+}
+RESOURCE_OUTPUT_TOKENS = 200
+MIN_OUTPUT_TOKENS = 1024  # 留给输出的token少于该值时拒绝请求
+TOKEN_SAFETY_MARGIN = 256  # 估算误差的余量
+TOKEN_CHARS_PER_TOKEN = 3.2  # 没有分词器时，非中文字符按每个token的平均字符数估算
+TOKENIZER_ENCODING = "cl100k_base"  # 安装了 tiktoken 时使用的词表
+MAX_CONTINUATIONS = 3  # 输出因长度被截断时自动续写的最大次数
+CONTINUATION_TAIL_LINES = 5  # 续写提示中附带的截断前的行数
+CONTINUATION_TAIL_CHARS = 300  # 续写提示中附带的截断前内容的最大字符数
+# 续写内容与已有输出检查重叠的最大字符数：模型只会重复提示中附带的内容，流式续写开头最多缓存这么多字符
+CONTINUATION_OVERLAP_WINDOW = CONTINUATION_TAIL_CHARS
+CONTINUATION_MIN_OVERLAP = 16  # 不从行首开始的重叠至少需要的字符数
+PROMPT_RESOURCE_LIST_MAX = 20  # 精简提示中每类资源最多列出的文件数
+
+# 代码静态分析设置
+ANALYSIS_CACHE_MAX_ENTRIES = 500  # 按内容哈希缓存的文件分析结果数量
+ANALYSIS_PARALLEL_MIN_BYTES = 256 * 1024  # 待解析代码超过该大小时使用进程池并行解析
+ANALYSIS_MAX_WORKERS = 4
 
 # UI配置
 APP_TITLE = "Streamlit应用生成器"
@@ -29,12 +92,18 @@ COMPLEXITY_DESCRIPTIONS = {
 ALLOWED_IMAGE_TYPES = ['png', 'jpg', 'jpeg', 'gif', 'svg']
 ALLOWED_DATA_TYPES = ['csv', 'xlsx', 'json', 'txt']
 
-# 代码检查配置
-COMMON_PYTHON_MODULES = [
-    "streamlit", "pandas", "numpy", "matplotlib", "plotly", 
-    "os", "sys", "time", "datetime", "json", "re", "math", 
-    "random", "pathlib", "collections", "csv", "io"
-]
+# 上传资源存储配置
+RESOURCE_DIR = "resources"
+RESOURCE_CHUNK_SIZE = 1024 * 1024  # 上传内容分块写入的大小
+RESOURCE_SESSION_QUOTA = 500 * 1024 * 1024  # 每个会话可上传的资源总大小（进程内统计，重启后重新计算）
+
+# 数据资源预览配置
+PREVIEW_SAMPLE_BYTES = 1024 * 1024  # 只读取文件开头的这部分内容推断表结构
+PREVIEW_SAMPLE_ROWS = 1000  # 推断类型时最多使用的行数
+PREVIEW_DISPLAY_ROWS = 5  # 页面上预览的行数
+PREVIEW_TEXT_CHARS = 500  # 文本预览的字符数
+PREVIEW_CACHE_MAX_ENTRIES = 200  # 按内容哈希缓存的分析结果数量
+PREVIEW_PROMPT_MAX_COLUMNS = 50  # 写入生成提示的最多列数
 
 # 资源目录结构
 RESOURCE_CATEGORIES = {
@@ -44,29 +113,205 @@ RESOURCE_CATEGORIES = {
 }
 
 # 依赖包配置
+# requirements.txt 根据生成代码的实际导入解析，只包含被导入的第三方库
 DEFAULT_DEPENDENCIES = [
-    "# Streamlit应用依赖", 
-    "streamlit>=1.25.0", 
-    "pandas>=1.3.0", 
-    "numpy>=1.20.0"
+    "streamlit>=1.25.0"
 ]
 
-DEPENDENCY_KEYWORDS = {
-    "图表": ["matplotlib>=3.5.0", "plotly>=5.8.0"],
-    "可视化": ["matplotlib>=3.5.0", "plotly>=5.8.0"],
-    "图形": ["matplotlib>=3.5.0", "plotly>=5.8.0"],
-    "绘图": ["matplotlib>=3.5.0", "plotly>=5.8.0"],
-    "数据": ["openpyxl>=3.0.0"],
-    "表格": ["openpyxl>=3.0.0"],
-    "分析": ["openpyxl>=3.0.0"],
-    "统计": ["openpyxl>=3.0.0"],
-    "机器学习": ["scikit-learn>=1.0.0"],
-    "预测": ["scikit-learn>=1.0.0"],
-    "模型": ["scikit-learn>=1.0.0"],
-    "网络": ["requests>=2.28.0"],
-    "爬虫": ["requests>=2.28.0"],
-    "请求": ["requests>=2.28.0"],
-    "地图": ["pydeck>=0.7.0", "pillow>=9.0.0"],
-    "地理": ["pydeck>=0.7.0", "pillow>=9.0.0"],
-    "位置": ["pydeck>=0.7.0", "pillow>=9.0.0"]
-} 
\ No newline at end of file
+# 导入模块名 -> 发行包及版本约束的索引，修改内容时更新版本号
+MODULE_INDEX_VERSION = "2024.07"
+MODULE_DISTRIBUTIONS = {
+    "streamlit": "streamlit>=1.25.0",
+    "pandas": "pandas>=1.3.0",
+    "numpy": "numpy>=1.20.0",
+    "matplotlib": "matplotlib>=3.5.0",
+    "plotly": "plotly>=5.8.0",
+    "altair": "altair>=4.2.0",
+    "seaborn": "seaborn>=0.11.0",
+    "pydeck": "pydeck>=0.7.0",
+    "folium": "folium>=0.14.0",
+    "streamlit_folium": "streamlit-folium>=0.15.0",
+    "streamlit_option_menu": "streamlit-option-menu>=0.3.0",
+    "streamlit_extras": "streamlit-extras>=0.3.0",
+    "st_aggrid": "streamlit-aggrid>=0.3.4",
+    "scipy": "scipy>=1.7.0",
+    "sklearn": "scikit-learn>=1.0.0",
+    "statsmodels": "statsmodels>=0.13.0",
+    "xgboost": "xgboost>=1.6.0",
+    "lightgbm": "lightgbm>=3.3.0",
+    "joblib": "joblib>=1.1.0",
+    "PIL": "pillow>=9.0.0",
+    "cv2": "opencv-python-headless>=4.5.0",
+    "skimage": "scikit-image>=0.19.0",
+    "imageio": "imageio>=2.19.0",
+    "wordcloud": "wordcloud>=1.8.0",
+    "jieba": "jieba>=0.42.1",
+    "nltk": "nltk>=3.7",
+    "textblob": "textblob>=0.17.0",
+    "openpyxl": "openpyxl>=3.0.0",
+    "xlrd": "xlrd>=2.0.0",
+    "docx": "python-docx>=0.8.11",
+    "pptx": "python-pptx>=0.6.21",
+    "PyPDF2": "PyPDF2>=2.0.0",
+    "pypdf": "pypdf>=3.0.0",
+    "fitz": "PyMuPDF>=1.20.0",
+    "pdfplumber": "pdfplumber>=0.9.0",
+    "reportlab": "reportlab>=3.6.0",
+    "qrcode": "qrcode>=7.3",
+    "yaml": "PyYAML>=6.0",
+    "bs4": "beautifulsoup4>=4.11.0",
+    "lxml": "lxml>=4.9.0",
+    "requests": "requests>=2.28.0",
+    "httpx": "httpx>=0.23.0",
+    "dateutil": "python-dateutil>=2.8.0",
+    "pytz": "pytz>=2022.1",
+    "dotenv": "python-dotenv>=0.20.0",
+    "sqlalchemy": "SQLAlchemy>=1.4.0",
+    "pymysql": "PyMySQL>=1.0.0",
+    "psycopg2": "psycopg2-binary>=2.9.0",
+    "pyarrow": "pyarrow>=8.0.0",
+    "networkx": "networkx>=2.8",
+    "graphviz": "graphviz>=0.20",
+    "sympy": "sympy>=1.10",
+    "geopandas": "geopandas>=0.11.0",
+    "shapely": "shapely>=1.8.0",
+    "faker": "Faker>=13.0.0",
+    "tabulate": "tabulate>=0.8.10",
+    "tqdm": "tqdm>=4.64.0",
+    "markdown": "Markdown>=3.3.0",
+    "emoji": "emoji>=2.0.0",
+    "openai": "openai>=1.0.0",
+    "google.generativeai": "google-generativeai>=0.3.0",
+    "ujson": "ujson>=5.0.0"
+}
+
+# 模型常用的辅助模块名：导入这些模块却没有生成对应文件时，视为缺失的本地模块而不是第三方库
+LOCAL_MODULE_NAMES = {"utils", "helpers", "components", "config", "settings", "constants", "models",
+                      "services", "database", "db", "data_loader", "data_utils", "styles", "views", "pages"}
+
+# 无法从导入看出的隐式依赖：使用某个库的这些属性时还需要额外的发行包
+# （如pandas读写Excel需要openpyxl）
+IMPLICIT_DEPENDENCIES = {
+    "pandas": {
+        "read_excel": ["openpyxl>=3.0.0"],
+        "ExcelWriter": ["openpyxl>=3.0.0"],
+        "read_parquet": ["pyarrow>=8.0.0"]
+    },
+    "plotly": {
+        "express": ["pandas>=1.3.0"]
+    }
+}
+
+# 模板配置
+TEMPLATE_DEV_MODE = os.environ.get("TEMPLATE_DEV_MODE", "0") == "1"  # 开发模式下模板修改后自动重新加载
+
+# 流式生成配置
+STREAM_RESPONSES = True
+STREAM_PROGRESS_INTERVAL = 0.3  # 流式进度回调的最小间隔（秒）
+
+# 生成缓存配置
+GENERATION_CACHE_ENABLED = True
+GENERATION_CACHE_DIR = ".cache/generations"
+GENERATION_CACHE_MAX_ENTRIES = 200
+GENERATION_CACHE_MAX_BYTES = 50 * 1024 * 1024  # 50MB
+GENERATION_CACHE_MAX_AGE = 7 * 24 * 3600  # 7天
+
+# HTTP客户端配置
+HTTP_CONNECT_TIMEOUT = 10  # 秒
+HTTP_READ_TIMEOUT = 120  # 秒，LLM生成可能较慢
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 1.0  # 秒
+HTTP_BACKOFF_MAX = 30  # 秒
+HTTP_POOL_MAXSIZE = 10  # 每个主机的最大连接数
+MODEL_LIST_TIMEOUT = 15  # 获取模型列表的读取超时（秒）
+MODEL_CATALOG_TTL = 600  # 模型列表的有效期（秒），过期后在后台刷新
+MODEL_CATALOG_ERROR_TTL = 30  # 获取模型列表失败后重试的间隔（秒）
+# 各模型每千token的价格（美元，输入/输出），按最长前缀匹配模型名
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "gpt-4": (0.03, 0.06),
+    "gpt-4-32k": (0.06, 0.12),
+    "gpt-4-turbo": (0.01, 0.03),
+    "gpt-4-1106": (0.01, 0.03),
+    "gpt-4-0125": (0.01, 0.03),
+    "gpt-4o": (0.0025, 0.01),
+    "gpt-4o-mini": (0.00015, 0.0006),
+    "gpt-4.1": (0.002, 0.008),
+}
+GITHUB_API_TIMEOUT = 30  # GitHub API 的读取超时（秒）
+
+# LLM后端配置
+LLM_BACKEND = os.environ.get("LLM_BACKEND", "openai")  # openai: OpenAI兼容服务；local: 本地模型服务（Ollama、vLLM等）
+LLM_POOL_MAX_CONNECTIONS = 100  # 异步客户端的最大并发连接数
+LLM_POOL_MAX_KEEPALIVE = 20  # 保持的空闲连接数
+LOCAL_LLM_READ_TIMEOUT = 600  # 本地模型在CPU上生成可能很慢（秒）
+LOCAL_LLM_MAX_CONNECTIONS = 4  # 本地模型服务通常只能同时处理少量请求，多余的请求在客户端排队
+LLM_BACKEND_CACHE_SIZE = 16  # 保留的后端实例（端点和密钥的组合）数量，超出时关闭最久未使用的连接池
+
+# GitHub部署配置
+GITHUB_API_URL = os.environ.get("GITHUB_API_URL", "https://api.github.com")
+GITHUB_ORG = "StreamlitForge"
+GITHUB_DEPLOY_STRATEGY = "git_data"  # 'git_data' 单次提交部署，'contents' 逐文件提交
+GITHUB_UPLOAD_WORKERS = 8
+GITHUB_INIT_TIMEOUT = 30  # 等待新仓库初始化完成的最长时间（秒）
+GITHUB_DEFAULT_REQUIREMENTS = "streamlit>=1.22.0\npandas\nmatplotlib\n"
+GITHUB_STREAM_THRESHOLD = 1024 * 1024  # 超过该大小（字节）的文件从磁盘流式上传
+GITHUB_RATE_LIMIT_LOW_WATERMARK = 50  # 剩余配额低于该值时放慢请求
+GITHUB_RATE_LIMIT_RETRIES = 3  # 被速率限制拒绝或返回5xx后的重试次数（GitHub请求唯一的状态码重试层）
+
+# 打包配置
+# 这些格式本身已压缩，写入ZIP时直接存储（ZIP_STORED）
+ZIP_STORED_EXTENSIONS = {
+    "png", "jpg", "jpeg", "gif", "webp", "xlsx", "docx", "pptx",
+    "zip", "gz", "bz2", "xz", "7z", "whl", "pdf", "mp3", "mp4", "parquet"
+}
+
+# 产物存储配置（生成的应用持久保存，重启后历史记录仍可下载）
+ARTIFACT_ROOT = os.environ.get("ARTIFACT_ROOT", ".cache/artifacts")
+ARTIFACT_MAX_BYTES = 2 * 1024 * 1024 * 1024  # 2GB，超出后按最近使用时间清理应用
+ARTIFACT_WORKSPACE_TTL = 24 * 3600  # 未提交工作区的保留时间（秒）
+
+# 下载配置
+DOWNLOAD_CACHE_MAX_BYTES = 256 * 1024 * 1024  # 内存中缓存的归档总大小上限
+DOWNLOAD_PREPARED_MAX = 4  # 每个会话同时保持就绪的下载按钮数量
+
+# 离线依赖包配置（启动包中附带目标平台的wheel，启动器离线安装）
+WHEELHOUSE_ENABLED = False
+WHEELHOUSE_CACHE_DIR = ".cache/wheelhouse"
+WHEELHOUSE_TIMEOUT = 600  # 单次pip下载的超时时间（秒）
+# 每个平台按CPU架构分组，同一组的标签在一次 pip download 中作为多个 --platform 传入：
+# pip 优先选择排在前面的旧版系统标签（兼容更多系统），只提供新版系统wheel的包回退到后面的标签
+WHEELHOUSE_PLATFORMS = {
+    "Windows": [["win_amd64"]],
+    "macOS": [["macosx_11_0_arm64", "macosx_14_0_arm64"], ["macosx_10_9_x86_64", "macosx_14_0_x86_64"]],
+    "Linux": [["manylinux2014_x86_64"]]
+}
+WHEELHOUSE_PYTHON_VERSIONS = ["3.10", "3.11", "3.12"]
+
+# 后台任务配置
+JOB_STATE_DIR = ".cache/jobs"
+JOB_MAX_WORKERS = 4  # 同时执行的生成任务数
+JOB_POLL_INTERVAL = 1.0  # 界面轮询任务状态的间隔（秒）
+JOB_MAX_EVENTS = 200  # 每个任务保留的事件数
+JOB_RETENTION = 24 * 3600  # 任务记录保留时间（秒）
+
+# 追踪和指标配置
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "9464"))  # 指标端点（/metrics、/metrics.json、/traces）的端口，0表示不启动
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PREFIX = "streamlitforge"
+METRICS_DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)  # 阶段耗时直方图的桶（秒）
+TRACE_MAX_SPANS = 2000  # 内存中保留的最近span数量
+OTEL_ENABLED = os.environ.get("OTEL_ENABLED", "0") == "1"  # 安装了 opentelemetry-api 时同时发送到OpenTelemetry
+# 生成任务的阶段（span名称、阶段、详情、没有耗时记录时的默认耗时秒数），按执行顺序排列，
+# 进度条按各阶段最近的实际耗时分配
+PIPELINE_STAGES = [
+    ("generate.resources", "分析资源", "正在复制资源文件并分析数据结构...", 1),
+    ("generate.prompt", "准备提示", "正在构建提示并计算token预算...", 0.2),
+    ("generate.llm", "生成代码", "AI正在为您的Streamlit应用生成代码...", 60),
+    ("generate.check", "代码检查", "正在检查生成的代码质量和潜在错误...", 1),
+    ("generate.repair", "代码修复", "正在修复未通过检查的文件...", 5),
+    ("generate.files", "写入文件", "正在保存代码、依赖列表、README和启动脚本...", 0.5),
+    ("generate.source_zip", "打包源代码", "正在创建源代码压缩包...", 1),
+    ("package", "创建启动器", "正在创建跨平台启动器...", 2),
+    ("artifact.commit", "保存应用", "正在保存生成的应用...", 0.5),
+]
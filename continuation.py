@@ -0,0 +1,148 @@
+"""
+续写拼接 - 检测被截断的文件代码块，构建从截断处续写的提示，并去除续写内容与已有输出的重叠部分
+"""
+
+import config
+from prompts import CONTINUATION_PROMPT
+from response_parser import FileBlockParser, match_header
+
+
+def find_unclosed_block(text):
+    """
+    查找文本末尾未闭合的代码块
+
+    参数:
+        text (str): 模型输出
+
+    返回:
+        str/None: 未闭合代码块所属的文件名（代码块前没有文件头时为空字符串）；
+                  所有代码块都已闭合时返回 None
+    """
+    parser = FileBlockParser()
+    parser.feed(text)
+    parser.close()
+    return parser.open_block
+
+
+def build_continuation_prompt(partial):
+    """
+    构建续写提示：说明截断位置并附上截断前的最后几行，要求模型从截断处的下一个字符继续
+
+    参数:
+        partial (str): 已输出的内容
+
+    返回:
+        str: 续写提示
+    """
+    block_name = find_unclosed_block(partial)
+    if block_name:
+        position = (f"截断发生在文件 {block_name} 的代码块中，代码块还没有结束。"
+                    f"不要重新输出文件头和代码块开头的```，直接接着输出代码，文件结束后再输出```。")
+    elif block_name == "":
+        position = "截断发生在一个代码块中，代码块还没有结束。不要重新输出代码块开头的```。"
+    else:
+        position = "截断发生在代码块之外。"
+
+    tail = "\n".join(partial.splitlines()[-config.CONTINUATION_TAIL_LINES:])
+    return CONTINUATION_PROMPT.format(position=position, tail=tail[-config.CONTINUATION_TAIL_CHARS:])
+
+
+class ContinuationStitcher:
+    """
+    把续写的内容接到已有输出之后
+
+    模型续写时经常重复截断前的最后一段内容，或者在代码块中重新输出文件头和开头的围栏。
+    续写内容的开头会先缓存，确定要去掉的部分后再原样放行，因此可以直接串在流式响应和增量解析器之间。
+    缓存的只是检查重叠需要的部分：重新输出的文件头和围栏，加上已有输出的结尾（不超过 window，
+    默认几百个字符），之后的内容立即放行，不会拖慢按文件的流式进度。
+    """
+
+    def __init__(self, partial, window=config.CONTINUATION_OVERLAP_WINDOW,
+                 min_overlap=config.CONTINUATION_MIN_OVERLAP):
+        """
+        参数:
+            partial (str): 截断前已输出的内容
+            window (int): 检查重叠的最大字符数，也是续写开头最多缓存的字符数（不含重新输出的文件头和围栏）
+            min_overlap (int): 不从行首开始的重叠至少需要的字符数，避免误删巧合相同的短内容
+        """
+        self.tail = partial[-window:]
+        self.in_block = find_unclosed_block(partial) is not None
+        self.window = window
+        self.min_overlap = min_overlap
+        self._buffer = ""
+        self._decided = False
+
+    def feed(self, text):
+        """
+        输入续写的文本片段
+
+        返回:
+            str: 可以接在已有输出之后的文本（确定要去掉的部分前为空字符串）
+        """
+        if self._decided:
+            return text
+        self._buffer += text
+        # 开头的文件头和围栏已经可以判断，且去掉后剩下的内容足够覆盖已有输出的结尾时就能确定重叠
+        text = self._strip(self._buffer, final=False)
+        if text is None or len(text) < len(self.tail):
+            return ""
+        return self._decide()
+
+    def close(self):
+        """续写结束，返回仍缓存在窗口中的文本"""
+        if self._decided:
+            return ""
+        return self._decide()
+
+    def _decide(self):
+        self._decided = True
+        text = self._strip(self._buffer)
+        self._buffer = ""
+        return text[self._overlap(text):]
+
+    def _strip(self, text, final=True):
+        return self._strip_reopened_block(text, final) if self.in_block else text
+
+    @staticmethod
+    def _strip_reopened_block(text, final=True):
+        """
+        去掉续写开头重新输出的文件头和代码块开始围栏
+
+        参数:
+            final (bool): text 是否已是完整的续写；为 False 且开头的行还没有输出完整、无法判断时返回 None
+        """
+        lines = text.split("\n")
+        # 最后一段没有换行，可能还没有输出完整
+        last = len(lines) - 1
+        index = 0
+        while index < last and not lines[index].strip():
+            index += 1
+        header = index < last and match_header(lines[index]) is not None
+        if header:
+            index += 1
+            while index < last and not lines[index].strip():
+                index += 1
+        if index >= last and not final:
+            return None
+        # 单独的 ``` 没有跟在文件头后面时是代码块的结束围栏，需要保留
+        fence = lines[index].strip() if index < last else ""
+        if fence.startswith("```") and (header or fence != "```"):
+            return "\n".join(lines[index + 1:])
+        return text
+
+    def _overlap(self, text):
+        """已有输出的结尾与续写开头重叠的最大长度"""
+        for size in range(min(len(self.tail), len(text)), 0, -1):
+            if not self.tail.endswith(text[:size]):
+                continue
+            # 短的重叠只在模型重新输出截断的整行时（重叠从行首开始）才去除
+            at_line_start = size == len(self.tail) or self.tail[-size - 1] == "\n"
+            if size >= self.min_overlap or at_line_start:
+                return size
+        return 0
+
+
+def stitch(partial, continuation):
+    """把完整的续写内容接到已有输出之后，去除重叠部分"""
+    stitcher = ContinuationStitcher(partial)
+    return partial + stitcher.feed(continuation) + stitcher.close()
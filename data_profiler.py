@@ -0,0 +1,227 @@
+"""
+数据资源预览 - 只读取文件开头的一段样本推断表结构，按内容哈希缓存预览和结构信息
+"""
+
+import hashlib
+import io
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+import config
+
+# 依次尝试的文本编码
+TEXT_ENCODINGS = ("utf-8-sig", "gbk")
+
+
+class DataProfiler:
+    """
+    数据文件的预览与结构分析
+
+    CSV、JSON和文本文件只读取开头 sample_bytes 字节，在样本上用pandas推断列名和类型，
+    无论文件多大耗时都是固定的；Excel文件无法只读开头，读取时限制行数。
+    结果按内容哈希缓存，同一文件的预览和生成提示共用一次分析。
+    """
+
+    def __init__(self, sample_bytes=config.PREVIEW_SAMPLE_BYTES, sample_rows=config.PREVIEW_SAMPLE_ROWS,
+                 max_entries=config.PREVIEW_CACHE_MAX_ENTRIES):
+        """
+        参数:
+            sample_bytes (int): 从文件开头读取的样本字节数
+            sample_rows (int): 推断类型时最多使用的行数
+            max_entries (int): 缓存的分析结果数量上限
+        """
+        self.sample_bytes = sample_bytes
+        self.sample_rows = sample_rows
+        self.max_entries = max_entries
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def profile(self, source, file_name=None, content_hash=None):
+        """
+        分析数据文件
+
+        参数:
+            source (str/Path/file): 文件路径，或可 seek/read 的二进制流（如Streamlit的UploadedFile）
+            file_name (str): 文件名，用于判断格式，默认取路径中的文件名
+            content_hash (str): 已知的完整内容哈希（如资源存储中的sha256），用作缓存键
+
+        返回:
+            dict: 分析结果，包含 format、size、truncated、rows_sampled、rows_estimated、
+                  columns [{name, dtype, nulls}]、preview（DataFrame）、text、error
+        """
+        if isinstance(source, (str, Path)):
+            file_name = file_name or Path(source).name
+            with open(source, "rb") as f:
+                return self._profile_stream(f, file_name, content_hash)
+
+        source.seek(0)
+        try:
+            return self._profile_stream(source, file_name or getattr(source, "name", ""), content_hash)
+        finally:
+            source.seek(0)
+
+    def _profile_stream(self, stream, file_name, content_hash):
+        data_format = self._detect_format(file_name)
+        stream.seek(0, io.SEEK_END)
+        size = stream.tell()
+        stream.seek(0)
+
+        if data_format == "excel":
+            # xlsx是压缩包，需要完整内容才能解析
+            head = stream.read()
+            truncated = False
+        else:
+            head = stream.read(self.sample_bytes)
+            truncated = size > len(head)
+
+        # 流式格式的分析结果只取决于文件开头和文件大小，无需读取全文计算哈希
+        key = content_hash or hashlib.sha256(
+            f"{data_format}:{size}:".encode("utf-8") + head
+        ).hexdigest()
+        key = f"{key}:{self.sample_bytes}:{self.sample_rows}"
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return cached
+
+        result = {
+            "format": data_format,
+            "size": size,
+            "truncated": truncated,
+            "rows_sampled": 0,
+            "rows_estimated": None,
+            "columns": [],
+            "preview": None,
+            "text": None,
+            "error": None
+        }
+        try:
+            if data_format == "csv":
+                self._profile_csv(head, truncated, result)
+            elif data_format == "excel":
+                self._profile_excel(head, result)
+            elif data_format == "json":
+                self._profile_json(head, truncated, result)
+            else:
+                result["text"] = self._decode(head)[:config.PREVIEW_TEXT_CHARS]
+        except Exception as e:
+            result["error"] = str(e)
+
+        with self._lock:
+            self._cache[key] = result
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return result
+
+    def _profile_csv(self, head, truncated, result):
+        import pandas as pd
+
+        if truncated:
+            # 丢弃样本末尾不完整的一行
+            head = head[:head.rfind(b"\n") + 1]
+        text = self._decode(head)
+        df = pd.read_csv(io.StringIO(text), sep=None, engine="python", nrows=self.sample_rows)
+        self._fill_table(df, result)
+
+        if truncated and len(df):
+            # 按样本中每行的平均字节数估算总行数
+            sample_lines = text.count("\n")
+            result["rows_estimated"] = int(result["size"] / len(head) * sample_lines) - 1
+        elif not truncated:
+            result["rows_estimated"] = len(df)
+
+    def _profile_excel(self, content, result):
+        import pandas as pd
+
+        df = pd.read_excel(io.BytesIO(content), nrows=self.sample_rows)
+        self._fill_table(df, result)
+
+    def _profile_json(self, head, truncated, result):
+        text = self._decode(head)
+        if truncated:
+            result["text"] = text[:config.PREVIEW_TEXT_CHARS]
+            return
+
+        data = json.loads(text)
+        if isinstance(data, list) and data and all(isinstance(item, dict) for item in data[:self.sample_rows]):
+            import pandas as pd
+
+            df = pd.json_normalize(data[:self.sample_rows])
+            self._fill_table(df, result)
+            result["rows_estimated"] = len(data)
+        else:
+            result["text"] = json.dumps(data, ensure_ascii=False, indent=2)[:config.PREVIEW_TEXT_CHARS]
+
+    def _fill_table(self, df, result):
+        result["rows_sampled"] = len(df)
+        result["columns"] = [
+            {"name": str(name), "dtype": str(dtype), "nulls": int(df[name].isna().sum())}
+            for name, dtype in df.dtypes.items()
+        ]
+        result["preview"] = df.head(config.PREVIEW_DISPLAY_ROWS)
+
+    @staticmethod
+    def _detect_format(file_name):
+        suffix = Path(file_name or "").suffix.lower()
+        if suffix in (".csv", ".tsv"):
+            return "csv"
+        if suffix in (".xlsx", ".xls"):
+            return "excel"
+        if suffix == ".json":
+            return "json"
+        return "text"
+
+    @staticmethod
+    def _decode(data):
+        for encoding in TEXT_ENCODINGS:
+            try:
+                return data.decode(encoding)
+            except UnicodeDecodeError:
+                continue
+        return data.decode("utf-8", errors="replace")
+
+
+def format_schema(profile, max_columns=config.PREVIEW_PROMPT_MAX_COLUMNS):
+    """
+    把分析结果转换为写入生成提示的简短结构描述（只包含列名和类型，不包含数据）
+
+    参数:
+        profile (dict): DataProfiler.profile 的返回值
+        max_columns (int): 最多列出的列数
+
+    返回:
+        str: 结构描述，无法识别表结构时返回空字符串
+    """
+    columns = profile.get("columns")
+    if not columns:
+        return ""
+
+    listed = ", ".join(f"{c['name']}: {c['dtype']}" for c in columns[:max_columns])
+    if len(columns) > max_columns:
+        listed += f", ... 共 {len(columns)} 列"
+    rows = profile.get("rows_estimated")
+    if rows is None:
+        rows_text = ""
+    elif profile.get("truncated"):
+        rows_text = f"，约 {rows} 行"
+    else:
+        rows_text = f"，{rows} 行"
+    return f"列: {listed}{rows_text}"
+
+
+_default_profiler = None
+_default_profiler_lock = threading.Lock()
+
+
+def get_data_profiler():
+    """获取进程内共享的数据分析器"""
+    global _default_profiler
+    with _default_profiler_lock:
+        if _default_profiler is None:
+            _default_profiler = DataProfiler()
+        return _default_profiler
@@ -0,0 +1,78 @@
+"""
+下载缓存 - 按需读取归档文件内容，并在内存中保留最近提供过的归档
+"""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+
+import config
+
+
+class ArchiveCache:
+    """按总字节数限制大小的归档内容LRU缓存"""
+
+    def __init__(self, max_bytes=config.DOWNLOAD_CACHE_MAX_BYTES):
+        """
+        参数:
+            max_bytes (int): 缓存内容的总字节数上限
+        """
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        读取归档内容，文件修改后自动失效
+
+        参数:
+            path (str/Path): 归档文件路径
+
+        返回:
+            bytes: 文件内容
+        """
+        st = os.stat(path)
+        key = (os.fspath(path), st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                return data
+
+        data = self._read(path, st.st_size)
+
+        with self._lock:
+            # 同一路径的旧版本不再需要
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                self._total_bytes -= len(self._entries.pop(old_key))
+            if key not in self._entries and len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._total_bytes += len(data)
+                while self._total_bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._total_bytes -= len(evicted)
+        return data
+
+    @staticmethod
+    def _read(path, size):
+        """通过内存映射一次性读取文件"""
+        if size == 0:
+            return b""
+        with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return mm[:]
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_archive_cache():
+    """获取进程内共享的归档缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ArchiveCache()
+        return _default_cache
@@ -0,0 +1,182 @@
+"""
+生成结果缓存 - 以提示内容、模型和生成参数的哈希为键，持久化保存解析后的文件
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+import config
+
+
+class GenerationCache:
+    """基于内容哈希的磁盘缓存，按数量、总大小和存活时间进行LRU淘汰"""
+
+    INDEX_FILE = "index.json"
+
+    def __init__(self, cache_dir=config.GENERATION_CACHE_DIR,
+                 max_entries=config.GENERATION_CACHE_MAX_ENTRIES,
+                 max_bytes=config.GENERATION_CACHE_MAX_BYTES,
+                 max_age=config.GENERATION_CACHE_MAX_AGE):
+        """
+        初始化生成缓存
+
+        参数:
+            cache_dir (str/Path): 缓存目录
+            max_entries (int): 最多保留的条目数
+            max_bytes (int): 缓存文件总大小上限（字节）
+            max_age (int): 条目最长保留时间（秒）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._index = None
+
+    @staticmethod
+    def make_key(prompt, model, temperature, max_tokens):
+        """
+        根据完整提示和生成参数计算缓存键
+
+        参数:
+            prompt (str): 完整构建的提示
+            model (str): 模型名称
+            temperature (float): 采样温度
+            max_tokens (int): 最大输出token数
+
+        返回:
+            str: SHA-256 十六进制摘要
+        """
+        payload = json.dumps({
+            "prompt": prompt,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens
+        }, ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """
+        读取缓存的文件列表
+
+        参数:
+            key (str): 缓存键
+
+        返回:
+            list: 缓存的 files_data，未命中或已过期时返回 None
+        """
+        with self._lock:
+            index = self._load_index()
+            entry = index.get(key)
+            if entry is None:
+                return None
+
+            now = time.time()
+            if now - entry["created"] > self.max_age:
+                self._remove_entry(index, key)
+                self._save_index()
+                return None
+
+            try:
+                with open(self._entry_path(key), "r", encoding="utf-8") as f:
+                    files_data = json.load(f)["files"]
+            except (OSError, ValueError, KeyError):
+                # 条目文件丢失或损坏，视为未命中
+                self._remove_entry(index, key)
+                self._save_index()
+                return None
+
+            entry["last_access"] = now
+            self._save_index()
+            return files_data
+
+    def put(self, key, files_data):
+        """
+        写入缓存并按需淘汰旧条目
+
+        参数:
+            key (str): 缓存键
+            files_data (list): 解析后的文件列表
+        """
+        with self._lock:
+            index = self._load_index()
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+            data = json.dumps({"files": files_data}, ensure_ascii=False).encode("utf-8")
+            entry_path = self._entry_path(key)
+            tmp_path = entry_path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, entry_path)
+
+            now = time.time()
+            index[key] = {"created": now, "last_access": now, "size": len(data)}
+            self._evict(index, now)
+            self._save_index()
+
+    def clear(self):
+        """清空所有缓存条目"""
+        with self._lock:
+            index = self._load_index()
+            for key in list(index):
+                self._remove_entry(index, key)
+            self._save_index()
+
+    def _evict(self, index, now):
+        """删除过期条目，然后按最近访问时间淘汰直到满足数量和大小限制"""
+        for key in [k for k, e in index.items() if now - e["created"] > self.max_age]:
+            self._remove_entry(index, key)
+
+        total_bytes = sum(e["size"] for e in index.values())
+        for key in sorted(index, key=lambda k: index[k]["last_access"]):
+            if len(index) <= self.max_entries and total_bytes <= self.max_bytes:
+                break
+            total_bytes -= index[key]["size"]
+            self._remove_entry(index, key)
+
+    def _remove_entry(self, index, key):
+        """从索引和磁盘中删除条目"""
+        index.pop(key, None)
+        try:
+            self._entry_path(key).unlink()
+        except OSError:
+            pass
+
+    def _entry_path(self, key):
+        return self.cache_dir / f"{key}.json"
+
+    def _load_index(self):
+        """加载缓存索引（进程内只读取一次磁盘）"""
+        if self._index is None:
+            try:
+                with open(self.cache_dir / self.INDEX_FILE, "r", encoding="utf-8") as f:
+                    self._index = json.load(f)
+            except (OSError, ValueError):
+                self._index = {}
+        return self._index
+
+    def _save_index(self):
+        """原子地写回缓存索引"""
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        index_path = self.cache_dir / self.INDEX_FILE
+        tmp_path = index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, index_path)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_generation_cache():
+    """获取进程内共享的生成缓存实例"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = GenerationCache()
+        return _default_cache
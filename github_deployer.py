@@ -0,0 +1,442 @@
+"""
+GitHub部署器 - 将生成的应用部署到GitHub组织仓库
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import quote
+
+import config
+from http_client import HttpClient, backoff_delay, get_http_client
+from telemetry import get_telemetry
+
+
+class RateLimitThrottle:
+    """根据GitHub速率限制响应头协调所有上传线程的发送节奏"""
+
+    def __init__(self, low_watermark=config.GITHUB_RATE_LIMIT_LOW_WATERMARK):
+        """
+        参数:
+            low_watermark (int): 剩余配额低于该值时开始按重置时间均匀放慢请求
+        """
+        self.low_watermark = low_watermark
+        self._lock = threading.Lock()
+        self._resume_at = 0.0
+
+    def wait(self):
+        """在发送请求前等待，直到暂停期结束"""
+        while True:
+            with self._lock:
+                delay = self._resume_at - time.time()
+            if delay <= 0:
+                return
+            time.sleep(min(delay, 1.0))
+
+    def observe(self, response):
+        """
+        根据响应头更新暂停时间
+
+        参数:
+            response (requests.Response): GitHub API响应
+
+        返回:
+            bool: 该响应是否为速率限制拒绝（调用方应重试）
+        """
+        headers = response.headers
+        now = time.time()
+        pause_until = 0.0
+
+        retry_after = headers.get("Retry-After")
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset = headers.get("X-RateLimit-Reset")
+
+        if retry_after:
+            try:
+                pause_until = now + float(retry_after)
+            except ValueError:
+                pass
+        elif remaining is not None and reset is not None:
+            try:
+                remaining, reset = int(remaining), float(reset)
+            except ValueError:
+                remaining = None
+            if remaining == 0:
+                pause_until = reset
+            elif remaining is not None and remaining < self.low_watermark:
+                # 配额将尽，把剩余请求均匀分布到重置之前
+                pause_until = now + max(0.0, reset - now) / remaining
+
+        if pause_until > now:
+            with self._lock:
+                self._resume_at = max(self._resume_at, pause_until)
+
+        # 二级速率限制以403/429返回
+        return response.status_code in (403, 429) and (bool(retry_after) or remaining == 0)
+
+
+class StreamedBlobBody:
+    """按块从磁盘读取并Base64编码的JSON请求体，可重复迭代以支持重试"""
+
+    CHUNK_SIZE = 3 * 256 * 1024  # 3的倍数，保证分块编码结果可直接拼接
+
+    def __init__(self, file_path, extra_fields=None):
+        """
+        参数:
+            file_path (str): 待上传文件路径
+            extra_fields (dict): 除content外的其他JSON字段
+        """
+        self.file_path = file_path
+        fields = dict(extra_fields or {})
+        fields["content"] = ""
+        # 以占位内容序列化，然后在content的引号之间插入编码数据
+        encoded = json.dumps(fields).encode("utf-8")
+        split_at = encoded.index(b'"content": ""') + len(b'"content": "')
+        self.prefix = encoded[:split_at]
+        self.suffix = encoded[split_at:]
+        size = os.path.getsize(file_path)
+        self.length = len(self.prefix) + 4 * ((size + 2) // 3) + len(self.suffix)
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        yield self.prefix
+        with open(self.file_path, "rb") as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield base64.b64encode(chunk)
+        yield self.suffix
+
+
+class UploadPipeline:
+    """有界并发的上传引擎，在调用线程中按完成顺序回报进度"""
+
+    def __init__(self, upload_func, max_workers=config.GITHUB_UPLOAD_WORKERS):
+        """
+        参数:
+            upload_func (callable): 上传单个文件的函数，参数为文件字典，返回结果
+            max_workers (int): 最大并发上传数
+        """
+        self.upload_func = upload_func
+        self.max_workers = max(1, max_workers)
+
+    def run(self, items, on_complete=None):
+        """
+        上传所有文件
+
+        参数:
+            items (list): 文件字典列表
+            on_complete (callable): 每个文件完成时的回调，参数为 (文件字典, 结果, 已完成数, 总数)
+
+        返回:
+            list: 与items顺序一致的结果列表
+        """
+        results = [None] * len(items)
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.upload_func, item): i for i, item in enumerate(items)}
+            try:
+                for done, future in enumerate(as_completed(futures), start=1):
+                    i = futures[future]
+                    results[i] = future.result()
+                    if on_complete:
+                        on_complete(items[i], results[i], done, len(items))
+            except BaseException:
+                # 任意文件失败时取消尚未开始的上传
+                for future in futures:
+                    future.cancel()
+                raise
+        return results
+
+
+class GitHubDeployer:
+    """通过Git Data API以单次提交的方式部署应用"""
+
+    def __init__(self, github_token, org=config.GITHUB_ORG, api_url=config.GITHUB_API_URL,
+                 max_workers=config.GITHUB_UPLOAD_WORKERS):
+        """
+        初始化GitHub部署器
+
+        参数:
+            github_token (str): GitHub访问令牌
+            org (str): 目标组织名称
+            api_url (str): GitHub API根地址（可指向本地模拟服务器）
+            max_workers (int): 并行上传的最大线程数
+        """
+        self.org = org
+        self.api_url = api_url.rstrip("/")
+        self.max_workers = max_workers
+        self.throttle = RateLimitThrottle()
+        self.http = get_http_client()
+        self.telemetry = get_telemetry()
+        self.timeout = (config.HTTP_CONNECT_TIMEOUT, config.GITHUB_API_TIMEOUT)
+        self.headers = {
+            "Authorization": f"token {github_token}",
+            "Accept": "application/vnd.github.v3+json"
+        }
+
+    @staticmethod
+    def normalize_repo_name(app_name):
+        """规范化仓库名（移除空格，使用短横线分隔，移除其他非法字符）"""
+        repo_name = app_name.lower().replace(" ", "-")
+        return ''.join(c for c in repo_name if c.isalnum() or c == '-')
+
+    def deploy(self, app_dir, app_name, progress_callback=None, strategy=config.GITHUB_DEPLOY_STRATEGY):
+        """
+        创建仓库并上传应用文件
+
+        参数:
+            app_dir (str/Path): 应用源代码目录
+            app_name (str): 应用名称
+            progress_callback (callable): 进度回调，参数为 (详情, 百分比)
+            strategy (str): 'git_data' 单次提交部署，或 'contents' 逐文件提交
+
+        返回:
+            dict: 包含部署结果的字典
+        """
+        def report(details, percent):
+            if progress_callback:
+                progress_callback(details, percent)
+
+        with self.telemetry.span("deploy", strategy=strategy) as root:
+            try:
+                repo_name = self.normalize_repo_name(app_name)
+
+                # 1. 创建仓库
+                report("正在创建仓库...", 85)
+                with self.telemetry.span("deploy.create_repo"):
+                    response = self._request("POST", f"/orgs/{self.org}/repos", json={
+                        "name": repo_name,
+                        "description": f"Streamlit 应用: {app_name}",
+                        "private": False,
+                        "auto_init": True
+                    })
+                if response.status_code != 201:
+                    error = f"创建仓库失败: {self._error_message(response)}"
+                    root.set_error(error)
+                    return {"success": False, "error": error}
+
+                repo_info = response.json()
+                branch = repo_info.get("default_branch", "main")
+
+                # 2. 收集待上传文件（只记录路径，上传时再读取内容）
+                files = self._collect_files(app_dir)
+                root.set_attribute("files", len(files))
+                root.add_bytes(sum(f["size"] for f in files))
+
+                if strategy == "contents":
+                    self._deploy_contents(repo_name, files, report)
+                    commit_sha = None
+                else:
+                    commit_sha = self._deploy_git_data(repo_name, branch, files, report)
+
+                report("应用已成功部署到 GitHub！", 100)
+                return {
+                    "success": True,
+                    "repo_url": repo_info["html_url"],
+                    "repo_name": repo_name,
+                    "org": self.org,
+                    "commit_sha": commit_sha
+                }
+
+            except Exception as e:
+                root.set_error(str(e))
+                return {"success": False, "error": str(e)}
+
+    def _collect_files(self, app_dir):
+        """遍历应用目录，缺少requirements.txt时补充默认依赖"""
+        files = []
+        for root, dirs, names in os.walk(app_dir):
+            for name in names:
+                file_path = os.path.join(root, name)
+                rel_path = os.path.relpath(file_path, app_dir).replace(os.sep, "/")
+                files.append({
+                    "path": rel_path,
+                    "source": file_path,
+                    "size": os.path.getsize(file_path),
+                    "executable": os.access(file_path, os.X_OK)
+                })
+
+        if not any(f["path"] == "requirements.txt" for f in files):
+            content = config.GITHUB_DEFAULT_REQUIREMENTS.encode("utf-8")
+            files.append({
+                "path": "requirements.txt",
+                "content": content,
+                "size": len(content),
+                "executable": False
+            })
+        return files
+
+    def _deploy_git_data(self, repo_name, branch, files, report):
+        """并行创建blob，然后用一个tree和一个commit移动分支引用"""
+        repo_path = f"/repos/{self.org}/{repo_name}"
+
+        # 等待仓库初始化完成（轮询分支引用，代替固定等待）
+        with self.telemetry.span("deploy.wait_branch"):
+            parent_sha = self._wait_for_branch(repo_name, branch)
+            response = self._request("GET", f"{repo_path}/git/commits/{parent_sha}")
+            self._raise_for_status(response, "读取初始提交失败")
+            base_tree = response.json()["tree"]["sha"]
+
+        # 并行创建blob
+        total_bytes = sum(f["size"] for f in files)
+        uploaded_bytes = 0
+
+        def on_complete(file_item, blob_sha, done, total):
+            nonlocal uploaded_bytes
+            uploaded_bytes += file_item["size"]
+            report(f"已上传文件: {file_item['path']} ({done}/{total}, {self._format_size(uploaded_bytes)}/"
+                   f"{self._format_size(total_bytes)})", 85 + int(10 * done / total))
+
+        pipeline = UploadPipeline(lambda f: self._create_blob(repo_name, f), self.max_workers)
+        with self.telemetry.span("deploy.blobs", files=len(files)) as span:
+            blob_shas = pipeline.run(files, on_complete)
+            span.add_bytes(total_bytes)
+        tree_entries = [{
+            "path": file_item["path"],
+            "mode": "100755" if file_item["executable"] else "100644",
+            "type": "blob",
+            "sha": blob_sha
+        } for file_item, blob_sha in zip(files, blob_shas)]
+
+        # 创建tree和commit
+        report("正在创建提交...", 96)
+        with self.telemetry.span("deploy.tree"):
+            response = self._request("POST", f"{repo_path}/git/trees", json={
+                "base_tree": base_tree,
+                "tree": sorted(tree_entries, key=lambda e: e["path"])
+            })
+            self._raise_for_status(response, "创建目录树失败")
+            tree_sha = response.json()["sha"]
+
+        with self.telemetry.span("deploy.commit"):
+            response = self._request("POST", f"{repo_path}/git/commits", json={
+                "message": "部署 Streamlit 应用",
+                "tree": tree_sha,
+                "parents": [parent_sha]
+            })
+            self._raise_for_status(response, "创建提交失败")
+            commit_sha = response.json()["sha"]
+
+        # 移动分支引用
+        with self.telemetry.span("deploy.update_ref"):
+            response = self._request("PATCH", f"{repo_path}/git/refs/heads/{branch}", json={"sha": commit_sha})
+            self._raise_for_status(response, "更新分支失败")
+        return commit_sha
+
+    def _deploy_contents(self, repo_name, files, report):
+        """
+        逐个文件通过Contents API上传（每个文件一次提交）
+
+        同一分支上的Contents API写入会互相冲突，因此该策略固定为单线程，
+        只复用上传引擎的节流、流式读取和进度回报。覆盖仓库初始化时已有的文件
+        （如README.md）需要提供其当前的blob SHA。
+        """
+        existing = self._root_contents(repo_name)
+
+        def upload(file_item):
+            fields = {"message": f"上传 {file_item['path']}"}
+            if file_item["path"] in existing:
+                fields["sha"] = existing[file_item["path"]]
+            response = self._send_file("PUT", f"/repos/{self.org}/{repo_name}/contents/{quote(file_item['path'])}",
+                                       file_item, fields)
+            self._raise_for_status(response, f"上传文件 {file_item['path']} 失败")
+
+        def on_complete(file_item, result, done, total):
+            report(f"已上传文件: {file_item['path']} ({done}/{total})", 85 + int(10 * done / total))
+
+        with self.telemetry.span("deploy.contents", files=len(files)) as span:
+            UploadPipeline(upload, max_workers=1).run(files, on_complete)
+            span.add_bytes(sum(f["size"] for f in files))
+
+    def _root_contents(self, repo_name):
+        """读取仓库根目录中已有文件的 {路径: blob SHA}，仓库为空时返回空字典"""
+        response = self._request("GET", f"/repos/{self.org}/{repo_name}/contents/")
+        if response.status_code == 404:
+            return {}
+        self._raise_for_status(response, "读取仓库文件列表失败")
+        return {item["path"]: item["sha"] for item in response.json() if item.get("type") == "file"}
+
+    def _create_blob(self, repo_name, file_item):
+        """创建单个blob并返回其SHA"""
+        response = self._send_file("POST", f"/repos/{self.org}/{repo_name}/git/blobs", file_item,
+                                   {"encoding": "base64"})
+        self._raise_for_status(response, f"上传文件 {file_item['path']} 失败")
+        return response.json()["sha"]
+
+    def _send_file(self, method, path, file_item, fields):
+        """发送包含Base64文件内容的请求，大文件从磁盘流式编码"""
+        if "content" not in file_item and file_item["size"] > config.GITHUB_STREAM_THRESHOLD:
+            body = StreamedBlobBody(file_item["source"], fields)
+            return self._request(method, path, data=body, extra_headers={"Content-Type": "application/json"})
+
+        payload = dict(fields)
+        payload["content"] = base64.b64encode(self._read_file(file_item)).decode("utf-8")
+        return self._request(method, path, json=payload)
+
+    def _wait_for_branch(self, repo_name, branch):
+        """轮询分支引用直到仓库初始化完成，返回分支头提交的SHA"""
+        deadline = time.monotonic() + config.GITHUB_INIT_TIMEOUT
+        delay = 0.2
+        while True:
+            response = self._request("GET", f"/repos/{self.org}/{repo_name}/git/ref/heads/{branch}")
+            if response.status_code == 200:
+                return response.json()["object"]["sha"]
+            if response.status_code not in (404, 409) or time.monotonic() + delay > deadline:
+                raise Exception(f"仓库初始化失败: {self._error_message(response)}")
+            time.sleep(delay)
+            delay = min(delay * 2, 2.0)
+
+    @staticmethod
+    def _read_file(file_item):
+        """读取待上传文件的内容"""
+        if "content" in file_item:
+            return file_item["content"]
+        with open(file_item["source"], "rb") as f:
+            return f.read()
+
+    def _request(self, method, path, extra_headers=None, **kwargs):
+        """
+        发送GitHub API请求，遵循速率限制节流，被限流或返回5xx时重试
+
+        这里是唯一的状态码重试层：共享客户端只重试连接失败，限流的等待时间由节流器设置，
+        所有上传线程一起暂停
+        """
+        headers = dict(self.headers, **(extra_headers or {}))
+        for attempt in range(config.GITHUB_RATE_LIMIT_RETRIES + 1):
+            self.throttle.wait()
+            response = self.http.request(method, f"{self.api_url}{path}", headers=headers,
+                                         timeout=self.timeout, retry_status=False, **kwargs)
+            self.telemetry.count("github_requests_total", method=method, status=response.status_code)
+            if self.throttle.observe(response):
+                continue
+            if response.status_code not in HttpClient.RETRY_STATUS_CODES or attempt == config.GITHUB_RATE_LIMIT_RETRIES:
+                break
+            response.close()
+            time.sleep(backoff_delay(attempt))
+        return response
+
+    @staticmethod
+    def _format_size(num_bytes):
+        """格式化字节数"""
+        for unit in ("B", "KB", "MB"):
+            if num_bytes < 1024:
+                return f"{num_bytes:.0f} {unit}" if unit == "B" else f"{num_bytes:.1f} {unit}"
+            num_bytes /= 1024
+        return f"{num_bytes:.1f} GB"
+
+    def _raise_for_status(self, response, message):
+        if response.status_code not in (200, 201):
+            raise Exception(f"{message}: {self._error_message(response)}")
+
+    @staticmethod
+    def _error_message(response):
+        try:
+            return response.json().get("message", "未知错误")
+        except ValueError:
+            return response.text or "未知错误"
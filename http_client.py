@@ -0,0 +1,183 @@
+"""
+共享HTTP客户端 - 按主机复用连接池，统一超时和重试策略
+"""
+
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import ConnectTimeoutError, NewConnectionError
+
+import config
+
+
+def backoff_delay(attempt, factor=config.HTTP_BACKOFF_FACTOR, maximum=config.HTTP_BACKOFF_MAX):
+    """指数退避加随机抖动"""
+    delay = min(maximum, factor * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def parse_retry_after(value):
+    """解析 Retry-After 头（秒数或HTTP日期），无法解析时返回 None"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class HttpClient:
+    """按主机维护keep-alive连接池的HTTP客户端，对429/5xx进行指数退避重试"""
+
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+    def __init__(self, connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+                 read_timeout=config.HTTP_READ_TIMEOUT,
+                 max_retries=config.HTTP_MAX_RETRIES,
+                 backoff_factor=config.HTTP_BACKOFF_FACTOR,
+                 backoff_max=config.HTTP_BACKOFF_MAX,
+                 pool_maxsize=config.HTTP_POOL_MAXSIZE):
+        """
+        初始化HTTP客户端
+
+        参数:
+            connect_timeout (float): 建立连接的超时时间（秒）
+            read_timeout (float): 读取响应的超时时间（秒）
+            max_retries (int): 最大重试次数
+            backoff_factor (float): 指数退避的基础等待时间（秒）
+            backoff_max (float): 单次等待时间上限（秒）
+            pool_maxsize (int): 每个主机的最大连接数
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def request(self, method, url, timeout=None, retry=True, retry_status=True, **kwargs):
+        """
+        发送HTTP请求，连接失败或返回429/5xx时自动重试
+
+        参数:
+            method (str): HTTP方法
+            url (str): 请求URL
+            timeout (float/tuple): 超时设置，默认使用客户端配置
+            retry (bool): 是否启用重试
+            retry_status (bool): 是否对429/5xx响应重试；调用方自行处理限流和重试时关闭，
+                只保留连接失败的重试
+            **kwargs: 透传给 requests.Session.request 的参数
+
+        返回:
+            requests.Response: 最后一次请求的响应
+        """
+        method = method.upper()
+        session = self._get_session(url)
+        max_retries = self.max_retries if retry else 0
+        timeout = timeout if timeout is not None else self.timeout
+
+        attempt = 0
+        while True:
+            try:
+                response = session.request(method, url, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                # 非幂等请求只在连接阶段失败时重试；请求发出后连接被重置时服务端可能已经执行
+                if attempt >= max_retries or not (method in self.IDEMPOTENT_METHODS or self._connect_failed(e)):
+                    raise
+                time.sleep(self._backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if not retry_status or response.status_code not in self.RETRY_STATUS_CODES or attempt >= max_retries:
+                return response
+
+            delay = self._parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = self._backoff_delay(attempt)
+            response.close()
+            time.sleep(min(delay, self.backoff_max))
+            attempt += 1
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request("PUT", url, **kwargs)
+
+    def patch(self, url, **kwargs):
+        return self.request("PATCH", url, **kwargs)
+
+    @staticmethod
+    def _connect_failed(error):
+        """错误是否发生在建立连接阶段（请求还没有发出），沿异常链查找urllib3的连接错误"""
+        if isinstance(error, requests.ConnectTimeout):
+            return True
+        pending = [error]
+        seen = set()
+        while pending:
+            current = pending.pop()
+            if not isinstance(current, BaseException) or id(current) in seen:
+                continue
+            seen.add(id(current))
+            if isinstance(current, (NewConnectionError, ConnectTimeoutError)):
+                return True
+            # requests把urllib3的 MaxRetryError 放在 args 中，连接错误是它的 reason
+            pending.extend(current.args)
+            pending.extend((getattr(current, "reason", None), current.__cause__, current.__context__))
+        return False
+
+    def _get_session(self, url):
+        """获取（或创建）目标主机对应的会话"""
+        parts = urlsplit(url)
+        host_key = f"{parts.scheme}://{parts.netloc}"
+
+        with self._lock:
+            session = self._sessions.get(host_key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_maxsize, max_retries=0)
+                session.mount(f"{parts.scheme}://", adapter)
+                self._sessions[host_key] = session
+            return session
+
+    def _backoff_delay(self, attempt):
+        return backoff_delay(attempt, self.backoff_factor, self.backoff_max)
+
+    @staticmethod
+    def _parse_retry_after(value):
+        return parse_retry_after(value)
+
+    def close(self):
+        """关闭所有连接池"""
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """获取进程内共享的HTTP客户端"""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -0,0 +1,200 @@
+"""
+后台任务队列 - 在线程池中执行耗时的生成任务，持久化任务状态并支持取消
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import config
+
+
+class JobCancelled(Exception):
+    """任务被用户取消"""
+
+    # 追踪中把该异常结束的阶段记为取消而不是失败
+    cancelled = True
+
+
+class Job:
+    """单个后台任务的状态，任务函数通过它回报进度"""
+
+    def __init__(self, job_id, kind, params, manager):
+        self.id = job_id
+        self.kind = kind
+        self.params = params
+        self.status = "pending"
+        self.progress = {"stage": "排队中", "details": "任务已提交，等待执行...", "percent": 0}
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created = time.time()
+        self.updated = self.created
+        self.cancel_event = threading.Event()
+        self._manager = manager
+
+    def update_progress(self, stage, details, percent=None):
+        """更新任务进度"""
+        if percent is None:
+            percent = self.progress["percent"]
+        self.progress = {"stage": stage, "details": details, "percent": percent}
+        self._manager.persist(self)
+
+    def add_event(self, message):
+        """记录一条任务事件（如某个文件已生成）"""
+        self.events.append(message)
+        del self.events[:-config.JOB_MAX_EVENTS]
+        self._manager.persist(self)
+
+    def check_cancelled(self):
+        """任务被取消时抛出 JobCancelled"""
+        if self.cancel_event.is_set():
+            raise JobCancelled("任务已取消")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "params": self.params,
+            "status": self.status,
+            "progress": self.progress,
+            "events": list(self.events),
+            "result": self.result,
+            "error": self.error,
+            "created": self.created,
+            "updated": self.updated
+        }
+
+
+class JobManager:
+    """进程内共享的后台任务管理器"""
+
+    FINISHED_STATUSES = ("succeeded", "failed", "cancelled", "interrupted")
+
+    def __init__(self, state_dir=config.JOB_STATE_DIR, max_workers=config.JOB_MAX_WORKERS):
+        """
+        参数:
+            state_dir (str/Path): 任务状态的持久化目录
+            max_workers (int): 同时执行的最大任务数
+        """
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._recover()
+
+    def submit(self, kind, func, params, secret_keys=()):
+        """
+        提交任务
+
+        参数:
+            kind (str): 任务类型
+            func (callable): 任务函数，参数为 (job, params)，返回结果字典
+            params (dict): 任务参数
+            secret_keys (iterable): 不写入磁盘的敏感参数名（如API密钥）
+
+        返回:
+            str: 任务ID
+        """
+        job_id = uuid.uuid4().hex[:12]
+        public_params = {k: v for k, v in params.items() if k not in set(secret_keys)}
+        job = Job(job_id, kind, public_params, self)
+
+        with self._lock:
+            self._jobs[job_id] = job
+        self.persist(job)
+        self._executor.submit(self._run, job, func, params)
+        return job_id
+
+    def get(self, job_id):
+        """
+        获取任务状态快照；本进程中不存在的任务从磁盘读取
+
+        返回:
+            dict: 任务状态，任务不存在时返回 None
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None:
+                return job.to_dict()
+        return self._load(job_id)
+
+    def cancel(self, job_id):
+        """请求取消任务；尚未开始的任务不会再执行"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or job.status in self.FINISHED_STATUSES:
+            return False
+        job.cancel_event.set()
+        job.update_progress("正在取消", "已请求取消，正在停止任务...")
+        return True
+
+    def persist(self, job):
+        """把任务状态原子地写入磁盘"""
+        job.updated = time.time()
+        path = self.state_dir / f"{job.id}.json"
+        tmp_path = path.with_name(f"{job.id}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(job.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def _run(self, job, func, params):
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.update_progress("已取消", "任务在开始前被取消", 100)
+            return
+
+        job.status = "running"
+        self.persist(job)
+        try:
+            job.result = func(job, params)
+            job.status = "succeeded"
+            self.persist(job)
+        except JobCancelled:
+            job.status = "cancelled"
+            job.update_progress("已取消", "任务已被取消", 100)
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.update_progress("失败", f"任务失败: {str(e)}", 100)
+
+    def _load(self, job_id):
+        try:
+            with open(self.state_dir / f"{job_id}.json", "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _recover(self):
+        """启动时处理上次进程遗留的任务：标记中断的任务，清理过期的任务记录"""
+        now = time.time()
+        for path in self.state_dir.glob("*.json"):
+            data = self._load(path.stem)
+            if data is None:
+                continue
+            if now - data.get("updated", 0) > config.JOB_RETENTION:
+                path.unlink(missing_ok=True)
+            elif data["status"] not in self.FINISHED_STATUSES:
+                data["status"] = "interrupted"
+                data["error"] = "服务重启，任务已中断"
+                data["progress"] = {"stage": "已中断", "details": "服务重启，任务已中断，请重新生成", "percent": 100}
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(data, f, ensure_ascii=False)
+
+
+_default_manager = None
+_default_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """获取进程内共享的任务管理器"""
+    global _default_manager
+    with _default_manager_lock:
+        if _default_manager is None:
+            _default_manager = JobManager()
+        return _default_manager
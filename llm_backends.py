@@ -0,0 +1,368 @@
+"""
+LLM后端 - 补全、流式补全和模型列表的异步接口，OpenAI兼容服务和本地模型服务的实现，
+以及在同步代码中调用异步后端的桥接函数
+"""
+
+import abc
+import asyncio
+import contextlib
+import hashlib
+import json
+import queue
+import threading
+import weakref
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit
+
+import httpx
+
+import config
+from http_client import HttpClient, backoff_delay, parse_retry_after
+
+
+class BackendError(Exception):
+    """后端请求失败（非200响应或无法连接）"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class LLMBackend(abc.ABC):
+    """
+    LLM后端的异步接口
+
+    消息使用 chat/completions 的格式（[{"role", "content"}]），complete 的返回值与
+    OpenAI的响应格式相同，因此调用方不需要关心具体服务。
+    """
+
+    @abc.abstractmethod
+    async def complete(self, messages, model, temperature=config.DEFAULT_TEMPERATURE, max_tokens=None):
+        """
+        非流式补全
+
+        返回:
+            dict: {"choices": [{"message": {"role", "content"}, "finish_reason"}], "usage"}
+        """
+
+    @abc.abstractmethod
+    def stream(self, messages, model, temperature=config.DEFAULT_TEMPERATURE, max_tokens=None, state=None):
+        """
+        流式补全（异步生成器）
+
+        参数:
+            state (dict): 响应结束后写入 finish_reason
+
+        返回:
+            async generator: 逐段产出模型生成的文本
+        """
+
+    @abc.abstractmethod
+    async def list_models(self):
+        """
+        列出服务提供的模型
+
+        返回:
+            list: 模型字典，至少包含 id，其余字段（上下文长度、价格等）原样保留
+        """
+
+    def accepts_model(self, model_id):
+        """模型是否可以用于生成应用（用于过滤模型目录）"""
+        return True
+
+    async def aclose(self):
+        """释放连接等资源"""
+
+
+class OpenAICompatibleBackend(LLMBackend):
+    """
+    OpenAI兼容服务（/chat/completions 和 /models）
+
+    每个事件循环使用一个带连接池的 httpx.AsyncClient；连接失败或返回429/5xx时按与
+    HttpClient 相同的策略退避重试，流式请求只在收到响应内容前重试。
+    """
+
+    RETRY_STATUS_CODES = HttpClient.RETRY_STATUS_CODES
+
+    def __init__(self, api_endpoint, api_key, read_timeout=config.HTTP_READ_TIMEOUT,
+                 max_connections=config.LLM_POOL_MAX_CONNECTIONS, max_retries=config.HTTP_MAX_RETRIES):
+        """
+        参数:
+            api_endpoint (str): API端点（以 / 结尾，如 https://api.openai.com/v1/），
+                也可以直接是 chat/completions 的完整URL
+            api_key (str): API密钥，为空时不发送 Authorization 头
+            read_timeout (float): 读取响应的超时时间（秒）
+            max_connections (int): 连接池的最大连接数，超出的请求排队等待
+            max_retries (int): 最大重试次数
+        """
+        if "chat/completions" in api_endpoint:
+            self.chat_url = api_endpoint
+            self.api_base = api_endpoint[:api_endpoint.index("chat/completions")]
+        else:
+            self.api_base = api_endpoint if api_endpoint.endswith("/") else api_endpoint + "/"
+            self.chat_url = f"{self.api_base}chat/completions"
+        self.api_key = api_key
+        self.max_retries = max_retries
+        self.timeout = httpx.Timeout(config.HTTP_CONNECT_TIMEOUT, read=read_timeout, pool=None)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=min(max_connections, config.LLM_POOL_MAX_KEEPALIVE))
+        # httpx的客户端不能跨事件循环使用
+        self._clients = weakref.WeakKeyDictionary()
+        # 被移出缓存的后端可能仍有进行中的请求，等请求结束后再关闭连接池
+        self._in_flight = 0
+        self._closing = False
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            client = httpx.AsyncClient(headers=headers, timeout=self.timeout, limits=self.limits)
+            self._clients[loop] = client
+        return client
+
+    @contextlib.asynccontextmanager
+    async def _request_scope(self):
+        """记录进行中的请求；后端已被关闭时在最后一个请求结束后关闭客户端"""
+        self._in_flight += 1
+        try:
+            yield
+        finally:
+            self._in_flight -= 1
+            if self._closing and not self._in_flight:
+                await self._close_client()
+
+    def _payload(self, messages, model, temperature, max_tokens, stream=False):
+        data = {
+            "model": model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens or config.DEFAULT_MAX_TOKENS
+        }
+        if stream:
+            data["stream"] = True
+        return data
+
+    async def _send(self, method, url, stream=False, **kwargs):
+        """
+        发送请求，连接失败或返回429/5xx时重试
+
+        返回:
+            httpx.Response: 最后一次请求的响应；stream 为 True 时响应内容尚未读取，调用方负责关闭
+        """
+        client = self._client()
+        attempt = 0
+        while True:
+            try:
+                request = client.build_request(method, url, **kwargs)
+                response = await client.send(request, stream=stream)
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                if attempt >= self.max_retries:
+                    raise BackendError(f"无法连接到 {url}: {str(e)}") from e
+                await asyncio.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code not in self.RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+
+            delay = parse_retry_after(response.headers.get("Retry-After"))
+            if delay is None:
+                delay = backoff_delay(attempt)
+            await response.aclose()
+            await asyncio.sleep(min(delay, config.HTTP_BACKOFF_MAX))
+            attempt += 1
+
+    async def complete(self, messages, model, temperature=config.DEFAULT_TEMPERATURE, max_tokens=None):
+        async with self._request_scope():
+            response = await self._send("POST", self.chat_url,
+                                        json=self._payload(messages, model, temperature, max_tokens))
+            if response.status_code != 200:
+                raise BackendError(f"API调用失败: {response.text}", response.status_code)
+            return response.json()
+
+    async def stream(self, messages, model, temperature=config.DEFAULT_TEMPERATURE, max_tokens=None, state=None):
+        async with self._request_scope():
+            response = await self._send("POST", self.chat_url, stream=True,
+                                        json=self._payload(messages, model, temperature, max_tokens, stream=True))
+            try:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise BackendError(f"API调用失败: {response.text}", response.status_code)
+
+                # SSE响应通常不声明字符集，按UTF-8解码以免中文乱码
+                response.encoding = "utf-8"
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    payload = line[len("data:"):].strip()
+                    if payload == "[DONE]":
+                        break
+
+                    chunk = json.loads(payload)
+                    choices = chunk.get("choices") or []
+                    if not choices:
+                        continue
+                    if choices[0].get("finish_reason") and state is not None:
+                        state["finish_reason"] = choices[0]["finish_reason"]
+                    content = (choices[0].get("delta") or {}).get("content")
+                    if content:
+                        yield content
+            finally:
+                await response.aclose()
+
+    async def list_models(self):
+        async with self._request_scope():
+            response = await self._send("GET", f"{self.api_base}models",
+                                        timeout=httpx.Timeout(config.HTTP_CONNECT_TIMEOUT,
+                                                              read=config.MODEL_LIST_TIMEOUT))
+            if response.status_code != 200:
+                raise BackendError(f"HTTP {response.status_code}", response.status_code)
+            return response.json().get("data", [])
+
+    def accepts_model(self, model_id):
+        # 仅保留GPT模型
+        return "gpt" in model_id.lower()
+
+    async def aclose(self):
+        self._closing = True
+        if not self._in_flight:
+            await self._close_client()
+
+    async def _close_client(self):
+        """关闭当前事件循环中的客户端；之后再有请求时会重新创建"""
+        loop = asyncio.get_running_loop()
+        client = self._clients.pop(loop, None)
+        if client is not None:
+            await client.aclose()
+
+
+class LocalModelBackend(OpenAICompatibleBackend):
+    """
+    本地模型服务（Ollama、llama.cpp server、vLLM、LM Studio）的适配器
+
+    这些服务都提供OpenAI兼容的 /v1 接口，区别在于：通常不需要密钥；在CPU上生成很慢，
+    读取超时更长；同时只能处理少量请求，连接数较少，多余的请求在客户端排队；
+    模型名与GPT无关，不过滤模型目录；Ollama较早的版本没有 /v1/models，改用 /api/tags。
+    """
+
+    def __init__(self, api_endpoint, api_key=None, read_timeout=config.LOCAL_LLM_READ_TIMEOUT,
+                 max_connections=config.LOCAL_LLM_MAX_CONNECTIONS, max_retries=config.HTTP_MAX_RETRIES):
+        super().__init__(api_endpoint, api_key, read_timeout, max_connections, max_retries)
+
+    async def list_models(self):
+        try:
+            models = await super().list_models()
+        except BackendError:
+            models = []
+        if models:
+            return models
+
+        # Ollama的原生接口位于 /v1 之外
+        parts = urlsplit(self.api_base)
+        tags_url = urlunsplit((parts.scheme, parts.netloc, "/api/tags", "", ""))
+        async with self._request_scope():
+            response = await self._send("GET", tags_url)
+            if response.status_code != 200:
+                raise BackendError(f"HTTP {response.status_code}", response.status_code)
+            return [{"id": model["name"], "owned_by": "local", "size": model.get("size")}
+                    for model in response.json().get("models", [])]
+
+    def accepts_model(self, model_id):
+        return True
+
+
+BACKENDS = {
+    "openai": OpenAICompatibleBackend,
+    "local": LocalModelBackend,
+}
+
+_backends = OrderedDict()
+_backends_lock = threading.Lock()
+
+
+def get_backend(api_endpoint, api_key, kind=None):
+    """
+    获取端点对应的后端（同一端点和密钥共用一个实例及其连接池）
+
+    最多保留 config.LLM_BACKEND_CACHE_SIZE 个实例，超出时在共用的事件循环中关闭最久未使用的后端
+
+    参数:
+        api_endpoint (str): API端点
+        api_key (str): API密钥
+        kind (str): 后端类型（BACKENDS 中的键），默认使用 config.LLM_BACKEND
+
+    返回:
+        LLMBackend: 后端实例
+    """
+    kind = kind or config.LLM_BACKEND
+    if kind not in BACKENDS:
+        raise ValueError(f"未知的LLM后端: {kind}（可选: {', '.join(BACKENDS)}）")
+    # 只保存密钥的哈希
+    key = (kind, api_endpoint, hashlib.sha256((api_key or "").encode("utf-8")).hexdigest())
+    evicted = []
+    with _backends_lock:
+        backend = _backends.get(key)
+        if backend is None:
+            backend = BACKENDS[kind](api_endpoint, api_key)
+            _backends[key] = backend
+            while len(_backends) > config.LLM_BACKEND_CACHE_SIZE:
+                evicted.append(_backends.popitem(last=False)[1])
+        else:
+            _backends.move_to_end(key)
+    for old in evicted:
+        asyncio.run_coroutine_threadsafe(old.aclose(), _get_loop())
+    return backend
+
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    """后台线程中运行的事件循环，所有同步调用共用，后端的连接池因此在线程之间共享"""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-backend-loop", daemon=True).start()
+        return _loop
+
+
+def run_sync(coroutine):
+    """在共用的事件循环中执行协程，阻塞等待结果（供同步代码调用）"""
+    return asyncio.run_coroutine_threadsafe(coroutine, _get_loop()).result()
+
+
+def iterate_sync(async_iterator):
+    """
+    在共用的事件循环中迭代异步生成器，逐项产出结果（供同步代码调用）
+
+    事件循环中的任务持续读取并放入队列，不必每一项都跨线程等待一次。调用方提前关闭
+    生成器（如取消生成）时会取消该任务，异步生成器随之关闭并释放连接。
+    """
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in async_iterator:
+                items.put((True, item))
+        except Exception as e:
+            items.put((False, e))
+        finally:
+            items.put(None)
+
+    future = asyncio.run_coroutine_threadsafe(pump(), _get_loop())
+    try:
+        while True:
+            item = items.get()
+            if item is None:
+                return
+            ok, value = item
+            if not ok:
+                raise value
+            yield value
+    finally:
+        future.cancel()
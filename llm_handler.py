@@ -1,94 +1,104 @@
+import contextvars
 import os
-import requests
-import json
 from pathlib import Path
-import tempfile
-import shutil
 import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 # 导入配置、提示模板和模板加载器
 import config
 from prompts import (
     APP_GENERATION_PROMPT, 
+    APP_GENERATION_PROMPT_COMPACT,
     RESOURCES_FORMAT, 
     README_TEMPLATE,
     RESOURCES_SECTION_TEMPLATE,
     IMAGES_SECTION_TEMPLATE,
     DATA_SECTION_TEMPLATE,
     OTHER_SECTION_TEMPLATE,
-    RESOURCE_ITEM_TEMPLATE
+    RESOURCE_ITEM_TEMPLATE,
+    REPAIR_PROMPT
 )
 from template_loader import TemplateLoader
+from generation_cache import GenerationCache, get_generation_cache
+from archive_builder import ZipArchiveWriter
+from code_analyzer import get_code_analyzer
+from artifact_store import get_artifact_store, link_file, replace_file
+from data_profiler import format_schema, get_data_profiler
+from continuation import ContinuationStitcher, build_continuation_prompt, find_unclosed_block, stitch
+from response_parser import FileBlockParser, files_with_fallback, parse_files
+from model_catalog import get_model_catalog
+from llm_backends import get_backend, iterate_sync, run_sync
+from token_budget import desired_output_tokens, estimate_messages_tokens, estimate_tokens, plan_completion
+from telemetry import get_telemetry
+
+
+class GenerationCancelled(Exception):
+    """生成过程被取消"""
+
+    # 追踪中把该异常结束的阶段记为取消而不是失败
+    cancelled = True
+
+
+class GenerationTruncated(Exception):
+    """模型输出因长度限制被截断，且无法通过续写补全"""
+
+
+def normalize_endpoint(api_endpoint):
+    """规范化API端点：以 / 结尾，没有版本路径时补上 v1/"""
+    if not api_endpoint.endswith('/'):
+        api_endpoint += '/'
+    if not api_endpoint.endswith('v1/'):
+        api_endpoint += 'v1/' if 'v1' not in api_endpoint else ''
+    return api_endpoint
+
 
 class LLMHandler:
-    def __init__(self, api_key, api_endpoint, model=config.DEFAULT_MODEL):
+    def __init__(self, api_key, api_endpoint, model=config.DEFAULT_MODEL, use_cache=config.GENERATION_CACHE_ENABLED,
+                 candidates=config.GENERATION_CANDIDATES, repair_attempts=config.REPAIR_MAX_ATTEMPTS, backend=None):
         """
         初始化LLM处理程序
         
         参数:
-            api_key (str): OpenAI API密钥
+            api_key (str): API密钥
             api_endpoint (str): API端点URL
             model (str): 使用的模型名称
+            use_cache (bool): 是否使用生成结果缓存
+            candidates (int): 并行生成的候选数量，大于1时返回最先通过质量检查的候选
+            repair_attempts (int): 质量检查失败后自动修复的最大次数，0表示不修复
+            backend (str): LLM后端类型（llm_backends.BACKENDS 中的键），默认使用 config.LLM_BACKEND
         """
         self.api_key = api_key
-        self.api_endpoint = api_endpoint
+        self.api_endpoint = normalize_endpoint(api_endpoint)
         self.model = model
-        
-        # 确保API端点格式正确
-        if not self.api_endpoint.endswith('/'):
-            self.api_endpoint += '/'
-        if not self.api_endpoint.endswith('v1/'):
-            self.api_endpoint += 'v1/' if 'v1' not in self.api_endpoint else ''
+        self.temperature = config.DEFAULT_TEMPERATURE
+        self.max_tokens = config.DEFAULT_MAX_TOKENS
+        self.cache = get_generation_cache() if use_cache else None
+        self.candidates = max(1, int(candidates))
+        self.repair_attempts = max(0, int(repair_attempts))
+        self.analyzer = get_code_analyzer()
+        self.store = get_artifact_store()
+        self.profiler = get_data_profiler()
+        self.catalog = get_model_catalog()
+        self.telemetry = get_telemetry()
+        self.backend = get_backend(self.api_endpoint, self.api_key, backend)
     
     def get_available_models(self):
         """
-        获取API端点提供的可用模型列表
+        获取API端点提供的可用模型列表（进程内缓存，过期后在后台刷新）
         
         返回:
             list: 可用模型ID列表，如果请求失败则返回默认模型列表
         """
-        if not self.api_key:
-            # 如果没有API密钥，返回默认模型列表
-            return config.DEFAULT_MODELS
-            
-        try:
-            # 构建获取模型的API URL
-            models_url = f"{self.api_endpoint}models"
-            
-            # 发送请求
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            response = requests.get(models_url, headers=headers)
-            
-            if response.status_code == 200:
-                models_data = response.json()
-                # 提取模型ID列表，仅保留GPT模型
-                model_ids = [model["id"] for model in models_data["data"] 
-                            if "gpt" in model["id"].lower()]
-                
-                # 如果成功获取到模型列表但为空，返回默认模型
-                if not model_ids:
-                    return config.DEFAULT_MODELS
-                
-                # 对模型进行排序，将gpt-4和gpt-3.5放在前面
-                def model_sort_key(model_id):
-                    if "gpt-4" in model_id:
-                        return 0
-                    elif "gpt-3.5" in model_id:
-                        return 1
-                    else:
-                        return 2
-                
-                return sorted(model_ids, key=model_sort_key)
-            else:
-                # 请求失败，返回默认模型列表
-                return config.DEFAULT_MODELS
-                
-        except Exception as e:
-            # 出现异常，返回默认模型列表
-            print(f"获取模型列表时出错: {str(e)}")
-            return config.DEFAULT_MODELS
+        return self.catalog.get(self.api_endpoint, self.api_key)["models"]
+    
+    def _context_window(self):
+        """当前模型的上下文窗口，优先使用端点报告的值（目录未缓存时先获取，不依赖界面已加载模型列表）"""
+        return self.catalog.model_info(self.api_endpoint, self.api_key, self.model, fetch=True)["context_window"]
         
-    def generate_code(self, app_name, app_description, app_type, language, complexity, ui_theme="简约现代", resources=None):
+    def generate_code(self, app_name, app_description, app_type, language, complexity, ui_theme="简约现代", resources=None,
+                      stream=config.STREAM_RESPONSES, on_progress=None, on_file=None, cancel_event=None):
         """
         根据用户需求生成应用代码
         
@@ -100,120 +110,228 @@ class LLMHandler:
             complexity (str): 复杂度
             ui_theme (str): UI主题风格
             resources (list): 上传的资源列表
+            stream (bool): 是否使用流式响应，边接收边解析文件
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            on_file (callable): 每个文件生成完成时的回调，参数为文件字典；流式模式下边接收边回调，
+                其余情况（命中缓存、并行候选、非流式响应）在得到完整结果后对每个文件回调
+            cancel_event (threading.Event): 设置后尽快停止生成
             
         返回:
             dict: 包含生成结果的字典
         """
+        # 在产物存储中创建工作区存放生成的代码，提交前失败的工作区会被删除
+        app_id, app_dir = self.store.create_workspace(app_name)
+        telemetry = self.telemetry
         try:
-            # 创建临时目录存放生成的代码
-            temp_dir = Path(tempfile.mkdtemp())
-            app_dir = temp_dir / app_name
-            app_dir.mkdir(exist_ok=True)
-            
-            # 创建资源目录
-            resources_dir = app_dir / "resources"
-            resources_dir.mkdir(exist_ok=True)
-            
-            # 如果有资源文件，复制到应用目录
-            resource_descriptions = []
-            if resources:
-                for resource in resources:
-                    try:
-                        source_path = Path(resource["path"])
-                        if not source_path.exists():
-                            continue
+            with telemetry.span("generate", model=self.model, complexity=complexity, stream=stream) as root:
+                
+                # 创建资源目录
+                resources_dir = app_dir / "resources"
+                resources_dir.mkdir(exist_ok=True)
+                
+                # 如果有资源文件，复制到应用目录
+                resource_descriptions = []
+                with telemetry.span("generate.resources", count=len(resources or [])):
+                    for resource in resources or []:
+                        try:
+                            source_path = Path(resource["path"])
+                            if not source_path.exists():
+                                continue
                             
-                        # 确定目标路径和类型
-                        if resource["type"] == "图片":
-                            target_dir = resources_dir / config.RESOURCE_CATEGORIES["图片"]
-                            category = config.RESOURCE_CATEGORIES["图片"]
-                        elif resource["type"] == "数据":
-                            target_dir = resources_dir / config.RESOURCE_CATEGORIES["数据"]
-                            category = config.RESOURCE_CATEGORIES["数据"]
-                        else:
-                            target_dir = resources_dir / config.RESOURCE_CATEGORIES["其他"]
-                            category = config.RESOURCE_CATEGORIES["其他"]
+                            # 确定目标路径和类型
+                            if resource["type"] == "图片":
+                                target_dir = resources_dir / config.RESOURCE_CATEGORIES["图片"]
+                                category = config.RESOURCE_CATEGORIES["图片"]
+                            elif resource["type"] == "数据":
+                                target_dir = resources_dir / config.RESOURCE_CATEGORIES["数据"]
+                                category = config.RESOURCE_CATEGORIES["数据"]
+                            else:
+                                target_dir = resources_dir / config.RESOURCE_CATEGORIES["其他"]
+                                category = config.RESOURCE_CATEGORIES["其他"]
                             
-                        target_dir.mkdir(exist_ok=True)
-                        target_path = target_dir / resource["name"]
-                        
-                        # 复制文件
-                        shutil.copy2(source_path, target_path)
-                        
-                        # 生成资源描述
-                        rel_path = target_path.relative_to(app_dir)
-                        resource_descriptions.append({
-                            "name": resource["name"],
-                            "id": resource["id"],
-                            "type": resource["type"],
-                            "path": str(rel_path),
-                            "category": category
-                        })
-                    except Exception as e:
-                        print(f"复制资源 {resource['name']} 时出错: {str(e)}")
-            
-            # 构建提示
-            prompt = self._build_prompt(app_name, app_description, complexity, ui_theme, resource_descriptions)
-            
-            # 调用OpenAI API
-            response = self._call_openai_api(prompt)
-            
-            # 解析并保存代码
-            files_data = self._parse_code_from_response(response, language)
-            
-            # 检查代码质量和错误
-            check_result = self._check_code_quality(files_data)
-            if not check_result["success"]:
+                            target_dir.mkdir(exist_ok=True)
+                            target_path = target_dir / resource["name"]
+                            
+                            # 以硬链接（或reflink）的方式放入应用目录，不复制数据
+                            link_file(source_path, target_path)
+                            
+                            # 生成资源描述
+                            rel_path = target_path.relative_to(app_dir)
+                            resource_descriptions.append({
+                                "name": resource["name"],
+                                "id": resource["id"],
+                                "type": resource["type"],
+                                "path": str(rel_path),
+                                "category": category,
+                                "schema": self._describe_schema(source_path, resource)
+                            })
+                        except Exception as e:
+                            print(f"复制资源 {resource['name']} 时出错: {str(e)}")
+                
+                # 构建提示，按复杂度、资源数量和模型上下文窗口确定输出上限
+                with telemetry.span("generate.prompt") as span:
+                    prompt, budget = self._plan_prompt(app_name, app_description, complexity, ui_theme,
+                                                       resource_descriptions)
+                    max_tokens = budget["max_tokens"]
+                    span.set_attribute("prompt_tokens", budget["prompt_tokens"])
+                    span.set_attribute("max_tokens", max_tokens)
+                
+                self._check_cancelled(cancel_event)
+                
+                # 相同提示和参数的结果直接从缓存读取
+                cache_key = None
+                files_data = None
+                if self.cache is not None:
+                    cache_key = GenerationCache.make_key(prompt, self.model, self.temperature, max_tokens)
+                    files_data = self.cache.get(cache_key)
+                cached = files_data is not None
+                root.set_attribute("cached", cached)
+                
+                if cached:
+                    if on_progress:
+                        on_progress("生成代码", "命中生成缓存，跳过API调用")
+                else:
+                    with telemetry.span("generate.llm", candidates=self.candidates):
+                        # 并行生成多个候选，取最先通过质量检查的一个
+                        if self.candidates > 1:
+                            files_data = self._generate_candidates(prompt, language, stream, on_progress,
+                                                                   cancel_event, max_tokens)
+                        # 调用LLM后端并解析代码
+                        elif stream:
+                            files_data = self._generate_streaming(prompt, language, on_progress, on_file,
+                                                                  cancel_event, max_tokens)
+                        else:
+                            if on_progress:
+                                on_progress("生成代码", "AI正在为您的Streamlit应用生成代码...")
+                            response = self._complete(prompt, max_tokens, on_progress)
+                            with telemetry.span("llm.parse"):
+                                files_data = self._parse_code_from_response(response, language)
+                
+                # 只有单个流式请求在接收过程中回调，其余方式得到完整结果后逐个回调
+                if on_file and (cached or self.candidates > 1 or not stream):
+                    for file_data in files_data:
+                        on_file(file_data)
+                
+                self._check_cancelled(cancel_event)
+                if on_progress:
+                    on_progress("代码检查", "正在检查生成的代码质量和潜在错误...")
+                
+                # 检查代码质量和错误，能定位到文件的错误只把该文件发回模型修复
+                with telemetry.span("generate.check", files=len(files_data)) as span:
+                    check_result = self._check_code_quality(files_data)
+                    span.set_attribute("passed", check_result["success"])
+                repairs = []
+                if not check_result["success"] and check_result.get("file") and self.repair_attempts > 0:
+                    with telemetry.span("generate.repair", file=check_result["file"]) as span:
+                        files_data, check_result, repairs = self._repair_code(
+                            files_data, check_result, language, on_progress, cancel_event)
+                        span.set_attribute("attempts", len(repairs))
+                        span.set_attribute("passed", check_result["success"])
+                if not check_result["success"]:
+                    root.set_error(check_result["error"])
+                    self.store.discard(app_id)
+                    return {
+                        "success": False,
+                        "error": f"代码质量检查失败: {check_result['error']}",
+                        "repairs": repairs
+                    }
+                
+                # 只缓存通过质量检查的结果
+                if cache_key is not None and not cached:
+                    self.cache.put(cache_key, files_data)
+                
+                with telemetry.span("generate.files", files=len(files_data)):
+                    # 保存文件
+                    with telemetry.span("files.save") as span:
+                        saved_files = self._save_generated_files(files_data, app_dir)
+                        span.add_bytes(sum(os.path.getsize(path) for path in saved_files))
+                    
+                    # 创建requirements.txt
+                    with telemetry.span("files.requirements"):
+                        self._create_requirements_file(app_dir, check_result["analysis"])
+                    
+                    # 创建README
+                    with telemetry.span("files.readme"):
+                        self._create_readme(app_dir, app_name, app_description, resource_descriptions)
+                    
+                    # 创建启动脚本
+                    with telemetry.span("files.launcher"):
+                        self._create_launcher(app_dir, app_name)
+                
+                # 打包文件
+                with telemetry.span("generate.source_zip") as span:
+                    source_zip_path = self._create_zip_archive(app_dir, app_name)
+                    span.add_bytes(os.path.getsize(source_zip_path))
+                
                 return {
-                    "success": False,
-                    "error": f"代码质量检查失败: {check_result['error']}"
+                    "success": True,
+                    "app_id": app_id,
+                    "app_dir": str(app_dir),
+                    "source_zip": str(source_zip_path),
+                    "files": saved_files,
+                    "cached": cached,
+                    "repairs": repairs,
+                    "token_budget": budget,
+                    "warnings": check_result.get("warnings", [])
                 }
-                
-            # 保存文件
-            saved_files = self._save_generated_files(files_data, app_dir)
-            
-            # 创建requirements.txt
-            self._create_requirements_file(app_dir, app_description)
-            
-            # 创建README
-            self._create_readme(app_dir, app_name, app_description, resource_descriptions)
-            
-            # 创建启动脚本
-            self._create_launcher(app_dir, app_name)
-            
-            # 打包文件
-            source_zip_path = self._create_zip_archive(app_dir, app_name)
-            
+        
+        except GenerationCancelled:
+            self.store.discard(app_id)
             return {
-                "success": True,
-                "app_dir": str(app_dir),
-                "source_zip": str(source_zip_path),
-                "files": saved_files
+                "success": False,
+                "cancelled": True,
+                "error": "生成已取消"
             }
-            
         except Exception as e:
+            self.store.discard(app_id)
             return {
                 "success": False,
                 "error": str(e)
             }
     
-    def _build_prompt(self, app_name, app_description, complexity, ui_theme, resource_descriptions=None):
-        """构建LLM提示，专注于生成Streamlit应用"""
+    def _plan_prompt(self, app_name, app_description, complexity, ui_theme, resource_descriptions=None):
+        """
+        构建提示并计算输出token预算；完整提示使上下文窗口放不下期望的输出时改用精简提示
+        
+        返回:
+            tuple: (提示, 预算字典)，预算字典见 token_budget.plan_completion，另含 compact
+        """
+        desired = desired_output_tokens(complexity, len(resource_descriptions or []))
+        for compact in (False, True):
+            prompt = self._build_prompt(app_name, app_description, complexity, ui_theme, resource_descriptions, compact)
+            budget = plan_completion(estimate_messages_tokens([{"role": "user", "content": prompt}]),
+                                     self.model, desired, self._context_window())
+            if budget["available_tokens"] >= desired:
+                break
+        
+        if budget["max_tokens"] < config.MIN_OUTPUT_TOKENS:
+            raise Exception(f"提示过长（约 {budget['prompt_tokens']} tokens），模型 {self.model} 的上下文窗口"
+                            f"（{budget['context_window']} tokens）不足以生成代码，请精简应用描述或减少资源文件")
+        budget["compact"] = compact
+        return prompt, budget
+    
+    def _build_prompt(self, app_name, app_description, complexity, ui_theme, resource_descriptions=None, compact=False):
+        """构建LLM提示，专注于生成Streamlit应用；compact 为真时使用精简的说明和按目录合并的资源列表"""
         # 获取UI主题和复杂度描述
         theme_desc = config.UI_THEMES.get(ui_theme, config.UI_THEMES["简约现代"])
         complex_desc = config.COMPLEXITY_DESCRIPTIONS.get(complexity, config.COMPLEXITY_DESCRIPTIONS["简单"])
         
         # 构建资源文件描述
         resources_text = ""
-        if resource_descriptions and len(resource_descriptions) > 0:
+        if resource_descriptions and compact:
+            resources_text = RESOURCES_FORMAT.format(resources_list=self._compact_resource_list(resource_descriptions))
+        elif resource_descriptions and len(resource_descriptions) > 0:
             resources_list = ""
             for i, resource in enumerate(resource_descriptions):
                 resources_list += f"{i+1}. {resource['name']} (类型: {resource['type']}, 路径: {resource['path']})\n"
+                if resource.get("schema"):
+                    resources_list += f"   {resource['schema']}\n"
             
             resources_text = RESOURCES_FORMAT.format(resources_list=resources_list)
         
         # 使用提示模板填充参数
-        return APP_GENERATION_PROMPT.format(
+        template = APP_GENERATION_PROMPT_COMPACT if compact else APP_GENERATION_PROMPT
+        return template.format(
             app_name=app_name,
             app_description=app_description,
             ui_theme=ui_theme,
@@ -223,102 +341,330 @@ class LLMHandler:
             resources_text=resources_text
         )
     
-    def _call_openai_api(self, prompt):
-        """调用OpenAI API"""
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {self.api_key}"
-        }
+    @staticmethod
+    def _compact_resource_list(resource_descriptions, max_files=config.PROMPT_RESOURCE_LIST_MAX):
+        """按目录合并资源列表，每个目录最多列出 max_files 个文件名；数据文件的结构描述保留"""
+        groups = {}
+        for resource in resource_descriptions:
+            groups.setdefault(Path(resource["path"]).parent.as_posix(), []).append(resource)
+        
+        lines = []
+        for directory, resources in groups.items():
+            names = ", ".join(r["name"] for r in resources[:max_files])
+            if len(resources) > max_files:
+                names += f" 等 {len(resources)} 个文件"
+            lines.append(f"- {directory}/: {names}")
+            lines.extend(f"  {r['name']} {r['schema']}" for r in resources if r.get("schema"))
+        return "\n".join(lines) + "\n"
+    
+    def _describe_schema(self, source_path, resource):
+        """数据资源的列名和类型描述（只分析文件开头的样本，结果按内容哈希缓存）"""
+        if resource["type"] != "数据":
+            return ""
+        try:
+            profile = self.profiler.profile(source_path, resource["name"], content_hash=resource.get("sha256"))
+        except OSError:
+            return ""
+        return format_schema(profile)
+    
+    @staticmethod
+    def _check_cancelled(cancel_event):
+        """取消事件已设置时抛出 GenerationCancelled"""
+        if cancel_event is not None and cancel_event.is_set():
+            raise GenerationCancelled()
+    
+    def _call_api(self, prompt, max_tokens=None, messages=None):
+        """调用LLM后端；messages 为空时只发送 prompt 一条消息"""
+        return run_sync(self.backend.complete(messages or [{"role": "user", "content": prompt}], self.model,
+                                              self.temperature, max_tokens or self.max_tokens))
+    
+    def _complete(self, prompt, max_tokens=None, on_progress=None):
+        """
+        非流式调用LLM后端，输出因长度被截断时自动续写
+        
+        参数:
+            prompt (str): 提示内容
+            max_tokens (int): 首次请求的输出上限
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            
+        返回:
+            dict: 与API响应格式相同，content 为各次输出拼接后的完整内容，usage 为各次用量之和
+        """
+        messages = [{"role": "user", "content": prompt}]
+        content = ""
+        usage = None
+        for continuation in range(config.MAX_CONTINUATIONS + 1):
+            with self.telemetry.span("llm.request", model=self.model, max_tokens=max_tokens or self.max_tokens,
+                                     continuation=continuation, stream=False) as span:
+                response = self._call_api(prompt, max_tokens, messages)
+                choice = response["choices"][0]
+                text = choice["message"].get("content") or ""
+                self._record_request(span, messages, text, response.get("usage"), choice.get("finish_reason"))
+            # 续写的内容去掉与已有输出重叠的部分后拼接
+            content = stitch(content, text) if continuation else text
+            if response.get("usage"):
+                usage = usage or {"prompt_tokens": 0, "completion_tokens": 0}
+                for key in usage:
+                    usage[key] += response["usage"].get(key) or 0
+            if not self._is_truncated(content, choice.get("finish_reason"), bool(text.strip()), continuation):
+                break
+            messages, max_tokens = self._prepare_continuation(prompt, content, max_tokens,
+                                                              continuation, on_progress)
         
-        data = {
-            "model": self.model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": 0.7,
-            "max_tokens": 4000
+        return {
+            "choices": [{
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": choice.get("finish_reason")
+            }],
+            "usage": usage
         }
+    
+    def _record_request(self, span, messages, text, usage, finish_reason):
+        """
+        记录一次LLM请求的token用量和结束原因（端点没有返回用量时按文本估算）
+        
+        参数:
+            span (telemetry.Span): 该请求的span
+            messages (list): 发送的消息列表
+            text (str): 模型本次输出的文本
+            usage (dict): 响应中的 usage，可以为空
+            finish_reason (str): 结束原因
+        """
+        usage = usage or {}
+        prompt_tokens = usage.get("prompt_tokens") or estimate_messages_tokens(messages)
+        completion_tokens = usage.get("completion_tokens") or estimate_tokens(text)
+        span.set_attribute("prompt_tokens", prompt_tokens)
+        span.set_attribute("completion_tokens", completion_tokens)
+        span.set_attribute("finish_reason", finish_reason)
+        self.telemetry.count("llm_tokens_total", prompt_tokens, model=self.model, kind="prompt")
+        self.telemetry.count("llm_tokens_total", completion_tokens, model=self.model, kind="completion")
+        self.telemetry.count("llm_requests_total", model=self.model, finish_reason=finish_reason or "none")
+    
+    @staticmethod
+    def _is_truncated(content, finish_reason, received, continuation):
+        """
+        判断输出是否需要续写：因长度被截断，或最后一个代码块没有闭合
+        
+        参数:
+            content (str): 目前拼接好的全部输出
+            finish_reason (str): 最后一次响应的结束原因
+            received (bool): 最后一次响应是否收到了新内容
+            continuation (int): 已经续写的次数
+        """
+        if finish_reason == "length":
+            return True
+        # 续写没有产生新内容时，模型认为输出已经完整，不再重试
+        if continuation and not received:
+            return False
+        return find_unclosed_block(content) is not None
+    
+    def _prepare_continuation(self, prompt, partial, max_tokens, continuation, on_progress=None):
+        """
+        构建续写请求的消息和输出上限；续写次数或上下文窗口用尽时抛出 GenerationTruncated
+        
+        参数:
+            prompt (str): 原始提示
+            partial (str): 已输出的内容
+            max_tokens (int): 上一次请求的输出上限
+            continuation (int): 已经续写的次数
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            
+        返回:
+            tuple: (消息列表, 输出上限)
+        """
+        if continuation >= config.MAX_CONTINUATIONS:
+            raise GenerationTruncated(f"模型输出在续写 {continuation} 次后仍不完整，请降低复杂度或换用上下文更大的模型")
         
-        # 构建完整的API URL
-        if 'chat/completions' not in self.api_endpoint:
-            api_url = f"{self.api_endpoint}chat/completions"
-        else:
-            api_url = self.api_endpoint
+        messages = [
+            {"role": "user", "content": prompt},
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": build_continuation_prompt(partial)}
+        ]
+        budget = plan_completion(estimate_messages_tokens(messages), self.model, max_tokens or self.max_tokens,
+                                 self._context_window())
+        if budget["max_tokens"] < config.MIN_OUTPUT_TOKENS:
+            raise GenerationTruncated(f"模型输出被截断，上下文窗口（{budget['context_window']} tokens）已不足以续写")
+        
+        if on_progress:
+            on_progress("生成代码", f"输出达到长度上限，正在续写（第 {continuation + 1}/{config.MAX_CONTINUATIONS} 次）...")
+        return messages, budget["max_tokens"]
+    
+    def _stream_api(self, prompt, max_tokens=None, messages=None, state=None):
+        """
+        流式调用LLM后端
+        
+        参数:
+            prompt (str): 提示内容
+            max_tokens (int): 输出上限，默认 self.max_tokens
+            messages (list): 完整的消息列表（续写时使用），为空时只发送 prompt
+            state (dict): 响应结束后写入 finish_reason
             
-        response = requests.post(api_url, headers=headers, json=data)
+        返回:
+            generator: 逐段产出模型生成的文本
+        """
+        return iterate_sync(self.backend.stream(messages or [{"role": "user", "content": prompt}], self.model,
+                                                self.temperature, max_tokens or self.max_tokens, state))
+    
+    def _generate_streaming(self, prompt, language, on_progress=None, on_file=None, cancel_event=None,
+                            max_tokens=None):
+        """
+        流式生成代码，每个文件块的结束围栏到达时立即回调；输出因长度被截断时自动续写
         
-        if response.status_code != 200:
-            raise Exception(f"API调用失败: {response.text}")
+        参数:
+            prompt (str): 提示内容
+            language (str): 编程语言
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            on_file (callable): 文件完成回调，参数为文件字典
+            cancel_event (threading.Event): 设置后停止接收并关闭连接
+            max_tokens (int): 首次请求的输出上限
+            
+        返回:
+            list: 解析出的文件列表
+        """
+        parser = FileBlockParser()
+        chunks = []
+        received_chars = 0
+        last_report = 0.0
+        parse_seconds = 0.0
+        
+        if on_progress:
+            on_progress("生成代码", "已发送请求，正在等待模型响应...")
+        
+        def receive(text):
+            nonlocal parse_seconds
+            chunks.append(text)
+            started = time.perf_counter()
+            files = parser.feed(text)
+            parse_seconds += time.perf_counter() - started
+            for file_data in files:
+                if on_file:
+                    on_file(file_data)
+        
+        messages = None
+        stitcher = None
+        for continuation in range(config.MAX_CONTINUATIONS + 1):
+            state = {}
+            round_chars = 0
+            round_start = len(chunks)
+            with self.telemetry.span("llm.request", model=self.model, max_tokens=max_tokens or self.max_tokens,
+                                     continuation=continuation, stream=True) as span:
+                for text in self._stream_api(prompt, max_tokens, messages, state):
+                    # 中途取消时跳出循环，生成器关闭会同时释放HTTP连接
+                    self._check_cancelled(cancel_event)
+                    if not round_chars:
+                        span.set_attribute("first_token_seconds", span.elapsed)
+                        self.telemetry.observe("llm_first_token_seconds", span.elapsed, model=self.model)
+                    received_chars += len(text)
+                    round_chars += len(text)
+                    # 续写的开头经过拼接器去掉重叠后才交给解析器
+                    receive(stitcher.feed(text) if stitcher else text)
+                    
+                    # 限制进度回调频率，避免频繁刷新界面
+                    now = time.monotonic()
+                    if on_progress and now - last_report >= config.STREAM_PROGRESS_INTERVAL:
+                        last_report = now
+                        on_progress("生成代码", f"已接收 {received_chars} 个字符，已完成 {len(parser.files)} 个文件")
+                if stitcher:
+                    receive(stitcher.close())
+                self._record_request(span, messages or [{"role": "user", "content": prompt}],
+                                     "".join(chunks[round_start:]), None, state.get("finish_reason"))
+            
+            # 被截断的输出不交给解析器收尾，续写后接着输入同一个解析器
+            partial = "".join(chunks)
+            if not self._is_truncated(partial, state.get("finish_reason"), round_chars > 0, continuation):
+                break
+            messages, max_tokens = self._prepare_continuation(prompt, partial, max_tokens,
+                                                              continuation, on_progress)
+            stitcher = ContinuationStitcher(partial)
         
-        return response.json()
+        for file_data in parser.close():
+            if on_file:
+                on_file(file_data)
+        # 解析与接收交替进行，只累计解析本身的耗时
+        self.telemetry.observe("stage_duration_seconds", parse_seconds, stage="llm.parse")
+        
+        # 没有识别到带文件头的代码块时，按完整响应的回退规则处理
+        return files_with_fallback(parser, "".join(chunks))
     
     def _check_code_quality(self, files_data):
-        """检查生成的代码质量和潜在错误"""
+        """
+        检查生成的代码质量和潜在错误
+        
+        返回:
+            dict: 包含 success 和静态分析报告 analysis；失败时包含 error，
+                  能定位到文件时还包含 file 和 line（行号可能为空）
+        """
         try:
-            # 检查是否有必要的文件
-            has_main_app = False
-            streamlit_import_found = False
-            file_uploader_found = False
-            
-            for file_data in files_data:
-                file_name = file_data["name"]
-                content = file_data["content"]
-                
-                # 检查是否有主应用文件
-                if file_name == "app.py" or file_name.endswith("/app.py"):
-                    has_main_app = True
-                    
-                    # 检查是否导入了streamlit
-                    if "import streamlit" in content or "from streamlit" in content:
-                        streamlit_import_found = True
-                    
-                    # 检查是否包含文件上传功能
-                    if "st.file_uploader" in content:
-                        file_uploader_found = True
-                    
-                    # 检查语法错误
-                    try:
-                        compile(content, file_name, 'exec')
-                    except SyntaxError as e:
-                        return {
-                            "success": False,
-                            "error": f"文件 {file_name} 中有语法错误: {str(e)}"
-                        }
-                    
-                    # 检查常见的错误模式
-                    if "st.write(" in content and not streamlit_import_found:
-                        return {
-                            "success": False,
-                            "error": f"文件 {file_name} 使用了st.write但没有导入streamlit"
-                        }
-                        
-                    # 检查是否有不存在的导入
-                    import_pattern = r"import\s+(\w+)|from\s+(\w+)"
-                    imports = re.findall(import_pattern, content)
-                    for imp in imports:
-                        module_name = imp[0] if imp[0] else imp[1]
-                        if module_name not in config.COMMON_PYTHON_MODULES:
-                            # 这只是一个简单检查，可能会有误报
-                            pass
-            
-            if not has_main_app:
+            # 检查是否有主应用文件
+            main_app_name = next(
+                (f["name"] for f in files_data if f["name"] == "app.py" or f["name"].endswith("/app.py")), None)
+            if main_app_name is None:
                 return {
                     "success": False,
                     "error": "缺少主应用文件app.py"
                 }
-                
-            if not streamlit_import_found:
-                return {
-                    "success": False,
-                    "error": "代码中没有导入streamlit库"
-                }
-                
+            
+            # 每个Python文件只解析一次，得到导入、streamlit调用、未定义名称和跨模块引用
+            report = self.analyzer.analyze(files_data)
+            files = report["files"]
+            
+            def failure(error, file_name=None, line=None):
+                return {"success": False, "error": error, "file": file_name, "line": line, "analysis": report}
+            
+            # 检查语法错误
+            for file_name, analysis in files.items():
+                syntax_error = analysis["syntax_error"]
+                if syntax_error:
+                    return failure(
+                        f"文件 {file_name} 中有语法错误: {syntax_error['message']} (第 {syntax_error['line']} 行)",
+                        file_name, syntax_error["line"])
+            
+            # 检查未定义的名称
+            for file_name, analysis in files.items():
+                undefined = analysis["undefined"]
+                if not undefined:
+                    continue
+                st_usage = next((item for item in undefined if item["name"] == "st"), None)
+                if st_usage:
+                    return failure(f"文件 {file_name} 使用了st但没有导入streamlit", file_name, st_usage["line"])
+                names = ", ".join(f"{item['name']}(第 {item['line']} 行)" for item in undefined[:5])
+                return failure(f"文件 {file_name} 中使用了未定义的名称: {names}", file_name, undefined[0]["line"])
+            
+            # 检查跨模块引用
+            for missing in report["missing_references"]:
+                return failure(
+                    f"文件 {missing['file']} 引用的 {missing['module']}.{missing['name']} 在模块中不存在",
+                    missing["file"], missing["line"])
+            
+            # 检查缺失的本地模块：导入了却没有生成对应的文件
+            for missing in report["missing_modules"]:
+                return failure(
+                    f"文件 {missing['file']} 导入的模块 {missing['module']} 不存在（没有生成对应的文件）",
+                    missing["file"], missing["line"])
+            
+            # 检查主应用是否导入了streamlit
+            if not files[main_app_name]["streamlit_imported"]:
+                return failure("代码中没有导入streamlit库", main_app_name)
+            
+            # 检查是否包含文件上传功能（可以位于任意模块中）
+            file_uploader_found = any(
+                call.split(".")[-1] == "file_uploader"
+                for analysis in files.values()
+                for call in analysis["streamlit_calls"]
+            )
             if not file_uploader_found:
-                return {
-                    "success": False,
-                    "error": "代码中没有包含文件上传功能(st.file_uploader)"
-                }
+                return failure("代码中没有包含文件上传功能(st.file_uploader)", main_app_name)
                 
+            # 依赖索引中没有的第三方库不写入requirements.txt，只提示用户
+            warnings = [
+                f"依赖索引中没有 {unknown['module']}（{unknown['file']} 第 {unknown['line']} 行），"
+                f"未写入requirements.txt，如需要请手动添加"
+                for unknown in report["unknown_imports"]
+            ]
             return {
-                "success": True
+                "success": True,
+                "analysis": report,
+                "warnings": warnings
             }
             
         except Exception as e:
@@ -327,50 +673,170 @@ class LLMHandler:
                 "error": f"代码质量检查出错: {str(e)}"
             }
     
+    def _repair_code(self, files_data, check_result, language, on_progress=None, cancel_event=None):
+        """
+        修复循环：每次只把出错的文件、错误信息和出错位置的上下文发给模型，
+        用返回的文件替换原文件后重新检查，最多尝试 self.repair_attempts 次
+        
+        参数:
+            files_data (list): 生成的文件列表
+            check_result (dict): 失败的质量检查结果，需包含 file
+            language (str): 编程语言
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            cancel_event (threading.Event): 设置后停止修复
+            
+        返回:
+            tuple: (文件列表, 最后一次检查结果, 每次尝试的记录列表)
+        """
+        attempts = []
+        for attempt in range(1, self.repair_attempts + 1):
+            file_name = check_result.get("file")
+            target = next((f for f in files_data if f["name"] == file_name), None)
+            if target is None:
+                break
+            
+            self._check_cancelled(cancel_event)
+            if on_progress:
+                on_progress("代码修复", f"第 {attempt}/{self.repair_attempts} 次修复 {file_name}: {check_result['error']}")
+            
+            prompt = REPAIR_PROMPT.format(
+                file_name=file_name,
+                error=check_result["error"],
+                context=self._error_context(target["content"], check_result.get("line")),
+                content=target["content"]
+            )
+            record = {
+                "attempt": attempt,
+                "file": file_name,
+                "error": check_result["error"],
+                "duration": 0.0,
+                "prompt_tokens": None,
+                "completion_tokens": None,
+                "success": False
+            }
+            attempts.append(record)
+            
+            # 修复只输出一个文件，按文件长度确定输出上限
+            desired = int(estimate_tokens(target["content"]) * 1.2) + config.TOKEN_SAFETY_MARGIN
+            max_tokens = plan_completion(estimate_messages_tokens([{"role": "user", "content": prompt}]),
+                                         self.model, desired, self._context_window())["max_tokens"]
+            
+            started = time.monotonic()
+            try:
+                response = self._complete(prompt, max_tokens)
+            except Exception as e:
+                record["duration"] = time.monotonic() - started
+                record["error"] = f"修复请求失败: {str(e)}"
+                break
+            record["duration"] = time.monotonic() - started
+            usage = response.get("usage") or {}
+            record["prompt_tokens"] = usage.get("prompt_tokens")
+            record["completion_tokens"] = usage.get("completion_tokens")
+            
+            # 模型只返回被修复的文件，优先取同名文件
+            repaired = self._parse_code_from_response(response, language)
+            replacement = next((f for f in repaired if f["name"] == file_name), repaired[0] if repaired else None)
+            if replacement is not None:
+                files_data = [
+                    {"name": file_name, "content": replacement["content"]} if f["name"] == file_name else f
+                    for f in files_data
+                ]
+            
+            check_result = self._check_code_quality(files_data)
+            record["success"] = check_result["success"]
+            if check_result["success"] or not check_result.get("file"):
+                break
+        
+        return files_data, check_result, attempts
+    
+    @staticmethod
+    def _error_context(content, line, radius=config.REPAIR_CONTEXT_LINES):
+        """截取出错行附近的代码，带行号并标记出错行"""
+        if not line:
+            return "（无法定位到具体行）"
+        lines = content.splitlines()
+        start = max(1, line - radius)
+        end = min(len(lines), line + radius)
+        return "\n".join(
+            f"{'>>' if number == line else '  '} {number:4d} | {lines[number - 1]}"
+            for number in range(start, end + 1)
+        )
+    
+    def _generate_candidates(self, prompt, language, stream=True, on_progress=None, cancel_event=None,
+                             max_tokens=None):
+        """
+        并行发起多个生成请求，逐个检查完成的候选，返回最先通过质量检查的一个
+        
+        参数:
+            prompt (str): 提示内容
+            language (str): 编程语言
+            stream (bool): 候选请求是否使用流式响应（流式请求可以被及时取消）
+            on_progress (callable): 进度回调，参数为 (阶段, 详情)
+            cancel_event (threading.Event): 设置后取消所有候选
+            max_tokens (int): 每个候选首次请求的输出上限
+            
+        返回:
+            list: 通过检查的候选文件列表；都未通过时返回第一个完成的候选
+        """
+        # 选出结果后通过stop_event让其余流式请求尽快断开
+        stop_event = threading.Event()
+        
+        def generate_one(index):
+            if stream:
+                return self._generate_streaming(prompt, language, cancel_event=stop_event, max_tokens=max_tokens)
+            response = self._complete(prompt, max_tokens)
+            return self._parse_code_from_response(response, language)
+        
+        if on_progress:
+            on_progress("生成代码", f"正在并行生成 {self.candidates} 个候选...")
+        
+        executor = ThreadPoolExecutor(max_workers=self.candidates)
+        # 候选线程复制当前上下文，请求的span挂在当前阶段之下
+        pending = {executor.submit(contextvars.copy_context().run, generate_one, i): i for i in range(self.candidates)}
+        fallback = None
+        failures = []
+        try:
+            while pending:
+                done, _ = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                self._check_cancelled(cancel_event)
+                
+                for future in done:
+                    index = pending.pop(future)
+                    try:
+                        files_data = future.result()
+                    except GenerationCancelled:
+                        continue
+                    except Exception as e:
+                        failures.append(f"候选{index + 1}请求失败: {str(e)}")
+                        continue
+                    
+                    check_result = self._check_code_quality(files_data)
+                    if check_result["success"]:
+                        if on_progress:
+                            on_progress("生成代码", f"候选 {index + 1} 通过质量检查，已取消其余 {len(pending)} 个请求")
+                        return files_data
+                    
+                    if fallback is None:
+                        fallback = files_data
+                    failures.append(f"候选{index + 1}: {check_result['error']}")
+                    if on_progress:
+                        on_progress("生成代码", f"候选 {index + 1} 未通过质量检查，等待其余 {len(pending)} 个候选...")
+        finally:
+            stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+        
+        if fallback is not None:
+            return fallback
+        raise Exception("所有候选生成请求均失败: " + "; ".join(failures))
+    
     def _parse_code_from_response(self, response, language):
         """从API响应中解析代码"""
         content = response['choices'][0]['message']['content']
-        files_data = []
-        
-        # 查找所有文件块
-        import re
-        file_blocks = re.findall(r'文件: (.+?)\n```(?:.*?)\n(.*?)```', content, re.DOTALL)
-        
-        for file_name, file_content in file_blocks:
-            files_data.append({
-                "name": file_name.strip(),
-                "content": file_content.strip()
-            })
-            
-        # 如果没有找到文件块，尝试其他格式
-        if not files_data:
-            # 尝试英文格式
-            file_blocks = re.findall(r'File: (.+?)\n```(?:.*?)\n(.*?)```', content, re.DOTALL)
-            for file_name, file_content in file_blocks:
-                files_data.append({
-                    "name": file_name.strip(),
-                    "content": file_content.strip()
-                })
-                
-        # 仍然没有找到，尝试查找单个代码块
-        if not files_data:
-            code_blocks = re.findall(r'```(?:.*?)\n(.*?)```', content, re.DOTALL)
-            if code_blocks:
-                # 假设这是主应用文件
-                files_data.append({
-                    "name": "app.py",
-                    "content": code_blocks[0].strip()
-                })
-                
-        # 如果还是没有找到任何代码，尝试提取没有格式的代码
-        if not files_data and "import streamlit" in content:
-            # 尝试直接提取代码部分
-            files_data.append({
-                "name": "app.py",
-                "content": content
-            })
-                
-        return files_data
+        return self._parse_code_from_content(content, language)
+    
+    def _parse_code_from_content(self, content, language):
+        """从模型生成的文本中解析代码（单次遍历，与流式解析使用同一个状态机）"""
+        return parse_files(content)
     
     def _save_generated_files(self, files_data, app_dir):
         """保存生成的文件到应用目录"""
@@ -384,32 +850,71 @@ class LLMHandler:
             file_path = app_dir / file_name
             file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            # 写入文件
-            with open(file_path, "w", encoding="utf-8") as f:
-                f.write(file_content)
+            # 写入文件（替换而不是覆盖，不会改动硬链接到的共享blob）
+            replace_file(file_path, file_content)
                 
             saved_files.append(str(file_path))
             
         return saved_files
     
-    def _create_requirements_file(self, app_dir, app_description):
-        """为Streamlit应用创建requirements.txt"""
-        # 基本依赖
-        requirements = config.DEFAULT_DEPENDENCIES.copy()
-        
-        # 根据应用描述推断可能的依赖
-        for keyword, packages in config.DEPENDENCY_KEYWORDS.items():
-            if keyword in app_description.lower():
-                requirements.extend(packages)
+    def _create_requirements_file(self, app_dir, analysis):
+        """
+        根据生成代码的导入关系为Streamlit应用创建requirements.txt
         
-        # 添加图片处理依赖（统一添加）
-        if "pillow" not in " ".join(requirements).lower():
-            requirements.append("pillow>=9.0.0")
+        参数:
+            app_dir (Path): 应用目录
+            analysis (dict): 代码分析报告（CodeAnalyzer.analyze 的结果）
             
+        返回:
+            list: 写入的依赖列表
+        """
+        requirements = self._resolve_requirements(analysis)
+        
         # 写入requirements.txt
-        with open(app_dir / "requirements.txt", "w", encoding="utf-8") as f:
-            f.write("\n".join(requirements))
-            
+        replace_file(app_dir / "requirements.txt",
+                     f"# Streamlit应用依赖（根据代码导入解析，模块索引 {config.MODULE_INDEX_VERSION}）\n"
+                     + "\n".join(requirements) + "\n")
+        return requirements
+    
+    @staticmethod
+    def _resolve_requirements(analysis):
+        """把分析报告中的第三方导入映射为发行包，只输出依赖索引中收录的模块（未收录的在质量检查中作为警告报告）"""
+        requirements = list(config.DEFAULT_DEPENDENCIES)
+        
+        def add(requirement):
+            name = re.split(r"[<>=!~\[; ]", requirement, 1)[0].lower()
+            if all(re.split(r"[<>=!~\[; ]", r, 1)[0].lower() != name for r in requirements):
+                requirements.append(requirement)
+        
+        external = set(analysis["external_imports"])
+        for requirement in analysis["distributions"]:
+            add(requirement)
+        
+        # 使用到的库属性（含子模块导入）带来的隐式依赖
+        used_attributes = set()
+        for file_analysis in analysis["files"].values():
+            for attribute in file_analysis["module_attributes"]:
+                used_attributes.add((attribute["module"].split(".")[0], attribute["attr"]))
+            for imp in file_analysis["imports"]:
+                parts = imp["module"].split(".")
+                if len(parts) > 1:
+                    used_attributes.add((parts[0], parts[1]))
+            for imp in file_analysis["import_froms"]:
+                if imp["level"] or not imp["module"]:
+                    continue
+                parts = imp["module"].split(".")
+                if len(parts) > 1:
+                    used_attributes.add((parts[0], parts[1]))
+                for name in imp["names"]:
+                    used_attributes.add((parts[0], name))
+        
+        for module, attr in sorted(used_attributes):
+            if module in external:
+                for requirement in config.IMPLICIT_DEPENDENCIES.get(module, {}).get(attr, ()):
+                    add(requirement)
+        
+        return requirements
+    
     def _create_readme(self, app_dir, app_name, app_description, resource_descriptions=None):
         """创建README文件"""
         # 准备资源部分
@@ -453,34 +958,25 @@ class LLMHandler:
             resources_section=resources_section
         )
         
-        with open(app_dir / "README.md", "w", encoding="utf-8") as f:
-            f.write(readme_content)
+        replace_file(app_dir / "README.md", readme_content)
     
     def _create_launcher(self, app_dir, app_name):
         """创建跨平台启动脚本"""
         # 使用模板加载器获取模板
         try:
             # Windows启动器
-            bat_template = TemplateLoader.get_launcher_template("windows")
-            bat_content = TemplateLoader.render(bat_template, app_name=app_name)
+            bat_content = TemplateLoader.render_launcher("windows", app_name=app_name)
             
             # Unix启动器
-            sh_template = TemplateLoader.get_launcher_template("unix")
-            sh_content = TemplateLoader.render(sh_template, app_name=app_name)
+            sh_content = TemplateLoader.render_launcher("unix", app_name=app_name)
             
             # HTML启动指南
-            html_template = TemplateLoader.get_launcher_guide_template()
-            html_content = TemplateLoader.render(html_template, app_name=app_name)
+            html_content = TemplateLoader.render_launcher_guide(app_name=app_name)
             
             # 创建启动文件
-            with open(app_dir / "启动应用.bat", "w", encoding="utf-8") as f:
-                f.write(bat_content)
-                
-            with open(app_dir / "启动应用.sh", "w", encoding="utf-8") as f:
-                f.write(sh_content)
-                
-            with open(app_dir / "启动说明.html", "w", encoding="utf-8") as f:
-                f.write(html_content)
+            replace_file(app_dir / "启动应用.bat", bat_content)
+            replace_file(app_dir / "启动应用.sh", sh_content)
+            replace_file(app_dir / "启动说明.html", html_content)
             
             # 确保shell脚本可执行
             sh_path = app_dir / "启动应用.sh"
@@ -494,9 +990,6 @@ class LLMHandler:
     def _create_zip_archive(self, app_dir, app_name):
         """创建源代码的ZIP压缩包"""
         zip_path = app_dir.parent / f"{app_name}_source.zip"
-        shutil.make_archive(
-            str(zip_path).replace(".zip", ""),
-            'zip',
-            app_dir
-        )
+        with ZipArchiveWriter(zip_path) as writer:
+            writer.add_tree(app_dir)
         return zip_path 
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+本地GitHub API模拟服务器 - 用于离线测试GitHub部署流程
+
+只实现部署器用到的接口：创建组织仓库、Git Data API（blob/tree/commit/ref）
+以及 Contents API。所有数据保存在内存中。
+
+用法:
+    python mock_github_server.py --port 8765
+    GITHUB_API_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+
+import argparse
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+
+class MockGitHubState:
+    """内存中的仓库、Git对象和引用"""
+
+    def __init__(self, init_delay=0.0, secondary_limit=None):
+        """
+        参数:
+            init_delay (float): 仓库创建后分支引用可用前的延迟（秒），模拟GitHub的异步初始化
+            secondary_limit (tuple): (请求数, 窗口秒数)，超过时以403和Retry-After模拟二级速率限制
+        """
+        self.init_delay = init_delay
+        self.secondary_limit = secondary_limit
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.rate_limited = 0
+        self.repos = {}
+        self.objects = {}
+        self.request_log = []
+        self.lock = threading.Lock()
+
+    def store_object(self, obj_type, payload, data=None):
+        """保存Git对象并返回其SHA（blob使用与git相同的算法）"""
+        if obj_type == "blob":
+            sha = hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+        else:
+            sha = hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+        self.objects[sha] = {"type": obj_type, "data": data, **payload}
+        return sha
+
+    def create_repo(self, org, name, auto_init):
+        """创建仓库；auto_init时生成包含README的初始提交"""
+        key = f"{org}/{name}"
+        if key in self.repos:
+            return None
+        repo = {"org": org, "name": name, "refs": {}, "ready_at": time.monotonic() + self.init_delay}
+        if auto_init:
+            blob_sha = self.store_object("blob", {}, f"# {name}\n".encode("utf-8"))
+            tree_sha = self.store_object("tree", {"entries": {"README.md": {"mode": "100644", "sha": blob_sha}}})
+            commit_sha = self.store_object("commit", {"tree": tree_sha, "parents": [], "message": "Initial commit"})
+            repo["refs"]["heads/main"] = commit_sha
+        self.repos[key] = repo
+        return repo
+
+    def files_at(self, org, name, branch="main"):
+        """读取分支头提交中的全部文件 {路径: 内容}"""
+        repo = self.repos[f"{org}/{name}"]
+        commit = self.objects[repo["refs"][f"heads/{branch}"]]
+        tree = self.objects[commit["tree"]]
+        return {path: self.objects[entry["sha"]]["data"] for path, entry in tree["entries"].items()}
+
+    def check_secondary_limit(self):
+        """记录一次请求，超出窗口配额时返回需要等待的秒数"""
+        if not self.secondary_limit:
+            return None
+        max_requests, window = self.secondary_limit
+        now = time.monotonic()
+        if now - self.window_start >= window:
+            self.window_start = now
+            self.window_count = 0
+        self.window_count += 1
+        if self.window_count > max_requests:
+            self.rate_limited += 1
+            return max(0.0, self.window_start + window - now)
+        return None
+
+    def commit_count(self, org, name, branch="main"):
+        """统计分支上的提交数量"""
+        repo = self.repos[f"{org}/{name}"]
+        count = 0
+        sha = repo["refs"].get(f"heads/{branch}")
+        while sha:
+            count += 1
+            parents = self.objects[sha]["parents"]
+            sha = parents[0] if parents else None
+        return count
+
+
+class MockGitHubHandler(BaseHTTPRequestHandler):
+    """按GitHub REST API的路径和状态码响应请求"""
+
+    protocol_version = "HTTP/1.1"
+
+    ROUTES = [
+        ("POST", r"^/orgs/(?P<org>[^/]+)/repos$", "create_repo"),
+        ("GET", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/ref/(?P<ref>.+)$", "get_ref"),
+        ("PATCH", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/refs/(?P<ref>.+)$", "update_ref"),
+        ("GET", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/commits/(?P<sha>\w+)$", "get_commit"),
+        ("POST", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/commits$", "create_commit"),
+        ("POST", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/blobs$", "create_blob"),
+        ("POST", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/git/trees$", "create_tree"),
+        ("GET", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/contents/?(?P<path>.*)$", "get_contents"),
+        ("PUT", r"^/repos/(?P<org>[^/]+)/(?P<repo>[^/]+)/contents/(?P<path>.+)$", "put_contents"),
+    ]
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PUT(self):
+        self._dispatch("PUT")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _dispatch(self, method):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = unquote(urlsplit(self.path).path)
+
+        with self.state.lock:
+            self.state.request_log.append((method, path))
+            retry_after = self.state.check_secondary_limit()
+
+        if not self.headers.get("Authorization"):
+            return self._send(401, {"message": "Requires authentication"})
+        if retry_after is not None:
+            return self._send(403, {"message": "You have exceeded a secondary rate limit."},
+                              {"Retry-After": f"{retry_after:.2f}"})
+
+        for route_method, pattern, handler_name in self.ROUTES:
+            match = re.match(pattern, path)
+            if route_method == method and match:
+                payload = json.loads(body) if body else {}
+                with self.state.lock:
+                    status, result = getattr(self, f"_handle_{handler_name}")(payload, **match.groupdict())
+                return self._send(status, result)
+
+        self._send(404, {"message": "Not Found"})
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _get_repo(self, org, repo):
+        return self.state.repos.get(f"{org}/{repo}")
+
+    def _handle_create_repo(self, payload, org):
+        repo = self.state.create_repo(org, payload["name"], payload.get("auto_init", False))
+        if repo is None:
+            return 422, {"message": "Repository creation failed: name already exists on this account"}
+        return 201, {
+            "name": payload["name"],
+            "full_name": f"{org}/{payload['name']}",
+            "html_url": f"https://github.com/{org}/{payload['name']}",
+            "default_branch": "main"
+        }
+
+    def _handle_get_ref(self, payload, org, repo, ref):
+        repo_data = self._get_repo(org, repo)
+        if repo_data is None or time.monotonic() < repo_data["ready_at"] or ref not in repo_data["refs"]:
+            return 404, {"message": "Not Found"}
+        return 200, {"ref": f"refs/{ref}", "object": {"type": "commit", "sha": repo_data["refs"][ref]}}
+
+    def _handle_update_ref(self, payload, org, repo, ref):
+        repo_data = self._get_repo(org, repo)
+        if repo_data is None or ref not in repo_data["refs"]:
+            return 422, {"message": "Reference does not exist"}
+        commit = self.state.objects.get(payload["sha"])
+        if commit is None or commit["type"] != "commit":
+            return 422, {"message": "Object does not exist"}
+        if not payload.get("force") and repo_data["refs"][ref] not in commit["parents"]:
+            return 422, {"message": "Update is not a fast forward"}
+        repo_data["refs"][ref] = payload["sha"]
+        return 200, {"ref": f"refs/{ref}", "object": {"type": "commit", "sha": payload["sha"]}}
+
+    def _handle_get_commit(self, payload, org, repo, sha):
+        commit = self.state.objects.get(sha)
+        if commit is None or commit["type"] != "commit":
+            return 404, {"message": "Not Found"}
+        return 200, {"sha": sha, "tree": {"sha": commit["tree"]}, "message": commit["message"],
+                     "parents": [{"sha": p} for p in commit["parents"]]}
+
+    def _handle_create_blob(self, payload, org, repo):
+        if self._get_repo(org, repo) is None:
+            return 404, {"message": "Not Found"}
+        if payload.get("encoding") == "base64":
+            data = base64.b64decode(payload["content"])
+        else:
+            data = payload["content"].encode("utf-8")
+        return 201, {"sha": self.state.store_object("blob", {}, data)}
+
+    def _handle_create_tree(self, payload, org, repo):
+        entries = {}
+        if payload.get("base_tree"):
+            base = self.state.objects.get(payload["base_tree"])
+            if base is None or base["type"] != "tree":
+                return 422, {"message": "Invalid base_tree"}
+            entries.update(base["entries"])
+        for entry in payload["tree"]:
+            if entry["sha"] not in self.state.objects:
+                return 422, {"message": f"Invalid sha for {entry['path']}"}
+            entries[entry["path"]] = {"mode": entry["mode"], "sha": entry["sha"]}
+        return 201, {"sha": self.state.store_object("tree", {"entries": entries})}
+
+    def _handle_create_commit(self, payload, org, repo):
+        tree = self.state.objects.get(payload["tree"])
+        if tree is None or tree["type"] != "tree":
+            return 422, {"message": "Invalid tree"}
+        sha = self.state.store_object("commit", {
+            "tree": payload["tree"],
+            "parents": payload.get("parents", []),
+            "message": payload["message"],
+            "created": time.time()
+        })
+        return 201, {"sha": sha}
+
+    def _handle_get_contents(self, payload, org, repo, path):
+        repo_data = self._get_repo(org, repo)
+        parent = repo_data["refs"].get("heads/main") if repo_data else None
+        if parent is None:
+            return 404, {"message": "Not Found"}
+        entries = self.state.objects[self.state.objects[parent]["tree"]]["entries"]
+        path = path.strip("/")
+        if not path:
+            # 根目录列表只包含顶层文件
+            return 200, [{"type": "file", "path": name, "sha": entry["sha"]}
+                         for name, entry in sorted(entries.items()) if "/" not in name]
+        if path not in entries:
+            return 404, {"message": "Not Found"}
+        return 200, {"type": "file", "path": path, "sha": entries[path]["sha"]}
+
+    def _handle_put_contents(self, payload, org, repo, path):
+        repo_data = self._get_repo(org, repo)
+        if repo_data is None:
+            return 404, {"message": "Not Found"}
+        parent = repo_data["refs"].get("heads/main")
+        entries = dict(self.state.objects[self.state.objects[parent]["tree"]]["entries"]) if parent else {}
+        if path in entries and "sha" not in payload:
+            return 422, {"message": "\"sha\" wasn't supplied."}
+        blob_sha = self.state.store_object("blob", {}, base64.b64decode(payload["content"]))
+        entries[path] = {"mode": "100644", "sha": blob_sha}
+        tree_sha = self.state.store_object("tree", {"entries": entries})
+        commit_sha = self.state.store_object("commit", {
+            "tree": tree_sha,
+            "parents": [parent] if parent else [],
+            "message": payload["message"],
+            "created": time.time()
+        })
+        repo_data["refs"]["heads/main"] = commit_sha
+        return 201, {"content": {"path": path, "sha": blob_sha}, "commit": {"sha": commit_sha}}
+
+
+class MockGitHubServer:
+    """在后台线程中运行的模拟GitHub API服务器"""
+
+    def __init__(self, host="127.0.0.1", port=0, init_delay=0.0, secondary_limit=None):
+        """
+        参数:
+            host (str): 监听地址
+            port (int): 监听端口，0表示自动分配
+            init_delay (float): 模拟仓库初始化延迟（秒）
+            secondary_limit (tuple): (请求数, 窗口秒数)，模拟二级速率限制
+        """
+        self.httpd = ThreadingHTTPServer((host, port), MockGitHubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.state = MockGitHubState(init_delay, secondary_limit)
+        self._thread = None
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地GitHub API模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--init-delay", type=float, default=0.5, help="模拟仓库初始化延迟（秒）")
+    args = parser.parse_args()
+
+    server = MockGitHubServer(args.host, args.port, args.init_delay)
+    print(f"模拟GitHub API已启动: {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
@@ -0,0 +1,303 @@
+"""
+本地OpenAI API模拟服务器 - 回放录制的模型输出，用于离线压测和测量流水线自身的开销
+
+实现 /v1/models 和 /v1/chat/completions（流式和非流式）。响应内容来自fixture目录中的
+JSON文件（{"name", "match": [关键词], "content"}），按首条用户消息中的关键词选择，
+没有匹配时按提示的哈希选择。可以配置首个token前的延迟和每秒输出的token数；
+max_tokens 小于剩余内容时截断并返回 finish_reason=length，续写请求从截断处继续回放。
+所有数据保存在内存中。
+
+用法:
+    python mock_openai_server.py --port 8766 --latency 0.5 --tokens-per-second 200
+    API Endpoint 填写 http://127.0.0.1:8766/v1 ，API Key 任意填写
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+DEFAULT_FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "mock_openai")
+DEFAULT_MODELS = ["gpt-4o-mini", "gpt-4o", "gpt-3.5-turbo"]
+
+# 近似BPE的切分：中日韩字符单独一个token，其余按短词和标点切分，拼接后与原文完全相同
+_TOKEN_PATTERN = re.compile(r"[⺀-鿿가-힯＀-￯　-〿]|\s*[A-Za-z0-9_]{1,6}|\s*[^\sA-Za-z0-9_]|\s+")
+
+
+def tokenize(text):
+    """把文本切分成近似的token"""
+    return _TOKEN_PATTERN.findall(text)
+
+
+def load_fixtures(fixture_dir):
+    """读取目录中的全部fixture，按文件名排序"""
+    fixtures = []
+    for file_name in sorted(os.listdir(fixture_dir)):
+        if not file_name.endswith(".json"):
+            continue
+        with open(os.path.join(fixture_dir, file_name), "r", encoding="utf-8") as f:
+            fixture = json.load(f)
+        fixture.setdefault("name", file_name[:-len(".json")])
+        fixture.setdefault("match", [])
+        fixture["tokens"] = tokenize(fixture["content"])
+        fixtures.append(fixture)
+    if not fixtures:
+        raise ValueError(f"fixture目录中没有JSON文件: {fixture_dir}")
+    return fixtures
+
+
+class MockOpenAIState:
+    """fixture、回放速度设置和请求统计"""
+
+    def __init__(self, fixtures, latency=0.0, tokens_per_second=0.0, chunk_tokens=1, error_rate=0.0,
+                 continuation_overlap=0, context_window=16385, models=None):
+        """
+        参数:
+            fixtures (list): load_fixtures 返回的fixture列表
+            latency (float): 收到请求到输出第一个token的延迟（秒）
+            tokens_per_second (float): 每秒输出的token数，0表示不限速
+            chunk_tokens (int): 流式响应中每个事件包含的token数
+            error_rate (float): 以该概率返回503（带Retry-After），模拟服务端过载
+            continuation_overlap (int): 续写时重复已输出内容末尾的字符数，模拟模型续写时的重叠
+            context_window (int): /models 中报告的上下文长度
+            models (list): /models 返回的模型ID
+        """
+        self.fixtures = fixtures
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.error_rate = error_rate
+        self.continuation_overlap = continuation_overlap
+        self.context_window = context_window
+        self.models = list(models or DEFAULT_MODELS)
+        self.stats = {"requests": 0, "streamed": 0, "errors": 0, "truncated": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+        self.lock = threading.Lock()
+
+    def select_fixture(self, prompt):
+        """按关键词选择fixture，没有匹配时按提示的哈希选择（同一提示总是得到同一输出）"""
+        for fixture in self.fixtures:
+            if any(keyword in prompt for keyword in fixture["match"]):
+                return fixture
+        digest = hashlib.sha1(prompt.encode("utf-8")).digest()
+        return self.fixtures[int.from_bytes(digest[:4], "big") % len(self.fixtures)]
+
+    def plan_reply(self, messages, max_tokens):
+        """
+        确定本次回复的token
+
+        续写请求（消息中有 assistant 的已输出内容）从已输出内容之后继续回放。
+
+        返回:
+            tuple: (token列表, finish_reason)
+        """
+        prompt = next((m["content"] for m in messages if m["role"] == "user"), "")
+        fixture = self.select_fixture(prompt)
+        tokens = fixture["tokens"]
+        partial = "".join(m["content"] for m in messages if m["role"] == "assistant")
+        if partial and fixture["content"].startswith(partial):
+            start = len(partial) - min(self.continuation_overlap, len(partial))
+            tokens = tokenize(fixture["content"][start:])
+
+        if max_tokens and len(tokens) > max_tokens:
+            return tokens[:max_tokens], "length"
+        return tokens, "stop"
+
+    def record(self, prompt_tokens, completion_tokens, streamed, finish_reason):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.stats["streamed"] += int(streamed)
+            self.stats["truncated"] += int(finish_reason == "length")
+            self.stats["prompt_tokens"] += prompt_tokens
+            self.stats["completion_tokens"] += completion_tokens
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """按OpenAI API的路径和响应格式回放fixture"""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def do_GET(self):
+        path = urlsplit(self.path).path.rstrip("/")
+        if path in ("/v1/models", "/models"):
+            created = int(time.time())
+            return self._send(200, {"object": "list", "data": [
+                {"id": model, "object": "model", "created": created, "owned_by": "mock",
+                 "context_length": self.state.context_window}
+                for model in self.state.models
+            ]})
+        self._send(404, {"error": {"message": "Not Found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        path = urlsplit(self.path).path.rstrip("/")
+        if path not in ("/v1/chat/completions", "/chat/completions"):
+            return self._send(404, {"error": {"message": "Not Found"}})
+
+        if self.state.error_rate and random.random() < self.state.error_rate:
+            with self.state.lock:
+                self.state.stats["errors"] += 1
+            return self._send(503, {"error": {"message": "The server is overloaded"}}, {"Retry-After": "0.1"})
+
+        try:
+            payload = json.loads(body)
+            messages = payload["messages"]
+        except (ValueError, KeyError):
+            return self._send(400, {"error": {"message": "Invalid request body"}})
+
+        tokens, finish_reason = self.state.plan_reply(messages, payload.get("max_tokens"))
+        prompt_tokens = sum(len(tokenize(m.get("content") or "")) for m in messages)
+        self.state.record(prompt_tokens, len(tokens), payload.get("stream", False), finish_reason)
+        model = payload.get("model", self.state.models[0])
+
+        if payload.get("stream"):
+            self._stream(model, tokens, finish_reason)
+        else:
+            self._pace(time.monotonic(), len(tokens))
+            self._send(200, {
+                "id": f"chatcmpl-mock-{random.getrandbits(32):08x}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)},
+                             "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                          "total_tokens": prompt_tokens + len(tokens)}
+            })
+
+    def _pace(self, started, emitted):
+        """等待到第 emitted 个token按设定速度应当输出的时刻"""
+        due = started + self.state.latency
+        if self.state.tokens_per_second:
+            due += emitted / self.state.tokens_per_second
+        delay = due - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def _stream(self, model, tokens, finish_reason):
+        """以分块传输编码发送SSE事件，连接可以保持复用"""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        started = time.monotonic()
+        completion_id = f"chatcmpl-mock-{random.getrandbits(32):08x}"
+        size = self.state.chunk_tokens
+        try:
+            for index in range(0, len(tokens), size):
+                self._pace(started, index)
+                self._write_event(completion_id, model, {"content": "".join(tokens[index:index + size])})
+            self._write_event(completion_id, model, {}, finish_reason)
+            self._write_chunk(b"data: [DONE]\n\n")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            # 客户端提前关闭了流（如取消生成）
+            self.close_connection = True
+
+    def _write_event(self, completion_id, model, delta, finish_reason=None):
+        event = {"id": completion_id, "object": "chat.completion.chunk", "model": model,
+                 "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+        self._write_chunk(f"data: {json.dumps(event, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class _MockHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # 高并发压测时默认的监听队列（5）会导致连接被拒绝
+    request_queue_size = 1024
+
+
+class MockOpenAIServer:
+    """在后台线程中运行的模拟OpenAI API服务器"""
+
+    def __init__(self, host="127.0.0.1", port=0, fixture_dir=DEFAULT_FIXTURE_DIR, latency=0.0,
+                 tokens_per_second=0.0, chunk_tokens=1, error_rate=0.0, continuation_overlap=0,
+                 context_window=16385):
+        """
+        参数:
+            host (str): 监听地址
+            port (int): 监听端口，0表示自动分配
+            fixture_dir (str): fixture目录
+            其余参数见 MockOpenAIState
+        """
+        self.httpd = _MockHTTPServer((host, port), MockOpenAIHandler)
+        self.httpd.state = MockOpenAIState(load_fixtures(fixture_dir), latency, tokens_per_second, chunk_tokens,
+                                           error_rate, continuation_overlap, context_window)
+        self._thread = None
+
+    @property
+    def state(self):
+        return self.httpd.state
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="本地OpenAI API模拟服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURE_DIR, help="fixture目录")
+    parser.add_argument("--latency", type=float, default=0.5, help="首个token前的延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=100, help="每秒输出的token数，0表示不限速")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="流式响应中每个事件包含的token数")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回503的概率")
+    parser.add_argument("--continuation-overlap", type=int, default=0, help="续写时重复的字符数")
+    parser.add_argument("--context-window", type=int, default=16385, help="/models 中报告的上下文长度")
+    args = parser.parse_args()
+
+    server = MockOpenAIServer(args.host, args.port, args.fixtures, args.latency, args.tokens_per_second,
+                              args.chunk_tokens, args.error_rate, args.continuation_overlap, args.context_window)
+    print(f"模拟OpenAI API已启动: {server.url}（{len(server.state.fixtures)} 个fixture）")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
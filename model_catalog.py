@@ -0,0 +1,214 @@
+"""
+模型目录缓存 - 按端点和密钥缓存可用模型列表及每个模型的元数据，过期后在后台刷新
+"""
+
+import hashlib
+import threading
+import time
+
+import config
+from llm_backends import get_backend, run_sync
+from token_budget import context_window, output_limit
+
+# 不同服务在 /models 响应中报告上下文长度使用的字段
+CONTEXT_FIELDS = ("context_window", "context_length", "max_model_len", "max_context_length")
+
+
+def _lookup_price(model):
+    """按最长前缀匹配 config.MODEL_PRICES，返回每千token的美元价格"""
+    matches = [prefix for prefix in config.MODEL_PRICES if model.lower().startswith(prefix)]
+    if not matches:
+        return None
+    prompt_price, completion_price = config.MODEL_PRICES[max(matches, key=len)]
+    return {"prompt": prompt_price, "completion": completion_price}
+
+
+def _sort_key(model_id):
+    """把gpt-4和gpt-3.5放在前面"""
+    if "gpt-4" in model_id:
+        return 0
+    elif "gpt-3.5" in model_id:
+        return 1
+    return 2
+
+
+class ModelCatalog:
+    """
+    进程内共享的模型目录
+
+    以 (端点, 密钥哈希) 为键缓存 /models 的结果，所有会话共用。条目超过 ttl 后仍直接返回旧数据，
+    同时在后台线程刷新（stale-while-revalidate），只有从未获取过的端点才会同步等待请求。
+    """
+
+    def __init__(self, ttl=config.MODEL_CATALOG_TTL, error_ttl=config.MODEL_CATALOG_ERROR_TTL):
+        """
+        参数:
+            ttl (int): 模型列表的有效期（秒），过期后在后台刷新
+            error_ttl (int): 获取失败时结果的有效期（秒），避免频繁重试失败的端点
+        """
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def get(self, api_endpoint, api_key):
+        """
+        获取端点的模型目录
+
+        参数:
+            api_endpoint (str): API端点（以 / 结尾，如 https://api.openai.com/v1/）
+            api_key (str): API密钥
+
+        返回:
+            dict: {"models": [模型ID], "metadata": {模型ID: 元数据}, "fetched_at": 时间戳,
+                   "error": 错误信息或None, "stale": 是否已过期（正在后台刷新）}
+        """
+        if not api_key:
+            return self._default_entry()
+
+        key = self._make_key(api_endpoint, api_key)
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None:
+            # 首次获取时同步请求
+            entry = self._refresh(key, api_endpoint, api_key)
+        elif self._expired(entry):
+            self._refresh_in_background(key, api_endpoint, api_key)
+            entry = dict(entry, stale=True)
+        return entry
+
+    def has_entry(self, api_endpoint, api_key):
+        """是否已经缓存了该端点的模型目录（已缓存时 get 不会等待网络请求）"""
+        if not api_key:
+            return True
+        with self._lock:
+            return self._make_key(api_endpoint, api_key) in self._entries
+
+    def model_info(self, api_endpoint, api_key, model, fetch=False):
+        """
+        返回模型的元数据
+
+        参数:
+            fetch (bool): 目录未缓存时是否先获取（同 get）；默认只读取已缓存的目录，不发起请求
+
+        返回:
+            dict: 元数据（context_window、max_output_tokens、price 等）；目录未缓存或没有该模型时
+                  返回按配置推断的元数据
+        """
+        entry = None
+        if fetch:
+            entry = self.get(api_endpoint, api_key)
+        elif api_key:
+            with self._lock:
+                entry = self._entries.get(self._make_key(api_endpoint, api_key))
+        if entry is not None and model in entry["metadata"]:
+            return entry["metadata"][model]
+        return self._model_metadata({"id": model})
+
+    def invalidate(self, api_endpoint=None, api_key=None):
+        """删除缓存的目录，不指定端点时清空全部"""
+        with self._lock:
+            if api_endpoint is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._make_key(api_endpoint, api_key), None)
+
+    def _refresh_in_background(self, key, api_endpoint, api_key):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        threading.Thread(target=self._refresh, args=(key, api_endpoint, api_key),
+                         name="model-catalog-refresh", daemon=True).start()
+
+    def _refresh(self, key, api_endpoint, api_key):
+        """请求 /models 并更新缓存；失败时保留之前成功获取的列表"""
+        try:
+            entry = self._fetch(api_endpoint, api_key)
+        except Exception as e:
+            print(f"获取模型列表时出错: {str(e)}")
+            entry = dict(self._default_entry(), error=str(e))
+
+        with self._lock:
+            self._refreshing.discard(key)
+            previous = self._entries.get(key)
+            if entry["error"] and previous is not None and not previous["error"]:
+                # 保留旧列表，error_ttl 后再重试
+                entry = dict(previous, fetched_at=time.time(), error=entry["error"])
+            self._entries[key] = entry
+        return entry
+
+    def _fetch(self, api_endpoint, api_key):
+        backend = get_backend(api_endpoint, api_key)
+        # 后端决定哪些模型可用（OpenAI兼容服务仅保留GPT模型）
+        models = [model for model in run_sync(backend.list_models()) if backend.accepts_model(model["id"])]
+        if not models:
+            return dict(self._default_entry(), error="端点没有返回可用的模型")
+
+        metadata = {model["id"]: self._model_metadata(model) for model in models}
+        return {
+            "models": sorted(metadata, key=_sort_key),
+            "metadata": metadata,
+            "fetched_at": time.time(),
+            "error": None,
+            "stale": False
+        }
+
+    @staticmethod
+    def _model_metadata(model):
+        """合并端点返回的字段和配置中的上下文窗口、价格"""
+        model_id = model["id"]
+        reported = next((model[field] for field in CONTEXT_FIELDS if isinstance(model.get(field), int)), None)
+        price = _lookup_price(model_id)
+        # OpenRouter等服务按每token报价
+        pricing = model.get("pricing")
+        if isinstance(pricing, dict):
+            try:
+                price = {"prompt": float(pricing["prompt"]) * 1000,
+                         "completion": float(pricing["completion"]) * 1000}
+            except (KeyError, TypeError, ValueError):
+                pass
+
+        window = reported or context_window(model_id)
+        return {
+            "id": model_id,
+            "owned_by": model.get("owned_by"),
+            "created": model.get("created"),
+            "context_window": window,
+            "context_source": "endpoint" if reported else "config",
+            "max_output_tokens": min(output_limit(model_id), window),
+            "price": price
+        }
+
+    def _expired(self, entry):
+        ttl = self.error_ttl if entry["error"] else self.ttl
+        return time.time() - entry["fetched_at"] > ttl
+
+    def _default_entry(self):
+        return {
+            "models": list(config.DEFAULT_MODELS),
+            "metadata": {model: self._model_metadata({"id": model}) for model in config.DEFAULT_MODELS},
+            "fetched_at": time.time(),
+            "error": None,
+            "stale": False
+        }
+
+    @staticmethod
+    def _make_key(api_endpoint, api_key):
+        # 只保存密钥的哈希
+        return api_endpoint, hashlib.sha256(api_key.encode("utf-8")).hexdigest()
+
+
+_default_catalog = None
+_default_catalog_lock = threading.Lock()
+
+
+def get_model_catalog():
+    """获取进程内共享的模型目录"""
+    global _default_catalog
+    with _default_catalog_lock:
+        if _default_catalog is None:
+            _default_catalog = ModelCatalog()
+        return _default_catalog
@@ -1,13 +1,12 @@
 import os
-import subprocess
-import tempfile
 import logging
-import shutil
-import sys
-import platform
 from pathlib import Path
 
+import config
 from template_loader import TemplateLoader
+from archive_builder import ZipArchiveWriter
+from wheelhouse import get_wheel_cache
+from telemetry import get_telemetry
 
 class AppPackager:
     def __init__(self):
@@ -19,8 +18,10 @@ class AppPackager:
             formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
             handler.setFormatter(formatter)
             self.logger.addHandler(handler)
+        self.telemetry = get_telemetry()
     
-    def package_app(self, app_dir, app_name, app_type, language):
+    def package_app(self, app_dir, app_name, app_type, language, source_zip=None,
+                    include_wheelhouse=config.WHEELHOUSE_ENABLED, platforms=None):
         """
         将Streamlit应用打包为跨平台启动器
         
@@ -29,6 +30,9 @@ class AppPackager:
             app_name (str): 应用名称
             app_type (str): 应用类型 ('Streamlit Web应用')
             language (str): 编程语言 ('Python')
+            source_zip (str/Path): 已生成的源代码包，提供时直接复用其中的压缩成员
+            include_wheelhouse (bool): 是否在启动包中附带离线依赖包（wheelhouse目录）
+            platforms (list): 离线依赖包的目标平台，默认 config.WHEELHOUSE_PLATFORMS 中的全部平台
             
         返回:
             dict: 包含打包结果信息的字典
@@ -44,7 +48,13 @@ class AppPackager:
                 self.logger.warning("这可能不是一个有效的Streamlit应用")
                 
             # 创建启动包
-            return self._create_launcher_package(app_dir, app_name)
+            with self.telemetry.span("package", wheelhouse=include_wheelhouse) as span:
+                result = self._create_launcher_package(app_dir, app_name, source_zip, include_wheelhouse, platforms)
+                if result["success"]:
+                    span.add_bytes(os.path.getsize(result["exe_path"]))
+                else:
+                    span.set_error(result["error"])
+            return result
                 
         except Exception as e:
             self.logger.error(f"打包应用时出错: {str(e)}")
@@ -63,53 +73,88 @@ class AppPackager:
             content = f.read()
             return "import streamlit" in content or "from streamlit" in content
     
-    def _create_launcher_package(self, app_dir, app_name):
-        """创建适用于所有平台的启动包"""
+    def _create_launcher_package(self, app_dir, app_name, source_zip=None, include_wheelhouse=False, platforms=None):
+        """
+        创建适用于所有平台的启动包
+        
+        启动包直接流式写入ZIP，不再复制中间目录；如果提供了源代码包，
+        其中的成员按原始压缩数据复制，不会被重复压缩。需要离线依赖包时，
+        目标平台的wheel从本地缓存写入 wheelhouse/ 目录。
+        """
         try:
-            # 创建输出目录
-            output_dir = app_dir.parent / f"{app_name}_launcher"
-            if output_dir.exists():
-                shutil.rmtree(output_dir)
-            output_dir.mkdir()
+            launcher_zip = app_dir.parent / f"{app_name}_启动包.zip"
+            
+            wheelhouse = None
+            if include_wheelhouse and (app_dir / "requirements.txt").exists():
+                self.logger.info("正在准备离线依赖包...")
+                with self.telemetry.span("package.wheelhouse") as span:
+                    wheelhouse = get_wheel_cache().collect(app_dir / "requirements.txt", platforms)
+                    span.set_attribute("wheels", len(wheelhouse["wheels"]))
+                    span.set_attribute("failed", len(wheelhouse["failed"]))
+                if not wheelhouse["wheels"]:
+                    wheelhouse = dict(wheelhouse, platforms=[])
             
-            # 复制所有源码文件
             self.logger.info("正在创建启动包...")
-            for item in app_dir.glob("**/*"):
-                if item.is_file():
-                    rel_path = item.relative_to(app_dir)
-                    dest_path = output_dir / rel_path
-                    dest_path.parent.mkdir(parents=True, exist_ok=True)
-                    shutil.copy2(item, dest_path)
             
-            # 检查启动器文件是否存在
-            launch_html = output_dir / "启动说明.html"
-            if not launch_html.exists():
-                self.logger.warning("未找到启动说明HTML文件，可能是因为使用了旧版生成器")
-                # 创建启动页
-                try:
-                    # 获取HTML模板并渲染
-                    html_template = TemplateLoader.get_launcher_guide_template()
-                    html_content = TemplateLoader.render(html_template, app_name=app_name)
-                    
-                    # 写入HTML文件
-                    with open(output_dir / "启动说明.html", "w", encoding="utf-8") as f:
-                        f.write(html_content)
-                except Exception as e:
-                    self.logger.warning(f"创建启动说明页失败: {str(e)}")
+            with ZipArchiveWriter(launcher_zip) as writer:
+                # 写入所有源码文件
+                # 确保shell脚本具有执行权限
+                if source_zip and Path(source_zip).exists():
+                    members = writer.copy_archive(source_zip, exclude={"README.txt"}, executables={"启动应用.sh"})
+                else:
+                    writer.add_tree(app_dir, exclude={"README.txt"}, executables={"启动应用.sh"})
+                    members = [m.name for m in writer.members]
+                
+                # 检查启动器文件是否存在
+                if "启动说明.html" not in members:
+                    self.logger.warning("未找到启动说明HTML文件，可能是因为使用了旧版生成器")
+                    # 创建启动页
+                    try:
+                        # 获取HTML模板并渲染
+                        html_content = TemplateLoader.render_launcher_guide(app_name=app_name)
+                        writer.add_bytes("启动说明.html", html_content)
+                    except Exception as e:
+                        self.logger.warning(f"创建启动说明页失败: {str(e)}")
+                
+                # 写入离线依赖包，启动器检测到该目录时离线安装
+                if wheelhouse and wheelhouse["platforms"]:
+                    writer.add_directory("wheelhouse")
+                    for wheel_path in wheelhouse["wheels"]:
+                        writer.add_file(f"wheelhouse/{wheel_path.name}", wheel_path)
+                
+                # 创建一个README.txt文件，说明如何启动应用
+                writer.add_bytes("README.txt", self._build_readme(
+                    app_name, wheelhouse["platforms"] if wheelhouse else None))
             
-            # 确保启动脚本具有正确的权限
-            bat_file = output_dir / "启动应用.bat"
-            sh_file = output_dir / "启动应用.sh"
+            self.logger.info(f"启动包已创建: {launcher_zip}")
             
-            if sh_file.exists():
-                # 添加执行权限
-                try:
-                    sh_file.chmod(sh_file.stat().st_mode | 0o755)
-                except Exception as e:
-                    self.logger.warning(f"无法设置shell脚本权限: {str(e)}")
+            result = {
+                "success": True,
+                "exe_path": str(launcher_zip)
+            }
+            if wheelhouse:
+                result["wheelhouse"] = {
+                    "count": len(wheelhouse["wheels"]) if wheelhouse["platforms"] else 0,
+                    "platforms": wheelhouse["platforms"],
+                    "failed": wheelhouse["failed"]
+                }
+            return result
             
-            # 创建一个README.txt文件，说明如何启动应用
-            readme_content = f"""# {app_name} - 启动说明
+        except Exception as e:
+            self.logger.error(f"创建启动包时出错: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e)
+            }
+    
+    def _build_readme(self, app_name, wheelhouse_platforms=None):
+        """生成启动包中的README.txt内容"""
+        if wheelhouse_platforms:
+            install_note = (f"- 启动包已附带离线依赖包（wheelhouse目录，适用于 {'、'.join(wheelhouse_platforms)}），"
+                            "首次运行无需联网即可安装依赖")
+        else:
+            install_note = "- 首次运行时，启动器会自动检查Python环境并联网安装必要的依赖"
+        return f"""# {app_name} - 启动说明
 
 ## 快速启动指南
 
@@ -122,37 +167,11 @@ class AppPackager:
 
 ## 注意事项
 
-- 首次运行时，启动器会自动检查Python环境并安装必要的依赖
+{install_note}
 - 如果没有安装Python，启动器将尝试自动下载并安装
 - 所有代码和资源都包含在此包中，可以离线运行
 """
-            readme_path = output_dir / "README.txt"
-            with open(readme_path, "w", encoding="utf-8") as f:
-                f.write(readme_content)
-            
-            # 创建ZIP包
-            launcher_zip = app_dir.parent / f"{app_name}_启动包.zip"
-            shutil.make_archive(
-                str(launcher_zip).replace(".zip", ""),
-                'zip',
-                output_dir
-            )
-            
-            self.logger.info(f"启动包已创建: {launcher_zip}")
-            
-            return {
-                "success": True,
-                "exe_path": str(launcher_zip),
-                "launcher_dir": str(output_dir)
-            }
-            
-        except Exception as e:
-            self.logger.error(f"创建启动包时出错: {str(e)}")
-            return {
-                "success": False,
-                "error": str(e)
-            }
-    
+
     def _create_html_launcher(self, app_name):
         """创建HTML启动器页面"""
         return f"""<!DOCTYPE html>
@@ -0,0 +1,186 @@
+"""
+生成流水线 - 在后台任务中依次执行代码生成和打包，以及把生成的应用部署到GitHub
+"""
+
+import os
+import shutil
+import tempfile
+import time
+
+import config
+from artifact_store import get_artifact_store
+from github_deployer import GitHubDeployer
+from job_queue import JobCancelled
+from llm_handler import LLMHandler
+from packager import AppPackager
+from telemetry import StageProgress, get_telemetry
+
+
+def run_generation_job(job, params):
+    """
+    执行 生成代码 → 质量检查 → 打包 流程
+
+    参数:
+        job (Job): 当前后台任务，用于回报进度和检查取消
+        params (dict): 生成参数（api_key、api_endpoint、model、backend、use_cache、candidates、
+            app_name、app_description、app_type、language、complexity、
+            ui_theme、resources、include_wheelhouse、wheelhouse_platforms）
+
+    返回:
+        dict: 生成的应用信息，与会话历史记录的格式一致
+    """
+    telemetry = get_telemetry()
+    # 进度按各阶段最近的实际耗时分配，阶段开始和结束由各阶段的span通知
+    progress = StageProgress(config.PIPELINE_STAGES, telemetry, end=99, on_stage=job.update_progress)
+    with telemetry.span("pipeline", listener=progress.observe, job_id=job.id, model=params["model"]) as span:
+        app_info = _run_stages(job, params, progress)
+        progress.finish()
+        _add_timing_event(job, telemetry.spans(span.trace_id))
+    job.update_progress("完成", "您的Streamlit应用已成功生成并打包！" if app_info["exe_path"] else
+                        "应用源代码已生成，但打包失败", 100)
+    return app_info
+
+
+def _run_stages(job, params, progress):
+    """依次执行各阶段，返回提交到产物存储后的应用信息"""
+    app_name = params["app_name"]
+    app_description = params["app_description"]
+
+    llm_handler = LLMHandler(params["api_key"], params["api_endpoint"], params["model"],
+                             use_cache=params["use_cache"], candidates=params.get("candidates", 1),
+                             backend=params.get("backend"))
+
+    # 阶段1：生成代码（流式接收，文件完成即记录）
+    def on_progress(stage, details):
+        job.update_progress(stage, details, progress.percent())
+
+    def on_file(file_data):
+        line_count = file_data["content"].count("\n") + 1
+        job.add_event(f"✅ 已生成文件 `{file_data['name']}`（{line_count} 行）")
+        job.update_progress("生成代码", f"已生成文件: {file_data['name']}", progress.percent())
+
+    code_result = llm_handler.generate_code(
+        app_name=app_name,
+        app_description=app_description,
+        app_type=params["app_type"],
+        language=params["language"],
+        complexity=params["complexity"],
+        ui_theme=params["ui_theme"],
+        resources=params["resources"],
+        on_progress=on_progress,
+        on_file=on_file,
+        cancel_event=job.cancel_event
+    )
+
+    # 记录每次自动修复的耗时和token用量
+    for repair in code_result.get("repairs", []):
+        tokens = repair["prompt_tokens"], repair["completion_tokens"]
+        token_text = f"，tokens {tokens[0]}+{tokens[1]}" if None not in tokens else ""
+        job.add_event(f"{'🔧' if repair['success'] else '⚠️'} 第 {repair['attempt']} 次修复 `{repair['file']}`"
+                      f"（{repair['duration']:.1f} 秒{token_text}）: {repair['error']}")
+
+    if code_result.get("cancelled"):
+        raise JobCancelled(code_result["error"])
+    if not code_result["success"]:
+        raise Exception(f"生成代码失败: {code_result.get('error', '未知错误')}")
+    job.add_event("代码质量检查通过" + ("（使用缓存结果）" if code_result.get("cached") else ""))
+    for warning in code_result.get("warnings", []):
+        job.add_event(f"⚠️ {warning}")
+    budget = code_result.get("token_budget")
+    if budget:
+        job.add_event(f"token预算: 提示约 {budget['prompt_tokens']}，单次输出上限 {budget['max_tokens']}"
+                      f"（上下文窗口 {budget['context_window']}）" + ("，已使用精简提示" if budget["compact"] else ""))
+    store = get_artifact_store()
+    if job.cancel_event.is_set():
+        store.discard(code_result["app_id"])
+    job.check_cancelled()
+
+    # 阶段2：创建启动器
+    package_result = AppPackager().package_app(
+        app_dir=code_result["app_dir"],
+        app_name=app_name,
+        app_type=params["app_type"],
+        language=params["language"],
+        source_zip=code_result["source_zip"],
+        include_wheelhouse=params.get("include_wheelhouse", False),
+        platforms=params.get("wheelhouse_platforms")
+    )
+
+    wheelhouse = package_result.get("wheelhouse")
+    if wheelhouse:
+        if wheelhouse["platforms"]:
+            job.add_event(f"📦 已附带 {wheelhouse['count']} 个离线依赖包（{'、'.join(wheelhouse['platforms'])}）")
+        for platform_name, error in wheelhouse["failed"].items():
+            job.add_event(f"⚠️ {platform_name} 平台的离线依赖下载失败，启动时将联网安装: {error}")
+
+    if not package_result["success"]:
+        job.add_event(f"⚠️ 打包应用失败: {package_result.get('error', '未知错误')}，将只提供源代码下载")
+        exe_path = None
+    else:
+        exe_path = package_result["exe_path"]
+        job.add_event("打包完成！")
+
+    app_info = {
+        "name": app_name,
+        "description": app_description[:100] + "..." if len(app_description) > 100 else app_description,
+        "type": params["app_type"],
+        "language": params["language"],
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "source_zip": code_result["source_zip"],
+        "exe_path": exe_path,
+        "resources": params["resources"]
+    }
+
+    # 提交到产物存储：文件按内容去重保存，重启后历史记录仍可下载
+    with get_telemetry().span("artifact.commit"):
+        return store.commit(code_result["app_id"], app_info)["metadata"]
+
+
+def _add_timing_event(job, spans):
+    """把本次任务各阶段的实际耗时记录为一条任务事件"""
+    stages = {name: stage for name, stage, _, _ in config.PIPELINE_STAGES}
+    timings = [f"{stages[span.name]} {span.duration:.1f}s" for span in spans if span.name in stages]
+    llm_requests = [span for span in spans if span.name == "llm.request"]
+    tokens = sum(span.attributes.get("completion_tokens", 0) for span in llm_requests)
+    if timings:
+        job.add_event(f"⏱️ 各阶段耗时: {'，'.join(timings)}（{len(llm_requests)} 次模型请求，输出约 {tokens} tokens）")
+
+
+def run_deploy_job(job, params):
+    """
+    把生成的应用部署到GitHub组织
+
+    参数:
+        job (Job): 当前后台任务，用于回报进度
+        params (dict): 部署参数（github_token、app_name、source_zip）
+
+    返回:
+        dict: 部署结果（repo_url、repo_name、org、commit_sha）
+    """
+    app_name = params["app_name"]
+    source_zip = params["source_zip"]
+    job.update_progress("GitHub 部署", f"正在部署到 {config.GITHUB_ORG} 组织...", 85)
+
+    # 应用目录已被清理时从源代码包解压
+    app_dir = os.path.join(os.path.dirname(source_zip), app_name)
+    temp_dir = None
+    if not os.path.exists(app_dir):
+        temp_dir = tempfile.mkdtemp()
+        shutil.unpack_archive(source_zip, temp_dir, "zip")
+        app_dir = temp_dir
+
+    try:
+        result = GitHubDeployer(params["github_token"]).deploy(
+            app_dir,
+            app_name,
+            progress_callback=lambda details, percent: job.update_progress("GitHub 部署", details, percent)
+        )
+    finally:
+        if temp_dir:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    if not result["success"]:
+        raise Exception(f"部署失败: {result.get('error', '未知错误')}")
+    job.add_event(f"已部署到 {result['repo_url']}")
+    job.update_progress("完成", "应用已成功部署到 GitHub！", 100)
+    return result
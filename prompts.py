@@ -43,6 +43,60 @@ APP_GENERATION_PROMPT = """
 请让应用美观易用，遵循Streamlit应用的最佳实践。
 """
 
+# 精简的应用生成提示：提示占用的token使输出空间不足时使用
+APP_GENERATION_PROMPT_COMPACT = """
+创建名为"{app_name}"的Python Streamlit应用。
+
+描述:
+{app_description}
+
+要求: UI风格 {ui_theme}（{theme_desc}）；复杂度 {complexity}（{complex_desc}）；代码完整可运行；模块化；
+数据处理用pandas/numpy，可视化用plotly或matplotlib；包含带类型校验和预览的st.file_uploader上传功能。
+
+{resources_text}
+
+输出 app.py 及必要的辅助模块，每个文件使用以下格式:
+
+文件: <文件名>
+```python
+<文件内容>
+```
+"""
+
+# 代码修复提示模板：只包含出错的文件
+REPAIR_PROMPT = """
+下面是一个Streamlit应用中的文件 {file_name}，它没有通过代码检查。
+
+错误信息:
+{error}
+
+出错位置附近的代码（>> 标记出错行）:
+{context}
+
+完整文件内容:
+```python
+{content}
+```
+
+请修复这个错误，只返回修复后的完整文件 {file_name}，不要返回其他文件，不要省略任何代码。
+使用以下格式:
+
+文件: {file_name}
+```python
+<文件内容>
+```
+"""
+
+# 输出因长度被截断后请求续写的提示
+CONTINUATION_PROMPT = """你的回答因长度限制被截断了。{position}
+
+截断前的最后几行是:
+<<<
+{tail}
+>>>
+
+请从截断处继续输出，第一个字符紧接在上面内容的最后一个字符之后。不要重复已经输出的内容，不要添加任何说明。"""
+
 # 资源文件描述的格式模板
 RESOURCES_FORMAT = """提供的资源文件:
 {resources_list}
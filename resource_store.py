@@ -0,0 +1,185 @@
+"""
+资源存储 - 分块流式保存上传的资源，相同内容只保存一份并记录引用计数
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import config
+from artifact_store import get_artifact_store, link_file
+from telemetry import get_telemetry
+
+
+class ResourceQuotaExceeded(Exception):
+    """会话上传的资源超出配额"""
+
+
+class ResourceStore:
+    """
+    按内容寻址的上传资源存储
+
+    上传内容按块边写边计算哈希，写入产物存储共享的blob目录；每个上传的资源
+    在资源目录中是指向blob的硬链接，生成应用时再链接到应用目录，全程不复制数据。
+    引用计数记录在索引中，删除一个资源不会影响内容相同的其他资源。
+
+    会话配额只在进程内存中统计，尽力限制单个会话的上传量：进程重启后重新计算，
+    多个进程之间也不共享。磁盘总占用由产物存储的配额和垃圾回收控制。
+    """
+
+    def __init__(self, resource_dir=config.RESOURCE_DIR, chunk_size=config.RESOURCE_CHUNK_SIZE,
+                 session_quota=config.RESOURCE_SESSION_QUOTA):
+        """
+        参数:
+            resource_dir (str/Path): 资源目录
+            chunk_size (int): 写入时每块的大小（字节），决定单次上传占用的内存
+            session_quota (int): 每个会话可上传的资源总字节数（只在当前进程内统计）
+        """
+        self.resource_dir = Path(resource_dir)
+        self.resource_dir.mkdir(parents=True, exist_ok=True)
+        artifact_store = get_artifact_store()
+        self.blobs_dir = artifact_store.blobs_dir
+        # 临时文件与blob在同一文件系统中，ARTIFACT_ROOT在其他磁盘上时 os.replace 也不会失败
+        self.tmp_dir = artifact_store.tmp_dir
+        self.index_path = self.resource_dir / "index.json"
+        self.chunk_size = chunk_size
+        self.session_quota = session_quota
+        self._sessions = {}
+        # 与产物存储共用一把锁：新blob在链接到资源目录之前链接数为1，不能被产物存储的垃圾回收删除
+        self._lock = artifact_store.lock
+        self._index = self._load_index()
+
+    def add(self, stream, file_name, resource_type, session_id, size_hint=None):
+        """
+        保存上传的资源
+
+        参数:
+            stream: 可读的二进制流（如Streamlit的UploadedFile）
+            file_name (str): 文件名（已过滤不安全字符）
+            resource_type (str): 资源类型
+            session_id (str): 上传所属的会话ID，用于配额统计
+            size_hint (int): 已知的文件大小，用于提前检查配额
+
+        返回:
+            dict: 资源信息（包含 id、name、path、type、size、sha256、deduplicated、timestamp）
+        """
+        with get_telemetry().span("resource.upload", type=resource_type) as span:
+            used = self.session_usage(session_id)
+            if size_hint is not None and used + size_hint > self.session_quota:
+                raise ResourceQuotaExceeded(self._quota_message(used))
+
+            # 边写边计算哈希，内存占用不超过一个块
+            digest = hashlib.sha256()
+            size = 0
+            tmp_path = self.tmp_dir / uuid.uuid4().hex
+            try:
+                with open(tmp_path, "wb") as f:
+                    for chunk in iter(lambda: stream.read(self.chunk_size), b""):
+                        size += len(chunk)
+                        if used + size > self.session_quota:
+                            raise ResourceQuotaExceeded(self._quota_message(used))
+                        digest.update(chunk)
+                        f.write(chunk)
+
+                sha256 = digest.hexdigest()
+                blob_path = self.blobs_dir / sha256[:2] / sha256
+                blob_path.parent.mkdir(exist_ok=True)
+                with self._lock:
+                    deduplicated = blob_path.exists()
+                    if deduplicated:
+                        tmp_path.unlink()
+                    else:
+                        os.replace(tmp_path, blob_path)
+
+                    file_id = uuid.uuid4().hex[:8]
+                    resource_path = self.resource_dir / f"{file_id}_{file_name}"
+                    link_file(blob_path, resource_path)
+
+                    entry = self._index.setdefault(sha256, {"refs": 0, "size": size})
+                    entry["refs"] += 1
+                    self._sessions[session_id] = used + size
+                    self._save_index()
+            finally:
+                tmp_path.unlink(missing_ok=True)
+
+            span.add_bytes(size)
+            span.set_attribute("deduplicated", deduplicated)
+
+            return {
+                "id": file_id,
+                "name": file_name,
+                "path": str(resource_path),
+                "type": resource_type,
+                "size": size,
+                "sha256": sha256,
+                "deduplicated": deduplicated,
+                "timestamp": time.strftime("%Y-%m-%d %H:%M:%S")
+            }
+
+    def release(self, resource, session_id=None):
+        """
+        删除一个资源引用；没有其他引用（包括已生成的应用）时同时删除blob
+
+        参数:
+            resource (dict): add 返回的资源信息
+            session_id (str): 资源所属的会话ID
+        """
+        with self._lock:
+            Path(resource["path"]).unlink(missing_ok=True)
+            if session_id in self._sessions:
+                self._sessions[session_id] = max(0, self._sessions[session_id] - resource.get("size", 0))
+
+            sha256 = resource.get("sha256")
+            entry = self._index.get(sha256)
+            if entry is None:
+                return
+            entry["refs"] -= 1
+            if entry["refs"] <= 0:
+                del self._index[sha256]
+                blob_path = self.blobs_dir / sha256[:2] / sha256
+                # 已生成的应用仍通过硬链接引用该内容时保留blob，由产物存储回收
+                try:
+                    if blob_path.stat().st_nlink == 1:
+                        blob_path.unlink()
+                except FileNotFoundError:
+                    pass
+            self._save_index()
+
+    def session_usage(self, session_id):
+        """会话已上传的资源字节数"""
+        with self._lock:
+            return self._sessions.get(session_id, 0)
+
+    def _quota_message(self, used):
+        return (f"上传的资源超出配额（每个会话最多 {self.session_quota // (1024 * 1024)}MB，"
+                f"已使用 {used / (1024 * 1024):.1f}MB）")
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        tmp_path = self.index_path.with_name(f"index.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f)
+        os.replace(tmp_path, self.index_path)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_resource_store():
+    """获取进程内共享的资源存储"""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ResourceStore()
+        return _default_store
@@ -0,0 +1,345 @@
+"""
+响应解析 - 从模型输出中提取文件代码块：流式输入用单次遍历的状态机，完整文本用只检查围栏行的正则快速路径，
+两者结果相同
+"""
+
+import re
+
+# 文件头的几种写法:
+#   文件: app.py / 文件：app.py / File: app.py / Filename: app.py
+#   ### app.py / **app.py** / `utils/helpers.py` / ## 文件: app.py
+# 带标签的文件头可以是任意名称；不带标签时必须像一个文件名（包含扩展名）
+_HEADER_PATTERN = re.compile(
+    r"^\s*(?:#{1,6}\s*)?(?:[*_`]+\s*)?"
+    r"(?:(?:文件名?|File(?:name)?)\s*[:：]\s*(?P<labeled>.+?)"
+    r"|(?P<bare>[\w\-./\\]+\.[A-Za-z0-9]+))"
+    r"\s*[*_`]*\s*[:：]?\s*$",
+    re.IGNORECASE
+)
+# 超过该长度的行不会是文件头，不做正则匹配
+MAX_HEADER_LENGTH = 200
+# 围栏：三个以上的 ` 或 ~，后面可以跟语言标记
+_FENCE_PATTERN = re.compile(r"^\s*(?P<fence>`{3,}|~{3,})\s*(?P<info>[^`]*?)\s*$")
+_FENCE_MARKERS = ("```", "~~~")
+
+# 解析器状态
+_OUTSIDE = 0
+_AFTER_HEADER = 1
+_IN_BLOCK = 2
+
+
+def match_header(line):
+    """
+    识别文件头
+
+    参数:
+        line (str): 一行文本
+
+    返回:
+        str/None: 文件名，不是文件头时返回 None
+    """
+    if len(line) > MAX_HEADER_LENGTH:
+        return None
+    match = _HEADER_PATTERN.match(line)
+    if not match:
+        return None
+    name = (match.group("labeled") or match.group("bare")).strip("`*_\"' ")
+    return name or None
+
+
+def _next_fence_line(data, position, end, found):
+    """
+    查找 position 之后第一个可能是围栏的行（行首只有空白，之后是 ``` 或 ~~~）
+
+    代码块中两个围栏之间的内容整段加入代码块，不逐行处理。position 必须是行首。
+
+    参数:
+        found (dict): 每种标记上次找到的位置，同一段输入的多次查找共用，保证总体只扫描一遍
+
+    返回:
+        int: 该行的起始位置，没有时返回 end
+    """
+    for marker in _FENCE_MARKERS:
+        index = found.get(marker)
+        if index is None or 0 <= index < position:
+            found[marker] = data.find(marker, position, end)
+    while True:
+        candidates = [index for index in found.values() if index >= 0]
+        if not candidates:
+            return end
+        index = min(candidates)
+        line_start = max(position, data.rfind("\n", position, index) + 1)
+        if not data[line_start:index].strip(" \t"):
+            return line_start
+        # 出现在行中间，继续查找同一种标记的下一个位置
+        marker = data[index:index + 3]
+        found[marker] = data.find(marker, index + 3, end)
+
+
+def _match_fence(line):
+    """识别围栏行，返回 (围栏字符串, 语言标记)，不是围栏时返回 None"""
+    stripped = line.lstrip()
+    if not (stripped.startswith("```") or stripped.startswith("~~~")):
+        return None
+    match = _FENCE_PATTERN.match(line)
+    if not match:
+        return None
+    return match.group("fence"), match.group("info")
+
+
+class FileBlockParser:
+    """
+    增量解析模型输出中的文件代码块
+
+    按行推进的状态机：文件头之外（OUTSIDE）→ 读到文件头（AFTER_HEADER）→ 代码块中（IN_BLOCK）。
+    每行只检查一次，代码块中不是围栏的行整段跳过；输入被拆成任意大小的片段时
+    结果都与一次输入完整文本相同。
+
+    - 支持中英文带标签的文件头、markdown标题式的文件头和CRLF换行
+    - 结束围栏使用与开始围栏相同的字符，长度不少于开始围栏
+    - 代码块中带语言标记的围栏（如字符串里嵌入的 ```python）视为嵌套代码块的开始，
+      对应的结束围栏不会结束外层代码块
+    - 没有文件头的代码块单独记录，用于没有识别到任何文件时的回退
+    """
+
+    def __init__(self):
+        self.files = []
+        self.anonymous_blocks = []
+        self._buffer = ""
+        self._state = _OUTSIDE
+        self._pending_name = None
+        self._block_name = None
+        self._block_fence = None
+        self._block_chunks = None
+        self._nested = 0
+
+    @property
+    def open_block(self):
+        """未闭合代码块所属的文件名（没有文件头时为空字符串），不在代码块中时为 None"""
+        if self._state != _IN_BLOCK:
+            return None
+        return self._block_name or ""
+
+    def feed(self, text):
+        """
+        输入新接收的文本片段
+
+        参数:
+            text (str): 文本片段
+
+        返回:
+            list: 本次输入中完成的文件列表
+        """
+        data = self._buffer + text
+        # 最后一段可能是不完整的行，留到下次输入
+        end = data.rfind("\n") + 1
+        self._buffer = data[end:]
+
+        completed = []
+        position = 0
+        found = {}
+        while position < end:
+            if self._state == _IN_BLOCK:
+                stop = _next_fence_line(data, position, end, found)
+                if stop > position:
+                    self._block_chunks.append(data[position:stop])
+                    position = stop
+                    continue
+            newline = data.index("\n", position, end)
+            file_data = self._process_line(data[position:newline])
+            position = newline + 1
+            if file_data:
+                completed.append(file_data)
+        return completed
+
+    def close(self):
+        """
+        结束输入，处理最后一行（可能没有换行符）
+
+        返回:
+            list: 最后完成的文件列表；未闭合的代码块不会作为文件返回，可通过 open_block 查看
+        """
+        completed = []
+        if self._buffer:
+            file_data = self._process_line(self._buffer)
+            self._buffer = ""
+            if file_data:
+                completed.append(file_data)
+        return completed
+
+    def _process_line(self, line):
+        """处理一行文本，当带文件头的代码块闭合时返回文件字典"""
+        if line.endswith("\r"):
+            line = line[:-1]
+
+        if self._state == _IN_BLOCK:
+            return self._process_block_line(line)
+
+        fence = _match_fence(line)
+        if fence is not None:
+            self._block_name = self._pending_name
+            self._block_fence = fence[0]
+            self._block_chunks = []
+            self._nested = 0
+            self._pending_name = None
+            self._state = _IN_BLOCK
+            return None
+
+        name = match_header(line)
+        if name is not None:
+            self._pending_name = name
+            self._state = _AFTER_HEADER
+        elif line.strip():
+            # 文件头和代码块之间只允许空行
+            self._pending_name = None
+            self._state = _OUTSIDE
+        return None
+
+    def _process_block_line(self, line):
+        fence = _match_fence(line)
+        if fence is not None and fence[0][0] == self._block_fence[0]:
+            marker, info = fence
+            if info:
+                # 带语言标记的围栏不能结束代码块，只能开始嵌套的代码块
+                self._nested += 1
+            elif self._nested:
+                self._nested -= 1
+            elif len(marker) >= len(self._block_fence):
+                return self._finish_block()
+        self._block_chunks.append(line + "\n")
+        return None
+
+    def _finish_block(self):
+        file_data = {
+            "name": self._block_name,
+            "content": "".join(self._block_chunks).replace("\r\n", "\n").strip()
+        }
+        self._state = _OUTSIDE
+        self._block_chunks = None
+        self._block_name = None
+        self._block_fence = None
+        if file_data["name"] is None:
+            self.anonymous_blocks.append(file_data["content"])
+            return None
+        self.files.append(file_data)
+        return file_data
+
+
+def _last_header(content, start, end):
+    """代码块外 [start, end) 范围内最后一个非空行是文件头时返回文件名（对应状态机的 AFTER_HEADER）"""
+    stripped = content[start:end].rstrip()
+    if not stripped:
+        return None
+    line_start = start + stripped.rfind("\n") + 1
+    line_end = content.find("\n", line_start, end)
+    return match_header(content[line_start:end if line_end < 0 else line_end])
+
+
+def _scan_complete(content):
+    """
+    解析完整文本的快速路径：用 str.find 找出围栏行，只在围栏行上用正则执行状态机的规则，
+    代码块内容和块之间的文本整段切片，不逐行处理
+
+    返回:
+        tuple/None: (带文件头的文件列表, 没有文件头的代码块内容列表)，与 FileBlockParser 的结果相同；
+                    输入包含单独的 \r 或围栏前有特殊空白时返回 None，交给状态机处理
+    """
+    if "\r" in content:
+        content = content.replace("\r\n", "\n")
+        if "\r" in content:
+            return None
+
+    files = []
+    anonymous_blocks = []
+    outside_start = 0
+    block = None
+    nested = 0
+    position = 0
+    # 两种围栏标记下一次出现的位置，用 str.find 查找
+    backtick = content.find("```")
+    tilde = content.find("~~~")
+    while True:
+        if 0 <= backtick < position:
+            backtick = content.find("```", position)
+        if 0 <= tilde < position:
+            tilde = content.find("~~~", position)
+        if backtick < 0 and tilde < 0:
+            break
+        index = backtick if tilde < 0 or 0 <= backtick < tilde else tilde
+        line_start = content.rfind("\n", 0, index) + 1
+        line_end = content.find("\n", index)
+        if line_end < 0:
+            line_end = len(content)
+        position = line_end + 1
+        if line_start < index:
+            indent = content[line_start:index]
+            if indent.strip(" \t"):
+                if not indent.strip():
+                    # 状态机在代码块外把它当作围栏、在代码块中不当作
+                    return None
+                continue
+
+        match = _FENCE_PATTERN.match(content[line_start:line_end])
+        if match is None:
+            continue
+        marker, info = match.group("fence", "info")
+        if block is None:
+            # (文件名, 开始围栏, 内容开始位置)
+            block = (_last_header(content, outside_start, line_start), marker, position)
+            nested = 0
+            continue
+
+        name, opening, body_start = block
+        if marker[0] != opening[0]:
+            continue
+        if info:
+            nested += 1
+        elif nested:
+            nested -= 1
+        elif len(marker) >= len(opening):
+            body = content[body_start:line_start].strip()
+            if name is None:
+                anonymous_blocks.append(body)
+            else:
+                files.append({"name": name, "content": body})
+            block = None
+            outside_start = position
+    return files, anonymous_blocks
+
+
+def parse_files(content):
+    """
+    解析完整的模型输出
+
+    完整文本使用正则快速路径，结果与流式输入 FileBlockParser 相同。
+
+    参数:
+        content (str): 模型输出
+
+    返回:
+        list: 文件列表；没有带文件头的代码块时，把第一个代码块作为 app.py；
+              没有任何代码块但包含streamlit代码时，把全部内容作为 app.py
+    """
+    blocks = _scan_complete(content)
+    if blocks is None:
+        parser = FileBlockParser()
+        parser.feed(content)
+        parser.close()
+        blocks = parser.files, parser.anonymous_blocks
+    return _apply_fallback(*blocks, content)
+
+
+def files_with_fallback(parser, content):
+    """解析结束后按回退规则确定文件列表（流式解析时 content 为拼接后的完整输出）"""
+    return _apply_fallback(parser.files, parser.anonymous_blocks, content)
+
+
+def _apply_fallback(files, anonymous_blocks, content):
+    if files:
+        return files
+    if anonymous_blocks:
+        # 假设这是主应用文件
+        return [{"name": "app.py", "content": anonymous_blocks[0]}]
+    if "import streamlit" in content:
+        return [{"name": "app.py", "content": content}]
+    return []
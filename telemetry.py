@@ -0,0 +1,410 @@
+"""
+追踪和指标 - 记录各阶段的耗时（span）、token和字节计数，导出为JSON或Prometheus文本格式，
+可选地同时发送到OpenTelemetry
+"""
+
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# 阶段耗时估计的平滑系数（指数移动平均），越大越偏向最近的耗时
+ESTIMATE_SMOOTHING = 0.3
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+logger = logging.getLogger(__name__)
+
+
+class Span:
+    """一次阶段执行的记录"""
+
+    def __init__(self, name, parent=None, attributes=None, listener=None):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent else None
+        # 监听器随span向下继承，整条链路的阶段开始和结束都会通知它
+        self.listener = listener or (parent.listener if parent else None)
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.duration = None
+        self.status = "ok"
+        self.error = None
+        self._started = time.perf_counter()
+
+    @property
+    def elapsed(self):
+        """已经执行的秒数（结束后为总耗时）"""
+        if self.duration is not None:
+            return self.duration
+        return time.perf_counter() - self._started
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def set_error(self, message):
+        """标记阶段失败（用于以返回值而不是异常报告失败的阶段）"""
+        self.status = "error"
+        self.error = message
+
+    def add_bytes(self, count):
+        """记录该阶段写入或上传的字节数，结束时计入 stage_bytes_total"""
+        self.attributes["bytes"] = self.attributes.get("bytes", 0) + count
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration": self.duration,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class Telemetry:
+    """
+    进程内的span记录和指标注册表
+
+    span 通过 contextvars 嵌套，同一线程（或复制了上下文的线程）中的阶段自动成为父阶段的子span。
+    每个结束的span计入 stage_duration_seconds 直方图，最近的span保存在环形缓冲区中。
+    安装了 opentelemetry-api 且 config.OTEL_ENABLED 时，每个span同时作为OpenTelemetry span发送，
+    导出方式由OpenTelemetry SDK的环境变量决定。
+    """
+
+    def __init__(self, max_spans=config.TRACE_MAX_SPANS, buckets=config.METRICS_DURATION_BUCKETS):
+        """
+        参数:
+            max_spans (int): 保留的最近span数量
+            buckets (tuple): 耗时直方图的桶上限（秒）
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._spans = deque(maxlen=max_spans)
+        self._counters = {}
+        self._histograms = {}
+        self._estimates = {}
+        self._lock = threading.Lock()
+        self._otel_tracer = _load_otel_tracer()
+
+    @contextmanager
+    def span(self, name, listener=None, **attributes):
+        """
+        记录一个阶段的执行
+
+        参数:
+            name (str): 阶段名称（如 generate.llm）
+            listener (callable): 阶段开始和结束时的回调，参数为 (事件, span)，事件为 start 或 end；
+                子阶段继承父阶段的监听器
+            **attributes: 阶段的属性（模型、文件名等）
+
+        以带有 cancelled = True 属性的异常（如 GenerationCancelled）结束的阶段记为取消，
+        不计入错误数和耗时估计。
+
+        返回:
+            Span: 通过 with ... as span 获取，可以在执行中补充属性
+        """
+        parent = _current_span.get()
+        span = Span(name, parent, attributes, listener)
+        token = _current_span.set(span)
+        otel_context = self._otel_tracer.start_as_current_span(name) if self._otel_tracer else None
+        otel_span = otel_context.__enter__() if otel_context else None
+        self._notify(span, "start")
+        try:
+            yield span
+        except BaseException as e:
+            if getattr(e, "cancelled", False):
+                span.status = "cancelled"
+            else:
+                span.set_error(str(e) or type(e).__name__)
+            raise
+        finally:
+            span.duration = time.perf_counter() - span._started
+            _current_span.reset(token)
+            self._finish(span)
+            if otel_context:
+                for key, value in span.attributes.items():
+                    if isinstance(value, (str, bool, int, float)):
+                        otel_span.set_attribute(key, value)
+                if span.status == "error":
+                    from opentelemetry.trace import Status, StatusCode
+                    otel_span.set_status(Status(StatusCode.ERROR, span.error))
+                otel_context.__exit__(None, None, None)
+            self._notify(span, "end")
+
+    def current_span(self):
+        """当前上下文中正在执行的span，没有时返回 None"""
+        return _current_span.get()
+
+    def count(self, name, value=1, **labels):
+        """累加计数器（如 llm_tokens_total）"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """记录一次直方图观测值（秒）"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def update_estimate(self, name, duration):
+        """把一次耗时计入阶段的耗时估计（指数移动平均）"""
+        with self._lock:
+            previous = self._estimates.get(name)
+            self._estimates[name] = duration if previous is None else \
+                previous + ESTIMATE_SMOOTHING * (duration - previous)
+
+    def stage_estimate(self, name):
+        """阶段最近的平均耗时（指数移动平均，秒），没有记录时返回 None"""
+        with self._lock:
+            return self._estimates.get(name)
+
+    def spans(self, trace_id=None):
+        """最近结束的span（按结束顺序），可按链路过滤"""
+        with self._lock:
+            spans = list(self._spans)
+        return [span for span in spans if trace_id is None or span.trace_id == trace_id]
+
+    def snapshot(self):
+        """
+        全部指标和最近span的快照
+
+        返回:
+            dict: {"counters": [...], "histograms": [...], "spans": [...]}，可直接序列化为JSON
+        """
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value}
+                        for (name, labels), value in sorted(self._counters.items())]
+            histograms = [{"name": name, "labels": dict(labels), "buckets": dict(zip(self.buckets, h["buckets"])),
+                           "sum": h["sum"], "count": h["count"]}
+                          for (name, labels), h in sorted(self._histograms.items())]
+            spans = [span.to_dict() for span in self._spans]
+        return {"counters": counters, "histograms": histograms, "spans": spans}
+
+    def prometheus_text(self, prefix=config.METRICS_PREFIX):
+        """按Prometheus文本格式（0.0.4）导出计数器和直方图"""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(h, buckets=list(h["buckets"]))) for key, h in self._histograms.items())
+
+        lines = []
+        declared = set()
+        for (name, labels), value in counters:
+            metric = f"{prefix}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_format_labels(labels)} {_format_value(value)}")
+        for (name, labels), histogram in histograms:
+            metric = f"{prefix}_{name}"
+            if metric not in declared:
+                declared.add(metric)
+                lines.append(f"# TYPE {metric} histogram")
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                lines.append(f"{metric}_bucket{_format_labels(labels + (('le', _format_value(bound)),))} {count}")
+            lines.append(f"{metric}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+            lines.append(f"{metric}_sum{_format_labels(labels)} {_format_value(histogram['sum'])}")
+            lines.append(f"{metric}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def _finish(self, span):
+        """记录结束的span：耗时直方图、字节计数、错误计数和耗时估计"""
+        self.observe("stage_duration_seconds", span.duration, stage=span.name)
+        if span.attributes.get("bytes"):
+            self.count("stage_bytes_total", span.attributes["bytes"], stage=span.name)
+        if span.status == "error":
+            self.count("stage_errors_total", stage=span.name)
+        with self._lock:
+            self._spans.append(span)
+        if span.status == "ok":
+            self.update_estimate(span.name, span.duration)
+
+    @staticmethod
+    def _notify(span, event):
+        if span.listener is None:
+            return
+        try:
+            span.listener(event, span)
+        except Exception as e:
+            # 监听器（如进度回报）出错不影响阶段本身
+            logger.warning(f"span监听器出错: {str(e)}")
+
+
+def _load_otel_tracer():
+    """启用且安装了 opentelemetry-api 时返回其tracer，否则返回 None"""
+    if not config.OTEL_ENABLED:
+        return None
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+    return trace.get_tracer("streamlitforge")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf"
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class StageProgress:
+    """
+    按各阶段最近的实际耗时分配进度条
+
+    每个阶段占进度条的比例等于它最近的平均耗时（没有记录时使用默认值）占全部阶段的比例；
+    阶段执行中按已用时间推进，最多推进到该阶段份额的90%，阶段结束后才到达下一阶段的起点。
+    跳过的阶段（如没有触发的自动修复）在后一个阶段开始时直接越过，流程完成后按0秒计入耗时估计，
+    因此条件阶段的份额接近它平均每次流程的耗时。
+    """
+
+    def __init__(self, stages, telemetry=None, start=0, end=100, on_stage=None):
+        """
+        参数:
+            stages (list): [(span名称, 阶段, 详情, 默认耗时秒数)]，按执行顺序排列
+            telemetry (Telemetry): 提供耗时估计，默认使用进程内共享的实例
+            start (int): 第一个阶段开始时的百分比
+            end (int): 最后一个阶段结束时的百分比
+            on_stage (callable): 进入阶段时的回调，参数为 (阶段, 详情, 百分比)
+        """
+        telemetry = telemetry or get_telemetry()
+        self.telemetry = telemetry
+        self.stages = {name: (stage, details) for name, stage, details, _ in stages}
+        weights = [telemetry.stage_estimate(name) or default for name, _, _, default in stages]
+        total = sum(weights) or 1.0
+        self.bounds = {}
+        position = start
+        for (name, _, _, _), weight in zip(stages, weights):
+            share = (end - start) * weight / total
+            self.bounds[name] = (position, position + share, weight)
+            position += share
+        self.on_stage = on_stage
+        self._current = None
+        self._completed = start
+        self._started = set()
+
+    def observe(self, event, span):
+        """作为span监听器使用，跟踪当前执行的阶段"""
+        if span.name not in self.bounds:
+            return
+        if event == "start":
+            self._current = span
+            self._started.add(span.name)
+            self._completed = max(self._completed, self.bounds[span.name][0])
+            if self.on_stage:
+                stage, details = self.stages[span.name]
+                self.on_stage(stage, details, self.percent())
+        elif span is self._current:
+            self._current = None
+            self._completed = max(self._completed, self.bounds[span.name][1])
+
+    def finish(self):
+        """流程成功完成后调用，把没有执行的阶段按0秒计入耗时估计"""
+        for name in self.bounds:
+            if name not in self._started:
+                self.telemetry.update_estimate(name, 0.0)
+
+    def percent(self):
+        """当前的进度百分比（整数）"""
+        if self._current is None:
+            return int(self._completed)
+        low, high, expected = self.bounds[self._current.name]
+        fraction = min(self._current.elapsed / expected, 0.9) if expected > 0 else 0.0
+        return int(max(self._completed, low + (high - low) * fraction))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics 返回Prometheus文本，/metrics.json 返回JSON快照，/traces 返回最近的span"""
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        telemetry = get_telemetry()
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/metrics":
+            body = telemetry.prometheus_text().encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path == "/metrics.json":
+            snapshot = telemetry.snapshot()
+            del snapshot["spans"]
+            body = json.dumps(snapshot, ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        elif path == "/traces":
+            body = json.dumps([span.to_dict() for span in telemetry.spans()], ensure_ascii=False).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_default_telemetry = None
+_default_telemetry_lock = threading.Lock()
+_metrics_server = None
+# 每个进程只尝试启动一次：Streamlit每次重新运行脚本都会调用，端口被占用时不再重复绑定和报错
+_metrics_server_attempted = False
+
+
+def get_telemetry():
+    """获取进程内共享的追踪和指标注册表"""
+    global _default_telemetry
+    with _default_telemetry_lock:
+        if _default_telemetry is None:
+            _default_telemetry = Telemetry()
+        return _default_telemetry
+
+
+def start_metrics_server(port=config.METRICS_PORT, host=config.METRICS_HOST):
+    """
+    在后台线程中启动指标端点（每个进程只尝试一次，重复调用直接返回第一次的结果）
+
+    参数:
+        port (int): 监听端口，0表示不启动
+        host (str): 监听地址
+
+    返回:
+        ThreadingHTTPServer/None: 指标服务器；未启用或端口被占用时返回 None
+    """
+    global _metrics_server, _metrics_server_attempted
+    with _default_telemetry_lock:
+        if _metrics_server_attempted or not port:
+            return _metrics_server
+        _metrics_server_attempted = True
+        try:
+            server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError as e:
+            logger.warning(f"启动指标端点失败（{host}:{port}），本进程不再重试: {str(e)}")
+            return None
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        _metrics_server = server
+        return server
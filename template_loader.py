@@ -3,88 +3,256 @@
 """
 
 import os
+import re
+import threading
+from functools import lru_cache
 from pathlib import Path
-from string import Template
+
+import config
 
 # 模板目录
 TEMPLATE_DIR = Path(__file__).parent / "templates"
 
+# 模板中的占位符语法：
+#   {name}            启动器模板使用的占位符
+#   {{ / }}           转义的花括号，渲染为 { / }
+#   $name / ${name}   兼容 string.Template 的写法，$$ 渲染为 $
+# 未提供值的占位符（如shell脚本中的 ${GREEN}）原样保留
+_TOKEN_PATTERN = re.compile(
+    r"\$\{(?P<dollar_braced>[A-Za-z_][A-Za-z0-9_]*)\}"
+    r"|\$(?P<dollar_named>[A-Za-z_][A-Za-z0-9_]*)"
+    r"|(?P<dollar_escape>\$\$)"
+    r"|\{(?P<braced>[A-Za-z_][A-Za-z0-9_]*)\}"
+    r"|(?P<brace_escape>\{\{|\}\})"
+)
+
+
+class CompiledTemplate:
+    """预编译的模板：加载时把模板拆分为文本片段和占位符，渲染时只做拼接"""
+
+    __slots__ = ("source", "parts", "names")
+
+    def __init__(self, source):
+        """
+        参数:
+            source (str): 模板内容
+        """
+        self.source = source
+        # parts 中的字符串是原样输出的文本，元组是 (占位符名, 未提供值时输出的原文)
+        self.parts = []
+        self.names = set()
+
+        literal = []
+        position = 0
+        for match in _TOKEN_PATTERN.finditer(source):
+            literal.append(source[position:match.start()])
+            position = match.end()
+            if match.group("dollar_escape"):
+                literal.append("$")
+            elif match.group("brace_escape"):
+                literal.append(match.group("brace_escape")[0])
+            else:
+                name = match.group("dollar_braced") or match.group("dollar_named") or match.group("braced")
+                if literal:
+                    self.parts.append("".join(literal))
+                    literal = []
+                self.parts.append((name, match.group(0)))
+                self.names.add(name)
+        literal.append(source[position:])
+        if "".join(literal):
+            self.parts.append("".join(literal))
+
+    def render(self, **kwargs):
+        """
+        按预编译的片段渲染模板
+
+        参数:
+            **kwargs: 用于替换的键值对
+
+        返回:
+            str: 渲染后的内容
+        """
+        return "".join(
+            part if isinstance(part, str)
+            else (str(kwargs[part[0]]) if part[0] in kwargs else part[1])
+            for part in self.parts
+        )
+
+
+class TemplateRegistry:
+    """
+    进程内的模板注册表
+
+    首次使用时加载并编译模板目录下的全部模板，之后直接使用内存中的编译结果；
+    开发模式下每次获取模板时检查文件修改时间，模板被修改后重新编译。
+    """
+
+    def __init__(self, template_dir=TEMPLATE_DIR, dev_mode=config.TEMPLATE_DEV_MODE):
+        """
+        参数:
+            template_dir (str/Path): 模板目录
+            dev_mode (bool): 是否检查模板文件的修改时间
+        """
+        self.template_dir = Path(template_dir)
+        self.dev_mode = dev_mode
+        self._templates = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def get(self, template_path):
+        """
+        获取编译后的模板
+
+        参数:
+            template_path (str): 模板文件路径，相对于模板目录
+
+        返回:
+            CompiledTemplate: 编译后的模板
+        """
+        key = Path(template_path).as_posix()
+        with self._lock:
+            if not self._loaded:
+                self._load_all()
+            entry = self._templates.get(key)
+            if entry is not None and not self.dev_mode:
+                return entry[1]
+
+            full_path = self.template_dir / key
+            try:
+                mtime = os.stat(full_path).st_mtime_ns
+            except OSError:
+                self._templates.pop(key, None)
+                raise FileNotFoundError(f"模板文件不存在: {full_path}")
+
+            if entry is None or entry[0] != mtime:
+                entry = self._compile(full_path, mtime)
+                self._templates[key] = entry
+            return entry[1]
+
+    def clear(self):
+        """清空注册表，下次使用时重新加载全部模板"""
+        with self._lock:
+            self._templates.clear()
+            self._loaded = False
+
+    def _load_all(self):
+        for full_path in self.template_dir.rglob("*"):
+            if full_path.is_file():
+                key = full_path.relative_to(self.template_dir).as_posix()
+                self._templates[key] = self._compile(full_path, os.stat(full_path).st_mtime_ns)
+        self._loaded = True
+
+    @staticmethod
+    def _compile(full_path, mtime):
+        with open(full_path, 'r', encoding='utf-8') as f:
+            return mtime, CompiledTemplate(f.read())
+
+
+_registry = TemplateRegistry()
+
+
+@lru_cache(maxsize=64)
+def _compile_string(template_str):
+    """编译并缓存直接传入的模板字符串"""
+    return CompiledTemplate(template_str)
+
+
 class TemplateLoader:
     """模板加载和渲染工具"""
-    
+
     @staticmethod
     def load_template(template_path):
         """
-        从文件加载模板内容
-        
+        从注册表获取模板内容
+
         参数:
             template_path (str): 模板文件路径，相对于模板目录
-            
+
         返回:
             str: 模板内容
         """
-        full_path = TEMPLATE_DIR / template_path
-        
-        if not full_path.exists():
-            raise FileNotFoundError(f"模板文件不存在: {full_path}")
-            
-        with open(full_path, 'r', encoding='utf-8') as f:
-            return f.read()
-    
+        return _registry.get(template_path).source
+
     @staticmethod
     def render(template_str, **kwargs):
         """
         使用参数渲染模板字符串
-        
+
         参数:
             template_str (str): 模板字符串
             **kwargs: 用于替换的键值对
-            
+
         返回:
             str: 渲染后的内容
         """
-        template = Template(template_str)
-        return template.safe_substitute(**kwargs)
-    
+        return _compile_string(template_str).render(**kwargs)
+
     @staticmethod
     def load_and_render(template_path, **kwargs):
         """
         加载并渲染模板
-        
+
         参数:
             template_path (str): 模板文件路径，相对于模板目录
             **kwargs: 用于替换的键值对
-            
+
         返回:
             str: 渲染后的内容
         """
-        template_str = TemplateLoader.load_template(template_path)
-        return TemplateLoader.render(template_str, **kwargs)
-        
+        return _registry.get(template_path).render(**kwargs)
+
     @staticmethod
     def get_launcher_template(platform):
         """
         获取特定平台的启动器模板
-        
+
         参数:
             platform (str): 平台类型 ('windows' 或 'unix')
-            
+
         返回:
             str: 模板内容
         """
-        if platform.lower() == 'windows':
-            return TemplateLoader.load_template('launchers/windows_launcher.bat')
-        elif platform.lower() in ('unix', 'linux', 'mac', 'macos'):
-            return TemplateLoader.load_template('launchers/unix_launcher.sh')
-        else:
-            raise ValueError(f"不支持的平台类型: {platform}")
-            
+        return TemplateLoader.load_template(TemplateLoader._launcher_template_path(platform))
+
+    @staticmethod
+    def render_launcher(platform, **kwargs):
+        """
+        渲染特定平台的启动器
+
+        参数:
+            platform (str): 平台类型 ('windows' 或 'unix')
+            **kwargs: 用于替换的键值对
+
+        返回:
+            str: 渲染后的内容
+        """
+        return TemplateLoader.load_and_render(TemplateLoader._launcher_template_path(platform), **kwargs)
+
     @staticmethod
     def get_launcher_guide_template():
         """
         获取启动指南HTML模板
-        
+
         返回:
             str: 模板内容
         """
-        return TemplateLoader.load_template('launchers/launcher_guide.html') 
\ No newline at end of file
+        return TemplateLoader.load_template('launchers/launcher_guide.html')
+
+    @staticmethod
+    def render_launcher_guide(**kwargs):
+        """
+        渲染启动指南HTML
+
+        返回:
+            str: 渲染后的内容
+        """
+        return TemplateLoader.load_and_render('launchers/launcher_guide.html', **kwargs)
+
+    @staticmethod
+    def _launcher_template_path(platform):
+        if platform.lower() == 'windows':
+            return 'launchers/windows_launcher.bat'
+        elif platform.lower() in ('unix', 'linux', 'mac', 'macos'):
+            return 'launchers/unix_launcher.sh'
+        else:
+            raise ValueError(f"不支持的平台类型: {platform}")
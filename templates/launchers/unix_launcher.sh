@@ -144,34 +144,70 @@ fi
 echo -e "${GREEN}已激活虚拟环境${NC}"
 echo
 
-# 安装依赖
-echo -e "${YELLOW}正在安装依赖...${NC}"
-python -m pip install --upgrade pip
-pip install -r requirements.txt
-
-if [ $? -ne 0 ]; then
-    echo -e "${RED}依赖安装失败！${NC}"
-    read -p "按 Enter 键退出..."
-    exit 1
+# 依赖指纹：requirements.txt 和 Python 版本都没有变化时跳过安装，直接启动
+STAMP_FILE="venv/.requirements.stamp"
+CURRENT_STAMP=$(python -c "import hashlib, sys; print(hashlib.sha256(open('requirements.txt', 'rb').read()).hexdigest() + '-' + sys.version.split()[0])")
+SAVED_STAMP=""
+if [ -f "$STAMP_FILE" ]; then
+    SAVED_STAMP=$(cat "$STAMP_FILE")
 fi
 
-echo -e "${GREEN}依赖安装完成！${NC}"
+if [ -n "$CURRENT_STAMP" ] && [ "$CURRENT_STAMP" = "$SAVED_STAMP" ]; then
+    echo -e "${GREEN}依赖没有变化，跳过安装${NC}"
+else
+    # 安装依赖：附带离线依赖包时直接从本地安装，无需联网，也不升级pip
+    INSTALL_STATUS=1
+    if [ -d "wheelhouse" ]; then
+        echo -e "${YELLOW}正在从离线依赖包安装依赖...${NC}"
+        pip install --no-index --find-links wheelhouse -r requirements.txt
+        INSTALL_STATUS=$?
+        if [ $INSTALL_STATUS -ne 0 ]; then
+            echo -e "${YELLOW}离线依赖包不适用于当前系统，改为联网安装...${NC}"
+        fi
+    fi
+
+    if [ $INSTALL_STATUS -ne 0 ]; then
+        echo -e "${YELLOW}正在安装依赖...${NC}"
+        python -m pip install --upgrade pip
+        pip install -r requirements.txt
+        INSTALL_STATUS=$?
+    fi
+
+    if [ $INSTALL_STATUS -ne 0 ]; then
+        echo -e "${RED}依赖安装失败！${NC}"
+        read -p "按 Enter 键退出..."
+        exit 1
+    fi
+
+    echo "$CURRENT_STAMP" > "$STAMP_FILE"
+    echo -e "${GREEN}依赖安装完成！${NC}"
+fi
 echo
 
 # 启动应用
 echo -e "${GREEN}正在启动 {app_name}...${NC}"
 
+# 选择端口：默认8501，被占用时依次尝试后面的端口
+PORT=$(python -c "import socket; print(next((p for p in range(8501, 8600) if socket.socket().connect_ex(('127.0.0.1', p))), 8501))")
+echo -e "${GREEN}应用地址: http://localhost:$PORT${NC}"
+
 # 检查是否有可用的浏览器命令
+OPEN_CMD=""
 if command -v open > /dev/null 2>&1; then
     # macOS
-    (sleep 2 && open http://localhost:8501) &
+    OPEN_CMD="open"
 elif command -v xdg-open > /dev/null 2>&1; then
     # Linux
-    (sleep 2 && xdg-open http://localhost:8501) &
+    OPEN_CMD="xdg-open"
+fi
+
+# 在后台轮询端口，Streamlit就绪后立即打开浏览器（最多等待60秒）
+if [ -n "$OPEN_CMD" ]; then
+    (python -c "import socket, sys, time; sys.exit(0 if any(socket.socket().connect_ex(('127.0.0.1', $PORT)) == 0 or time.sleep(0.2) for _ in range(300)) else 1)" && $OPEN_CMD "http://localhost:$PORT") &
 fi
 
-# 启动 Streamlit 应用
-python -m streamlit run app.py
+# 启动 Streamlit 应用（浏览器由启动器打开）
+python -m streamlit run app.py --server.port $PORT --server.headless true
 
 # 结束
 deactivate 
\ No newline at end of file
@@ -78,24 +78,59 @@ if %errorlevel% neq 0 (
 echo %GREEN%已激活虚拟环境。%RESET%
 echo.
 
-:: 安装依赖
-echo %YELLOW%正在安装依赖...%RESET%
-python -m pip install --upgrade pip
-pip install -r requirements.txt
+:: 依赖指纹：requirements.txt 和 Python 版本都没有变化时跳过安装，直接启动
+set "STAMP_FILE=venv\.requirements.stamp"
+set "CURRENT_STAMP="
+set "SAVED_STAMP="
+for /f "usebackq delims=" %%i in (`python -c "import hashlib, sys; print(hashlib.sha256(open('requirements.txt', 'rb').read()).hexdigest() + '-' + sys.version.split()[0])"`) do set "CURRENT_STAMP=%%i"
+if exist "%STAMP_FILE%" set /p SAVED_STAMP=<"%STAMP_FILE%"
+if defined CURRENT_STAMP if "!CURRENT_STAMP!"=="!SAVED_STAMP!" (
+    echo %GREEN%依赖没有变化，跳过安装%RESET%
+    goto launch
+)
 
-if %errorlevel% neq 0 (
-    echo %RED%依赖安装失败！%RESET%
-    pause
-    exit /b 1
+:: 安装依赖：附带离线依赖包时直接从本地安装，无需联网，也不升级pip
+set "INSTALL_STATUS=1"
+if exist "wheelhouse" (
+    echo %YELLOW%正在从离线依赖包安装依赖...%RESET%
+    pip install --no-index --find-links wheelhouse -r requirements.txt
+    if !errorlevel! equ 0 (
+        set "INSTALL_STATUS=0"
+    ) else (
+        echo %YELLOW%离线依赖包不适用于当前系统，改为联网安装...%RESET%
+    )
+)
+
+if !INSTALL_STATUS! neq 0 (
+    echo %YELLOW%正在安装依赖...%RESET%
+    python -m pip install --upgrade pip
+    pip install -r requirements.txt
+    if !errorlevel! neq 0 (
+        echo %RED%依赖安装失败！%RESET%
+        pause
+        exit /b 1
+    )
 )
 
+> "%STAMP_FILE%" echo !CURRENT_STAMP!
 echo %GREEN%依赖安装完成！%RESET%
+
+:launch
 echo.
 
 :: 启动应用
 echo %GREEN%正在启动 {app_name}...%RESET%
-start "" http://localhost:8501
-python -m streamlit run app.py
+
+:: 选择端口：默认8501，被占用时依次尝试后面的端口
+set "PORT=8501"
+for /f "usebackq delims=" %%i in (`python -c "import socket; print(next((p for p in range(8501, 8600) if socket.socket().connect_ex(('127.0.0.1', p))), 8501))"`) do set "PORT=%%i"
+echo %GREEN%应用地址: http://localhost:!PORT!%RESET%
+
+:: 在后台轮询端口，Streamlit就绪后立即打开浏览器（最多等待60秒）
+start "" /b python -c "import socket, time, webbrowser; any(socket.socket().connect_ex(('127.0.0.1', !PORT!)) == 0 or time.sleep(0.2) for _ in range(300)) and webbrowser.open('http://localhost:!PORT!')"
+
+:: 启动 Streamlit 应用（浏览器由启动器打开）
+python -m streamlit run app.py --server.port !PORT! --server.headless true
 
 :: 结束
 deactivate
@@ -0,0 +1,9 @@
+"""
+测试配置 - 从仓库根目录导入模块，测试中不启动指标服务
+"""
+
+import os
+import sys
+
+os.environ.setdefault("METRICS_PORT", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
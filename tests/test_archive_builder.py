@@ -0,0 +1,106 @@
+"""
+ZIP归档写入器的测试：输出必须能被标准库 zipfile 读取并通过CRC校验
+"""
+
+import os
+import stat
+import zipfile
+
+import pytest
+
+from archive_builder import ZipArchiveWriter
+
+
+@pytest.fixture
+def source_dir(tmp_path):
+    root = tmp_path / "app"
+    (root / "pages").mkdir(parents=True)
+    (root / "resources" / "images").mkdir(parents=True)
+    (root / "empty").mkdir()
+    (root / "app.py").write_text("import streamlit as st\n" * 500, encoding="utf-8")
+    (root / "pages" / "首页.py").write_text("def render():\n    pass\n", encoding="utf-8")
+    (root / "resources" / "images" / "logo.png").write_bytes(os.urandom(64 * 1024))
+    launcher = root / "启动应用.sh"
+    launcher.write_text("#!/bin/sh\n", encoding="utf-8")
+    launcher.chmod(0o644)
+    return root
+
+
+def read_members(zip_path):
+    with zipfile.ZipFile(zip_path) as zf:
+        assert zf.testzip() is None
+        return {info.filename: (info, zf.read(info) if not info.is_dir() else None) for info in zf.infolist()}
+
+
+def test_tree_and_bytes_round_trip(tmp_path, source_dir):
+    zip_path = tmp_path / "out.zip"
+    with ZipArchiveWriter(zip_path) as writer:
+        writer.add_tree(source_dir, exclude={"pages/首页.py"}, executables={"启动应用.sh"})
+        writer.add_bytes("README.txt", "说明\n")
+        writer.add_directory("wheelhouse")
+
+    members = read_members(zip_path)
+    assert set(members) == {"app.py", "empty/", "pages/", "resources/", "resources/images/",
+                            "resources/images/logo.png", "启动应用.sh", "README.txt", "wheelhouse/"}
+    assert members["app.py"][1] == (source_dir / "app.py").read_bytes()
+    assert members["resources/images/logo.png"][1] == (source_dir / "resources/images/logo.png").read_bytes()
+    assert members["README.txt"][1] == "说明\n".encode("utf-8")
+
+    # 已压缩格式原样存储，文本压缩
+    assert members["resources/images/logo.png"][0].compress_type == zipfile.ZIP_STORED
+    assert members["app.py"][0].compress_type == zipfile.ZIP_DEFLATED
+    assert members["app.py"][0].compress_size < members["app.py"][0].file_size
+
+    # 可执行权限和UTF-8文件名
+    assert stat.S_IMODE(members["启动应用.sh"][0].external_attr >> 16) & 0o111
+    assert not stat.S_IMODE(members["app.py"][0].external_attr >> 16) & 0o111
+    assert members["启动应用.sh"][0].flag_bits & 0x800
+
+
+def test_extracted_files_match_source(tmp_path, source_dir):
+    zip_path = tmp_path / "out.zip"
+    with ZipArchiveWriter(zip_path) as writer:
+        writer.add_tree(source_dir)
+
+    target = tmp_path / "extracted"
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(target)
+    for path in source_dir.rglob("*"):
+        if path.is_file():
+            assert (target / path.relative_to(source_dir)).read_bytes() == path.read_bytes()
+
+
+def test_copy_archive_keeps_compressed_data(tmp_path, source_dir):
+    source_zip = tmp_path / "source.zip"
+    with zipfile.ZipFile(source_zip, "w") as zf:
+        zf.write(source_dir / "app.py", "app.py", compress_type=zipfile.ZIP_DEFLATED)
+        zf.write(source_dir / "resources/images/logo.png", "logo.png", compress_type=zipfile.ZIP_STORED)
+        zf.writestr("README.txt", "old readme")
+        zf.writestr("启动应用.sh", "#!/bin/sh\n")
+
+    zip_path = tmp_path / "out.zip"
+    with ZipArchiveWriter(zip_path) as writer:
+        copied = writer.copy_archive(source_zip, exclude={"README.txt"}, executables={"启动应用.sh"})
+        writer.add_bytes("README.txt", "new readme")
+
+    assert copied == ["app.py", "logo.png", "启动应用.sh"]
+    members = read_members(zip_path)
+    with zipfile.ZipFile(source_zip) as zf:
+        for name in copied:
+            assert members[name][1] == zf.read(name)
+            assert members[name][0].compress_size == zf.getinfo(name).compress_size
+    assert members["README.txt"][1] == b"new readme"
+    assert stat.S_IMODE(members["启动应用.sh"][0].external_attr >> 16) & 0o111
+
+
+def test_empty_archive_is_valid(tmp_path):
+    zip_path = tmp_path / "empty.zip"
+    ZipArchiveWriter(zip_path).close()
+    assert read_members(zip_path) == {}
+
+
+def test_duplicate_member_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        with ZipArchiveWriter(tmp_path / "out.zip") as writer:
+            writer.add_bytes("app.py", "a")
+            writer.add_bytes("app.py", "b")
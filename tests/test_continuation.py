@@ -0,0 +1,104 @@
+"""
+续写拼接的单元测试
+"""
+
+import unittest
+
+from continuation import ContinuationStitcher, stitch
+from response_parser import FileBlockParser
+
+PARTIAL = (
+    "文件名: app.py\n"
+    "```python\n"
+    "import streamlit as st\n"
+    "st.title('销售看板')\n"
+)
+
+
+def parse_files(text):
+    parser = FileBlockParser()
+    parser.feed(text)
+    parser.close()
+    return parser.files
+
+
+class StripReopenedBlockTest(unittest.TestCase):
+    def test_repeated_header_and_fence_are_removed(self):
+        continuation = "文件名: app.py\n```python\nst.write('hello')\n```\n"
+        self.assertEqual(stitch(PARTIAL, continuation), PARTIAL + "st.write('hello')\n```\n")
+
+    def test_repeated_header_fence_and_last_line_are_removed(self):
+        continuation = "\n文件名: app.py\n\n```python\nst.title('销售看板')\nst.write('hello')\n```\n"
+        self.assertEqual(stitch(PARTIAL, continuation), PARTIAL + "st.write('hello')\n```\n")
+
+    def test_repeated_fence_without_header_is_removed(self):
+        continuation = "```python\nst.write('hello')\n```\n"
+        self.assertEqual(stitch(PARTIAL, continuation), PARTIAL + "st.write('hello')\n```\n")
+
+    def test_bare_closing_fence_is_kept(self):
+        continuation = "```\n\n文件名: utils.py\n```python\ndef helper():\n    return 1\n```\n"
+        result = stitch(PARTIAL, continuation)
+        self.assertEqual(result, PARTIAL + continuation)
+        self.assertEqual([f["name"] for f in parse_files(result)], ["app.py", "utils.py"])
+
+    def test_nothing_is_stripped_outside_a_block(self):
+        partial = PARTIAL + "```\n\n"
+        continuation = "文件名: utils.py\n```python\ndef helper():\n    return 1\n```\n"
+        self.assertEqual(stitch(partial, continuation), partial + continuation)
+
+
+class OverlapTest(unittest.TestCase):
+    def test_short_coincidental_overlap_is_kept(self):
+        # 截断在 "10" 之后，续写的 "0" 与结尾相同只是巧合
+        partial = PARTIAL + "page_size = 10"
+        self.assertEqual(stitch(partial, "0\n"), partial + "0\n")
+
+    def test_short_overlap_of_a_repeated_line_is_removed(self):
+        partial = PARTIAL + "x = 1\n"
+        self.assertEqual(stitch(partial, "x = 1\ny = 2\n"), partial + "y = 2\n")
+
+    def test_long_overlap_inside_a_line_is_removed(self):
+        partial = PARTIAL + "result = compute_summary(orders, customers"
+        continuation = "compute_summary(orders, customers, region)\n"
+        self.assertEqual(stitch(partial, continuation), partial + ", region)\n")
+
+    def test_cut_mid_line_continued_directly(self):
+        partial = PARTIAL + "st.write('hel"
+        self.assertEqual(stitch(partial, "lo')\n```\n"), partial + "lo')\n```\n")
+
+    def test_cut_mid_line_and_line_restarted(self):
+        partial = PARTIAL + "st.write('hel"
+        self.assertEqual(stitch(partial, "st.write('hello')\n```\n"), partial + "lo')\n```\n")
+
+
+class StreamingTest(unittest.TestCase):
+    def test_chunked_feed_matches_stitch(self):
+        continuation = "文件名: app.py\n```python\nst.title('销售看板')\n" + "st.write(1)\n" * 400 + "```\n"
+        stitcher = ContinuationStitcher(PARTIAL)
+        output = "".join(stitcher.feed(continuation[i:i + 7]) for i in range(0, len(continuation), 7))
+        output += stitcher.close()
+        self.assertEqual(PARTIAL + output, stitch(PARTIAL, continuation))
+        self.assertTrue(output.startswith("st.write(1)\n"))
+
+    def test_hold_back_is_limited_to_the_overlap_window(self):
+        partial = PARTIAL + "x = 1\n" * 200
+        continuation = "文件名: app.py\n```python\n" + "y = 2\n" * 200
+        stitcher = ContinuationStitcher(partial, window=300)
+        emitted = 0
+        for position in range(len(continuation)):
+            emitted += len(stitcher.feed(continuation[position]))
+            held = position + 1 - emitted
+            self.assertLessEqual(held, 300 + len("文件名: app.py\n```python\n"))
+        self.assertEqual(partial + "y = 2\n" * 200, stitch(partial, continuation))
+
+    def test_waits_for_the_reopened_fence_line(self):
+        # 检查重叠的窗口比重新输出的文件头还短时，也要等开头的围栏输出完整才能判断
+        partial = "文件名: a.py\n```python\nx"
+        continuation = "文件名: a.py\n```python\nx = 1\n```\n"
+        stitcher = ContinuationStitcher(partial, window=8)
+        output = "".join(stitcher.feed(char) for char in continuation) + stitcher.close()
+        self.assertEqual(partial + output, partial + " = 1\n```\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
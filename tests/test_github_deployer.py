@@ -0,0 +1,110 @@
+"""
+GitHub部署器在模拟GitHub API服务器上的测试
+"""
+
+import pytest
+
+import config
+from github_deployer import GitHubDeployer
+from mock_github_server import MockGitHubServer
+
+APP_FILES = {
+    "app.py": b"import streamlit as st\nst.title('demo')\n",
+    "README.md": "# 演示应用\n".encode("utf-8"),
+    "requirements.txt": b"streamlit>=1.25.0\n",
+    "pages/home.py": b"def render():\n    pass\n",
+    "resources/data/sales.csv": b"date,amount\n2024-01-01,10\n" * 200,
+}
+
+
+@pytest.fixture
+def app_dir(tmp_path):
+    root = tmp_path / "demo"
+    for name, data in APP_FILES.items():
+        path = root / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    launcher = root / "启动应用.sh"
+    launcher.write_bytes(b"#!/bin/sh\nstreamlit run app.py\n")
+    launcher.chmod(0o755)
+    return root
+
+
+@pytest.fixture
+def server():
+    with MockGitHubServer() as server:
+        yield server
+
+
+def expected_files(app_dir):
+    return {path.relative_to(app_dir).as_posix(): path.read_bytes()
+            for path in app_dir.rglob("*") if path.is_file()}
+
+
+def test_git_data_deploys_in_a_single_commit(server, app_dir):
+    result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App", strategy="git_data")
+
+    assert result["success"], result.get("error")
+    assert result["repo_name"] == "demo-app"
+    state = server.state
+    assert state.files_at(config.GITHUB_ORG, "demo-app") == expected_files(app_dir)
+    # 自动初始化的提交 + 部署提交
+    assert state.commit_count(config.GITHUB_ORG, "demo-app") == 2
+    repo = state.repos[f"{config.GITHUB_ORG}/demo-app"]
+    assert repo["refs"]["heads/main"] == result["commit_sha"]
+    tree = state.objects[state.objects[result["commit_sha"]]["tree"]]
+    assert tree["entries"]["启动应用.sh"]["mode"] == "100755"
+    assert tree["entries"]["app.py"]["mode"] == "100644"
+
+
+def test_git_data_streams_large_files(server, app_dir, monkeypatch):
+    monkeypatch.setattr(config, "GITHUB_STREAM_THRESHOLD", 1024)
+    result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App", strategy="git_data")
+
+    assert result["success"], result.get("error")
+    assert server.state.files_at(config.GITHUB_ORG, "demo-app") == expected_files(app_dir)
+
+
+def test_contents_commits_each_file_and_overwrites_readme(server, app_dir):
+    result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App", strategy="contents")
+
+    assert result["success"], result.get("error")
+    files = expected_files(app_dir)
+    assert server.state.files_at(config.GITHUB_ORG, "demo-app") == files
+    assert server.state.commit_count(config.GITHUB_ORG, "demo-app") == 1 + len(files)
+
+
+def test_missing_requirements_get_defaults(server, app_dir):
+    (app_dir / "requirements.txt").unlink()
+    result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App")
+
+    assert result["success"], result.get("error")
+    files = server.state.files_at(config.GITHUB_ORG, "demo-app")
+    assert files["requirements.txt"] == config.GITHUB_DEFAULT_REQUIREMENTS.encode("utf-8")
+
+
+def test_waits_for_repository_initialization(app_dir):
+    with MockGitHubServer(init_delay=0.5) as server:
+        result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App")
+
+    assert result["success"], result.get("error")
+    refs = [path for method, path in server.state.request_log if method == "GET" and "/git/ref/" in path]
+    assert len(refs) > 1
+
+
+def test_secondary_rate_limit_is_retried(app_dir):
+    with MockGitHubServer(secondary_limit=(5, 1.0)) as server:
+        result = GitHubDeployer("token", api_url=server.url).deploy(app_dir, "Demo App")
+
+    assert result["success"], result.get("error")
+    assert server.state.rate_limited > 0
+    assert server.state.files_at(config.GITHUB_ORG, "demo-app") == expected_files(app_dir)
+
+
+def test_existing_repository_is_reported(server, app_dir):
+    deployer = GitHubDeployer("token", api_url=server.url)
+    assert deployer.deploy(app_dir, "Demo App")["success"]
+
+    result = deployer.deploy(app_dir, "Demo App")
+    assert not result["success"]
+    assert "创建仓库失败" in result["error"]
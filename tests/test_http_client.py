@@ -0,0 +1,82 @@
+"""
+共享HTTP客户端的重试测试：非幂等请求只在连接建立失败时重试
+"""
+
+import socket
+import threading
+
+import pytest
+import requests
+
+from http_client import HttpClient
+
+
+class ResetServer:
+    """读取请求后不响应直接断开连接的服务器，记录收到的请求数"""
+
+    def __init__(self):
+        self.sock = socket.socket()
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.listen()
+        self.requests = 0
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.sock.getsockname()[1]}/"
+
+    def _serve(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            with conn:
+                if conn.recv(65536):
+                    self.requests += 1
+
+    def close(self):
+        self.sock.close()
+
+
+@pytest.fixture
+def client():
+    return HttpClient(max_retries=2, backoff_factor=0.01, backoff_max=0.01)
+
+
+@pytest.fixture
+def reset_server():
+    server = ResetServer()
+    yield server
+    server.close()
+
+
+def unused_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_post_is_not_retried_after_the_request_was_sent(client, reset_server):
+    with pytest.raises(requests.ConnectionError):
+        client.post(reset_server.url, json={"name": "repo"})
+    assert reset_server.requests == 1
+
+
+def test_get_is_retried_after_a_reset(client, reset_server):
+    with pytest.raises(requests.ConnectionError):
+        client.get(reset_server.url)
+    assert reset_server.requests == 3
+
+
+def test_refused_connection_is_a_connect_failure(client):
+    with pytest.raises(requests.ConnectionError) as excinfo:
+        client.post(f"http://127.0.0.1:{unused_port()}/", json={})
+    assert HttpClient._connect_failed(excinfo.value)
+
+
+def test_reset_is_not_a_connect_failure(reset_server):
+    with pytest.raises(requests.ConnectionError) as excinfo:
+        HttpClient(max_retries=0).post(reset_server.url, json={})
+    assert not HttpClient._connect_failed(excinfo.value)
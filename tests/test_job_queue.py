@@ -0,0 +1,130 @@
+"""
+后台任务队列的测试：执行、取消、状态持久化和重启后恢复
+"""
+
+import json
+import threading
+import time
+
+import pytest
+
+import config
+from job_queue import JobCancelled, JobManager
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return JobManager(state_dir=tmp_path / "jobs", max_workers=2)
+
+
+def wait_finished(manager, job_id, timeout=5.0, on_disk=False):
+    """等待任务结束；on_disk 为 True 时等待结束状态写入磁盘（内存中的状态先于磁盘更新）"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = manager._load(job_id) if on_disk else manager.get(job_id)
+        if job and job["status"] in JobManager.FINISHED_STATUSES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"任务 {job_id} 没有在 {timeout} 秒内结束")
+
+
+def test_successful_job_is_persisted_without_secrets(manager):
+    def func(job, params):
+        job.add_event("开始")
+        job.update_progress("生成代码", "进行中", 50)
+        return {"answer": params["value"] * 2}
+
+    job_id = manager.submit("generate", func, {"value": 21, "api_key": "sk-secret"}, secret_keys=("api_key",))
+    job = wait_finished(manager, job_id)
+
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"answer": 42}
+    assert job["events"] == ["开始"]
+    saved = (manager.state_dir / f"{job_id}.json").read_text(encoding="utf-8")
+    assert "sk-secret" not in saved
+    assert json.loads(saved)["result"] == {"answer": 42}
+
+
+def test_failed_job_records_error(manager):
+    def func(job, params):
+        raise ValueError("出错了")
+
+    job = wait_finished(manager, manager.submit("generate", func, {}))
+
+    assert job["status"] == "failed"
+    assert job["error"] == "出错了"
+    assert job["progress"]["percent"] == 100
+
+
+def test_running_job_can_be_cancelled(manager):
+    started = threading.Event()
+
+    def func(job, params):
+        started.set()
+        while True:
+            job.check_cancelled()
+            time.sleep(0.01)
+
+    job_id = manager.submit("generate", func, {})
+    assert started.wait(5)
+    assert manager.cancel(job_id)
+
+    job = wait_finished(manager, job_id)
+    assert job["status"] == "cancelled"
+    assert not manager.cancel(job_id)
+
+
+def test_pending_job_cancelled_before_start_never_runs(tmp_path):
+    manager = JobManager(state_dir=tmp_path / "jobs", max_workers=1)
+    release = threading.Event()
+    ran = []
+
+    blocker = manager.submit("generate", lambda job, params: release.wait(5), {})
+    queued = manager.submit("generate", lambda job, params: ran.append(True), {})
+    assert manager.cancel(queued)
+    release.set()
+
+    assert wait_finished(manager, blocker)["status"] == "succeeded"
+    assert wait_finished(manager, queued)["status"] == "cancelled"
+    assert ran == []
+
+
+def test_restart_marks_unfinished_jobs_interrupted(tmp_path):
+    state_dir = tmp_path / "jobs"
+    manager = JobManager(state_dir=state_dir)
+    release = threading.Event()
+    started = threading.Event()
+
+    def func(job, params):
+        started.set()
+        release.wait(5)
+        raise JobCancelled("测试结束")
+
+    running = manager.submit("generate", func, {})
+    finished = manager.submit("generate", lambda job, params: {"ok": True}, {})
+    assert started.wait(5)
+    wait_finished(manager, finished, on_disk=True)
+
+    # 新进程中的管理器只能从磁盘读取任务
+    restarted = JobManager(state_dir=state_dir)
+    interrupted = restarted.get(running)
+    assert interrupted["status"] == "interrupted"
+    assert interrupted["error"]
+    assert restarted.get(finished)["result"] == {"ok": True}
+    assert restarted.get("missing") is None
+    release.set()
+
+
+def test_restart_removes_expired_jobs(tmp_path):
+    state_dir = tmp_path / "jobs"
+    manager = JobManager(state_dir=state_dir)
+    job_id = manager.submit("generate", lambda job, params: {}, {})
+    wait_finished(manager, job_id, on_disk=True)
+
+    path = state_dir / f"{job_id}.json"
+    data = json.loads(path.read_text(encoding="utf-8"))
+    data["updated"] = time.time() - config.JOB_RETENTION - 1
+    path.write_text(json.dumps(data), encoding="utf-8")
+
+    JobManager(state_dir=state_dir)
+    assert not path.exists()
@@ -0,0 +1,48 @@
+"""
+代码生成的测试：流式和非流式响应都按文件回调 on_file，且每个文件只回调一次
+"""
+
+from pathlib import Path
+
+import pytest
+
+import artifact_store
+import model_catalog
+from artifact_store import ArtifactStore
+from llm_handler import LLMHandler
+from mock_openai_server import MockOpenAIServer
+
+
+@pytest.fixture(autouse=True)
+def isolated_stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(artifact_store, "_default_store", ArtifactStore(root=tmp_path / "artifacts"))
+    monkeypatch.setattr(model_catalog, "_default_catalog", model_catalog.ModelCatalog())
+
+
+@pytest.fixture(scope="module")
+def server():
+    with MockOpenAIServer() as server:
+        yield server
+
+
+@pytest.mark.parametrize("stream, candidates", [(True, 1), (False, 1), (True, 2), (False, 2)])
+def test_on_file_is_called_once_per_file(server, stream, candidates):
+    handler = LLMHandler("sk-test", server.url, "gpt-4o-mini", use_cache=False, candidates=candidates,
+                         repair_attempts=0)
+    received = []
+
+    result = handler.generate_code(
+        app_name="demo",
+        app_description="读取上传的数据并展示统计结果",
+        app_type="Streamlit Web应用",
+        language="Python",
+        complexity="简单",
+        stream=stream,
+        on_file=lambda file_data: received.append(file_data["name"])
+    )
+
+    assert result["success"], result.get("error")
+    assert received
+    assert sorted(received) == sorted(set(received))
+    app_dir = Path(result["app_dir"])
+    assert set(received) <= {path.relative_to(app_dir).as_posix() for path in app_dir.rglob("*") if path.is_file()}
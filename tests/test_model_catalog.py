@@ -0,0 +1,39 @@
+"""
+模型目录的测试：生成任务不依赖界面先加载模型列表也能使用端点报告的上下文窗口
+"""
+
+import pytest
+
+import model_catalog
+from llm_handler import LLMHandler
+from mock_openai_server import MockOpenAIServer
+from token_budget import context_window
+
+
+@pytest.fixture
+def catalog(monkeypatch):
+    catalog = model_catalog.ModelCatalog()
+    monkeypatch.setattr(model_catalog, "_default_catalog", catalog)
+    return catalog
+
+
+@pytest.fixture
+def server():
+    with MockOpenAIServer(context_window=200000) as server:
+        yield server
+
+
+def test_handler_fetches_the_catalog_for_the_context_window(catalog, server):
+    handler = LLMHandler("sk-test", server.url, "gpt-4o-mini", use_cache=False)
+
+    assert not catalog.has_entry(handler.api_endpoint, "sk-test")
+    assert handler._context_window() == 200000
+    assert catalog.has_entry(handler.api_endpoint, "sk-test")
+
+
+def test_model_info_reads_only_the_cache_by_default(catalog, server):
+    endpoint = server.url + "/"
+
+    assert catalog.model_info(endpoint, "sk-test", "gpt-4o-mini")["context_window"] == context_window("gpt-4o-mini")
+    assert not catalog.has_entry(endpoint, "sk-test")
+    assert catalog.model_info(endpoint, "sk-test", "gpt-4o-mini", fetch=True)["context_source"] == "endpoint"
@@ -0,0 +1,123 @@
+"""
+模型输出解析的测试：流式逐段输入与一次输入完整文本的结果必须相同
+"""
+
+import random
+
+import pytest
+
+from response_parser import FileBlockParser, _scan_complete, files_with_fallback, parse_files
+
+RESPONSE = (
+    "下面是应用的代码。\n\n"
+    "文件名: app.py\n"
+    "```python\n"
+    "import streamlit as st\n"
+    "PROMPT = '''\n"
+    "```python\n"
+    "print('nested')\n"
+    "```\n"
+    "'''\n"
+    "st.title('演示')\n"
+    "```\n\n"
+    "### pages/home.py\n"
+    "````python\n"
+    "def render():\n"
+    "    pass\n"
+    "````\n\n"
+    "**File: utils.py**\n"
+    "```\n"
+    "VALUE = 1\n"
+    "```\n"
+)
+
+EXPECTED = [
+    {"name": "app.py",
+     "content": "import streamlit as st\nPROMPT = '''\n```python\nprint('nested')\n```\n'''\nst.title('演示')"},
+    {"name": "pages/home.py", "content": "def render():\n    pass"},
+    {"name": "utils.py", "content": "VALUE = 1"},
+]
+
+
+FRAGMENTS = ["```", "```python", "\n```\n", "````\n", "~~~\n", "文件名: x.py\n", "### y.py\n", "\r\n", "\r",
+             "\u3000```\n", "  ```\n", "\t~~~~\n", "`", "\n", "\n\n"]
+
+
+def stream(text, sizes):
+    parser = FileBlockParser()
+    completed = []
+    position = 0
+    for size in sizes:
+        completed += parser.feed(text[position:position + size])
+        position += size
+    completed += parser.feed(text[position:])
+    completed += parser.close()
+    return parser, completed
+
+
+def test_complete_response():
+    assert parse_files(RESPONSE) == EXPECTED
+
+
+def test_crlf_line_endings():
+    assert parse_files(RESPONSE.replace("\n", "\r\n")) == EXPECTED
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_streamed_chunks_match_complete_parse(seed):
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 12) for _ in range(len(RESPONSE))]
+    parser, completed = stream(RESPONSE, sizes)
+
+    assert completed == EXPECTED
+    assert files_with_fallback(parser, RESPONSE) == parse_files(RESPONSE)
+
+
+def state_machine(text):
+    parser = FileBlockParser()
+    parser.feed(text)
+    parser.close()
+    return files_with_fallback(parser, text)
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_fast_path_matches_state_machine(seed):
+    rng = random.Random(seed)
+    chars = list(RESPONSE * rng.randint(1, 3))
+    for _ in range(rng.randint(1, 15)):
+        position = rng.randint(0, len(chars))
+        if rng.random() < 0.8:
+            chars[position:position] = rng.choice(FRAGMENTS)
+        else:
+            del chars[position:position + rng.randint(1, 20)]
+    text = "".join(chars)
+    assert parse_files(text) == state_machine(text)
+
+
+def test_fast_path_defers_ambiguous_input():
+    assert _scan_complete(RESPONSE) is not None
+    assert _scan_complete(RESPONSE.replace("\n", "\r\n")) is not None
+    # 单独的 \r 和行首的全角空格由状态机处理
+    assert _scan_complete(RESPONSE + "x\ry\n") is None
+    assert _scan_complete("文件名: a.py\n\u3000```python\nx = 1\n```\n") is None
+
+
+def test_every_split_point():
+    for split in range(len(RESPONSE) + 1):
+        assert stream(RESPONSE, [split])[1] == EXPECTED
+
+
+def test_open_block_reports_truncated_file():
+    parser = FileBlockParser()
+    parser.feed("文件名: app.py\n```python\nimport streamlit as st\n")
+    assert parser.open_block == "app.py"
+    parser.feed("```\n")
+    assert parser.open_block is None
+
+
+def test_fallbacks_without_headers():
+    assert parse_files("```python\nimport streamlit as st\n```\n") == [
+        {"name": "app.py", "content": "import streamlit as st"}]
+    assert parse_files("import streamlit as st\nst.write(1)") == [
+        {"name": "app.py", "content": "import streamlit as st\nst.write(1)"}]
+    assert parse_files("没有代码") == []
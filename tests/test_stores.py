@@ -0,0 +1,156 @@
+"""
+产物存储和资源存储的测试：内容去重、引用计数和垃圾回收
+"""
+
+import io
+import os
+import time
+
+import pytest
+
+import resource_store
+from artifact_store import ArtifactStore, link_file
+from resource_store import ResourceQuotaExceeded, ResourceStore
+
+KB = 1024
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(root=tmp_path / "artifacts", max_bytes=1024 * KB, workspace_ttl=3600)
+
+
+@pytest.fixture
+def resources(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(resource_store, "get_artifact_store", lambda: store)
+    return ResourceStore(resource_dir=tmp_path / "resources", chunk_size=4 * KB, session_quota=1024 * KB)
+
+
+def make_app(store, name, files):
+    """创建并提交一个应用，返回 (应用ID, 应用目录)"""
+    app_id, app_dir = store.create_workspace(name)
+    for rel_path, data in files.items():
+        path = app_dir / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+    source_zip = app_dir.parent / f"{name}.zip"
+    source_zip.write_bytes(name.encode("utf-8"))
+    store.commit(app_id, {"name": name, "source_zip": str(source_zip)})
+    return app_id, app_dir
+
+
+def blob_files(store):
+    return sorted(store.blobs_dir.glob("*/*"))
+
+
+def test_identical_content_is_stored_once(store):
+    shared = os.urandom(100 * KB)
+    _, first = make_app(store, "first", {"app.py": b"first", "data.csv": shared})
+    _, second = make_app(store, "second", {"app.py": b"second", "data.csv": shared})
+
+    assert os.path.samefile(first / "data.csv", second / "data.csv")
+    assert (first / "data.csv").read_bytes() == shared
+    # 共享内容只计算一次：ZIP与app.py的内容相同（都是应用名），也只计算一次
+    assert store.usage() == 100 * KB + len(b"first") + len(b"second")
+
+
+def test_least_recently_used_app_is_evicted(store):
+    shared = os.urandom(100 * KB)
+    first_id, first = make_app(store, "first", {"data.csv": shared, "own.bin": os.urandom(100 * KB)})
+    second_id, second = make_app(store, "second", {"data.csv": shared, "own.bin": os.urandom(100 * KB)})
+    second_blob = os.stat(second / "own.bin").st_ino
+    time.sleep(0.01)
+    store.touch(first / "data.csv")
+
+    store.max_bytes = 350 * KB
+    third_id, _ = make_app(store, "third", {"own.bin": os.urandom(100 * KB)})
+
+    assert [item["id"] for item in store.list_history()] == [first_id, third_id]
+    assert not (store.apps_dir / second_id).exists()
+    # 仍被第一个应用引用的共享blob保留，第二个应用独有的blob被删除
+    assert (first / "data.csv").read_bytes() == shared
+    assert second_blob not in {os.stat(path).st_ino for path in blob_files(store)}
+    assert store.usage() <= store.max_bytes
+
+
+def test_just_committed_app_is_kept_over_quota(store):
+    store.max_bytes = 10 * KB
+    app_id, app_dir = make_app(store, "big", {"own.bin": os.urandom(100 * KB)})
+
+    assert [item["id"] for item in store.list_history()] == [app_id]
+    assert (app_dir / "own.bin").exists()
+
+
+def test_stale_workspaces_are_removed(tmp_path):
+    store = ArtifactStore(root=tmp_path / "artifacts", workspace_ttl=60)
+    committed_id, _ = make_app(store, "kept", {"app.py": b"x"})
+    stale_id, _ = store.create_workspace("stale")
+    fresh_id, _ = store.create_workspace("fresh")
+    old = time.time() - 120
+    os.utime(store.apps_dir / stale_id, (old, old))
+
+    store.collect_garbage()
+
+    assert not (store.apps_dir / stale_id).exists()
+    assert (store.apps_dir / fresh_id).exists()
+    assert (store.apps_dir / committed_id).exists()
+
+
+def test_resource_refcounts(tmp_path, store, resources):
+    data = os.urandom(50 * KB)
+    first = resources.add(io.BytesIO(data), "a.csv", "数据", "session")
+    second = resources.add(io.BytesIO(data), "b.csv", "数据", "session")
+
+    assert not first["deduplicated"] and second["deduplicated"]
+    assert first["sha256"] == second["sha256"]
+    assert len(blob_files(store)) == 1
+    assert resources.session_usage("session") == 2 * len(data)
+    # 引用计数写入索引，新的实例可以读到
+    reloaded = ResourceStore(resource_dir=tmp_path / "resources")
+    assert reloaded._index[first["sha256"]]["refs"] == 2
+
+    resources.release(first, "session")
+    assert len(blob_files(store)) == 1
+    assert open(second["path"], "rb").read() == data
+
+    resources.release(second, "session")
+    assert blob_files(store) == []
+    assert resources.session_usage("session") == 0
+
+
+def test_resources_do_not_count_towards_app_usage(store, resources):
+    resources.add(io.BytesIO(os.urandom(200 * KB)), "big.bin", "其他", "session")
+    assert store.usage() == 0
+
+
+def test_blob_used_by_an_app_survives_resource_release(store, resources):
+    data = os.urandom(50 * KB)
+    resource = resources.add(io.BytesIO(data), "a.csv", "数据", "session")
+    app_id, app_dir = store.create_workspace("app")
+    (app_dir / "resources").mkdir()
+    link_file(resource["path"], app_dir / "resources" / "a.csv")
+    (app_dir.parent / "app.zip").write_bytes(b"zip")
+    store.commit(app_id, {"name": "app", "source_zip": str(app_dir.parent / "app.zip")})
+
+    resources.release(resource, "session")
+    assert (app_dir / "resources" / "a.csv").read_bytes() == data
+    assert len(blob_files(store)) == 2
+
+    store.max_bytes = 0
+    store.collect_garbage()
+    assert blob_files(store) == []
+
+
+def test_session_quota(store, resources):
+    resources.session_quota = 10 * KB
+
+    with pytest.raises(ResourceQuotaExceeded):
+        resources.add(io.BytesIO(b"x" * 20 * KB), "big.bin", "其他", "session")
+    with pytest.raises(ResourceQuotaExceeded):
+        resources.add(io.BytesIO(b""), "hinted.bin", "其他", "session", size_hint=20 * KB)
+
+    assert resources.session_usage("session") == 0
+    assert list(store.tmp_dir.iterdir()) == []
+    assert blob_files(store) == []
+    resources.add(io.BytesIO(b"x" * 5 * KB), "small.bin", "其他", "session")
+    assert resources.session_usage("session") == 5 * KB
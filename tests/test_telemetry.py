@@ -0,0 +1,47 @@
+"""
+指标端点的测试
+"""
+
+import logging
+import socket
+import urllib.request
+
+import pytest
+
+import telemetry
+
+
+@pytest.fixture(autouse=True)
+def fresh_metrics_server(monkeypatch):
+    monkeypatch.setattr(telemetry, "_metrics_server", None)
+    monkeypatch.setattr(telemetry, "_metrics_server_attempted", False)
+    yield
+    if telemetry._metrics_server is not None:
+        telemetry._metrics_server.shutdown()
+        telemetry._metrics_server.server_close()
+
+
+def test_busy_port_is_tried_once_per_process(caplog):
+    with socket.socket() as busy:
+        busy.bind(("127.0.0.1", 0))
+        busy.listen()
+        port = busy.getsockname()[1]
+        with caplog.at_level(logging.WARNING, logger="telemetry"):
+            results = [telemetry.start_metrics_server(port=port) for _ in range(3)]
+
+    assert results == [None, None, None]
+    assert len([r for r in caplog.records if "启动指标端点失败" in r.getMessage()]) == 1
+
+
+def test_server_is_started_once():
+    # 端口为0表示不启动，也不算一次尝试
+    assert telemetry.start_metrics_server(port=0) is None
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = telemetry.start_metrics_server(port=port)
+    assert server is not None
+    assert telemetry.start_metrics_server(port=port) is server
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics.json") as response:
+        assert response.status == 200
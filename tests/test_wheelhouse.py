@@ -0,0 +1,57 @@
+"""
+离线依赖包的测试：每种CPU架构调用一次 pip download，同时传入该架构的全部平台标签
+"""
+
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import wheelhouse
+from wheelhouse import WheelCache
+
+
+@pytest.fixture
+def pip_calls(monkeypatch):
+    """记录 pip download 的参数，并在目标目录中放入对应平台的wheel"""
+    calls = []
+
+    def run(command, **kwargs):
+        platforms = [command[i + 1] for i, argument in enumerate(command) if argument == "--platform"]
+        calls.append(platforms)
+        dest = Path(command[command.index("--dest") + 1])
+        dest.mkdir(parents=True, exist_ok=True)
+        (dest / f"pkg-1.0-cp311-cp311-{platforms[-1]}.whl").write_bytes(b"wheel")
+        return subprocess.CompletedProcess(command, 0, "", "")
+
+    monkeypatch.setattr(wheelhouse.subprocess, "run", run)
+    return calls
+
+
+def test_each_architecture_passes_all_its_tags(tmp_path, pip_calls):
+    cache = WheelCache(cache_dir=tmp_path)
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("streamlit\n", encoding="utf-8")
+
+    result = cache.collect(requirements, platforms=["macOS"], python_versions=["3.11"])
+
+    assert pip_calls == [["macosx_11_0_arm64", "macosx_14_0_arm64"], ["macosx_10_9_x86_64", "macosx_14_0_x86_64"]]
+    assert result["platforms"] == ["macOS"]
+    assert result["failed"] == {}
+    assert sorted(path.name for path in result["wheels"]) == [
+        "pkg-1.0-cp311-cp311-macosx_14_0_arm64.whl", "pkg-1.0-cp311-cp311-macosx_14_0_x86_64.whl"]
+
+    # 需求没有变化时直接使用清单，不再调用pip
+    cache.collect(requirements, platforms=["macOS"], python_versions=["3.11"])
+    assert len(pip_calls) == 2
+
+
+def test_unknown_platform_is_reported(tmp_path, pip_calls):
+    requirements = tmp_path / "requirements.txt"
+    requirements.write_text("streamlit\n", encoding="utf-8")
+
+    result = WheelCache(cache_dir=tmp_path).collect(requirements, platforms=["BeOS"])
+
+    assert result["platforms"] == []
+    assert "BeOS" in result["failed"]
+    assert pip_calls == []
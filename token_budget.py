@@ -0,0 +1,108 @@
+"""
+token预算 - 估算提示的token数，按复杂度、资源数量和模型上下文窗口确定输出上限
+"""
+
+import re
+import threading
+
+import config
+
+# 中日韩字符（含全角标点），在常见的BPE词表中大多单独占一个token
+_CJK_PATTERN = re.compile(r"[⺀-鿿가-힯＀-￯　-〿]")
+# 每条聊天消息的格式开销（角色标记和分隔符）
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """安装了 tiktoken 且词表可用时使用精确分词，否则返回 None 使用估算"""
+    global _encoding
+    with _encoding_lock:
+        if _encoding is None:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(config.TOKENIZER_ENCODING)
+            except Exception:
+                # 未安装或无法下载词表
+                _encoding = False
+        return _encoding or None
+
+
+def estimate_tokens(text):
+    """
+    估算文本的token数
+
+    没有 tiktoken 时按字符类别估算：中日韩字符每个计1个token，其余字符按
+    config.TOKEN_CHARS_PER_TOKEN 个字符计1个token。估算值略高于实际值，
+    用于预算时不会低估提示长度。
+
+    参数:
+        text (str): 文本
+
+    返回:
+        int: token数
+    """
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + int((len(text) - cjk) / config.TOKEN_CHARS_PER_TOKEN + 0.999)
+
+
+def estimate_messages_tokens(messages):
+    """估算聊天消息列表的token数（含每条消息的格式开销）"""
+    return sum(estimate_tokens(m["content"]) + MESSAGE_OVERHEAD_TOKENS for m in messages) + 2
+
+
+def _lookup(table, model, default):
+    """按最长前缀匹配模型名，如 gpt-4o-2024-05-13 匹配 gpt-4o"""
+    model = (model or "").lower()
+    matches = [prefix for prefix in table if model.startswith(prefix)]
+    return table[max(matches, key=len)] if matches else default
+
+
+def context_window(model):
+    """模型的上下文窗口大小（提示与输出的token总数上限）"""
+    return _lookup(config.MODEL_CONTEXT_WINDOWS, model, config.DEFAULT_CONTEXT_WINDOW)
+
+
+def output_limit(model):
+    """模型单次响应的输出token上限"""
+    return min(_lookup(config.MODEL_MAX_OUTPUT_TOKENS, model, config.DEFAULT_MAX_OUTPUT_TOKENS),
+               context_window(model))
+
+
+def desired_output_tokens(complexity, resource_count=0):
+    """按复杂度和资源数量估算完整应用需要的输出token数"""
+    base = config.COMPLEXITY_OUTPUT_TOKENS.get(complexity, config.COMPLEXITY_OUTPUT_TOKENS["中等"])
+    return base + resource_count * config.RESOURCE_OUTPUT_TOKENS
+
+
+def plan_completion(prompt_tokens, model, desired_tokens, window=None):
+    """
+    计算一次请求的 max_tokens
+
+    参数:
+        prompt_tokens (int): 提示（全部消息）的token数
+        model (str): 模型名称
+        desired_tokens (int): 期望的输出token数
+        window (int): 已知的上下文窗口（如端点报告的值），默认按 config.MODEL_CONTEXT_WINDOWS 查找
+
+    返回:
+        dict: {"context_window", "prompt_tokens", "desired_tokens", "available_tokens", "max_tokens"}；
+              available_tokens 为上下文窗口中留给输出的token数，max_tokens 为本次请求的输出上限，
+              小于期望值时需要续写才能得到完整输出
+    """
+    window = window or context_window(model)
+    available = max(0, window - prompt_tokens - config.TOKEN_SAFETY_MARGIN)
+    return {
+        "context_window": window,
+        "prompt_tokens": prompt_tokens,
+        "desired_tokens": desired_tokens,
+        "available_tokens": available,
+        "max_tokens": min(desired_tokens, output_limit(model), window, available)
+    }
@@ -0,0 +1,160 @@
+"""
+离线依赖包 - 为启动包下载目标平台的wheel，在本地按文件名去重缓存
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+import config
+
+
+class WheelhouseError(Exception):
+    """下载离线依赖包失败"""
+
+
+class WheelCache:
+    """
+    跨构建共享的wheel缓存
+
+    所有平台的wheel放在同一个目录中，文件名相同的wheel只保存一份；
+    每组 (requirements, 平台标签, Python版本) 解析出的wheel列表记录在清单中，
+    需求未变化时直接复用，不再调用pip。
+    """
+
+    def __init__(self, cache_dir=config.WHEELHOUSE_CACHE_DIR, timeout=config.WHEELHOUSE_TIMEOUT):
+        """
+        参数:
+            cache_dir (str/Path): 缓存目录
+            timeout (int): 单次pip下载的超时时间（秒）
+        """
+        self.cache_dir = Path(cache_dir)
+        self.wheels_dir = self.cache_dir / "wheels"
+        self.manifests_dir = self.cache_dir / "manifests"
+        self.wheels_dir.mkdir(parents=True, exist_ok=True)
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+
+    def collect(self, requirements_path, platforms=None, python_versions=None):
+        """
+        收集 requirements.txt 在各目标平台上需要的wheel
+
+        参数:
+            requirements_path (str/Path): requirements.txt 路径
+            platforms (iterable): 目标平台名称（config.WHEELHOUSE_PLATFORMS 的键），默认全部
+            python_versions (iterable): 目标Python版本，默认 config.WHEELHOUSE_PYTHON_VERSIONS
+
+        返回:
+            dict: {"wheels": [缓存中的wheel路径], "platforms": [成功的平台], "failed": {平台: 错误信息}}
+        """
+        requirements = Path(requirements_path).read_text(encoding="utf-8")
+        platforms = list(platforms or config.WHEELHOUSE_PLATFORMS)
+        python_versions = list(python_versions or config.WHEELHOUSE_PYTHON_VERSIONS)
+
+        wheels = set()
+        succeeded = []
+        failed = {}
+        for platform_name in platforms:
+            try:
+                for python_version in python_versions:
+                    for platform_tags in config.WHEELHOUSE_PLATFORMS[platform_name]:
+                        wheels.update(self._collect_one(requirements, platform_tags, python_version))
+                succeeded.append(platform_name)
+            except (KeyError, WheelhouseError) as e:
+                failed[platform_name] = str(e)
+                self.logger.warning(f"下载 {platform_name} 平台的离线依赖失败: {str(e)}")
+
+        return {
+            "wheels": [self.wheels_dir / name for name in sorted(wheels)],
+            "platforms": succeeded,
+            "failed": failed
+        }
+
+    def _collect_one(self, requirements, platform_tags, python_version):
+        """收集一组平台标签（同一CPU架构）和Python版本的wheel文件名，命中清单时不调用pip"""
+        key = hashlib.sha256(
+            json.dumps([requirements, platform_tags, python_version]).encode("utf-8")
+        ).hexdigest()
+        manifest_path = self.manifests_dir / f"{key}.json"
+
+        with self._lock:
+            try:
+                with open(manifest_path, "r", encoding="utf-8") as f:
+                    names = json.load(f)
+                if all((self.wheels_dir / name).exists() for name in names):
+                    return names
+            except (OSError, ValueError):
+                pass
+
+        names = self._download(requirements, platform_tags, python_version)
+
+        with self._lock:
+            tmp_path = manifest_path.with_suffix(f".{threading.get_ident()}.tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(names, f)
+            os.replace(tmp_path, manifest_path)
+        return names
+
+    def _download(self, requirements, platform_tags, python_version):
+        """
+        调用 pip download 下载到临时目录，再把新的wheel移入共享缓存
+
+        已缓存的wheel通过 --find-links 提供给pip，不会重复从网络下载。
+        一组中的每个平台标签都作为 --platform 传入，pip 按顺序优先选择前面的标签。
+        """
+        platforms = ", ".join(platform_tags)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            requirements_file = Path(temp_dir) / "requirements.txt"
+            requirements_file.write_text(requirements, encoding="utf-8")
+            dest_dir = Path(temp_dir) / "wheels"
+
+            command = [
+                sys.executable, "-m", "pip", "download",
+                "-r", str(requirements_file),
+                "--dest", str(dest_dir),
+                "--find-links", str(self.wheels_dir),
+                "--only-binary=:all:",
+                *[argument for tag in platform_tags for argument in ("--platform", tag)],
+                "--python-version", python_version,
+                "--implementation", "cp",
+                "--disable-pip-version-check",
+                "--quiet"
+            ]
+            try:
+                result = subprocess.run(command, capture_output=True, text=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                raise WheelhouseError(f"pip download 超时（{platforms}, Python {python_version}）")
+            if result.returncode != 0:
+                error = (result.stderr or result.stdout).strip().splitlines()
+                raise WheelhouseError(error[-1] if error else f"pip download 失败（{platforms}）")
+
+            names = []
+            for wheel in dest_dir.glob("*.whl"):
+                target = self.wheels_dir / wheel.name
+                with self._lock:
+                    if not target.exists():
+                        shutil.move(str(wheel), target)
+                names.append(wheel.name)
+            return sorted(names)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_wheel_cache():
+    """获取进程内共享的wheel缓存"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = WheelCache()
+        return _default_cache